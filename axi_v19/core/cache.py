@@ -0,0 +1,105 @@
+# axi_v19/core/cache.py
+"""
+Cache de réponses V19 - Architecture Bunker
+Cache mémoire TTL + LRU pour les GET en lecture intensive.
+
+Les entrées portent des tags (ex: "brain", "sweepbright"); les écritures
+(POST /v19/brain, webhook SweepBright, sync Trello) invalident leurs tags
+via ServerManager.invalidate_cache().
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger("axi_v19.cache")
+
+# Paramètres de requête exclus de la clé (l'auth est vérifiée avant le cache)
+IGNORED_QUERY_PARAMS = frozenset({"token"})
+
+
+class ResponseCache:
+    """
+    Cache LRU borné, thread-safe, avec expiration par entrée.
+
+    Clé = (chemin, paramètres de requête triés). Une entrée expirée compte
+    comme un miss et est supprimée à la lecture.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(path: str, query: Optional[Dict[str, Any]]) -> Tuple:
+        items = []
+        for name, value in (query or {}).items():
+            if name in IGNORED_QUERY_PARAMS:
+                continue
+            items.append((name, tuple(value) if isinstance(value, list) else value))
+        return (path, tuple(sorted(items)))
+
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        """Retourne (trouvé, valeur)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, value, _tags = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key: Tuple, value: Any, ttl: float, tags: Iterable[str] = ()):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value, tuple(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *tags: str) -> int:
+        """Supprime les entrées portant au moins un des tags (tous si aucun tag)."""
+        with self._lock:
+            if not tags:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                wanted = set(tags)
+                keys = [k for k, (_, _, entry_tags) in self._entries.items() if wanted.intersection(entry_tags)]
+                for k in keys:
+                    del self._entries[k]
+                removed = len(keys)
+            self.invalidations += 1
+        if removed:
+            logger.info(f"🧹 Cache invalidé {tags or '(tout)'}: {removed} entrées")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+# Instance globale
+response_cache = ResponseCache()
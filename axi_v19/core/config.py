@@ -91,6 +91,12 @@ class Settings:
     # === Serveur HTTP ===
     http_port: int = field(default_factory=lambda: int(os.getenv("PORT", "8000")))
     http_host: str = "0.0.0.0"
+    # "pooled" = pool de workers borné + file d'attente, "threading" = un thread par requête
+    http_mode: str = field(default_factory=lambda: os.getenv("AXI_HTTP_MODE", "pooled"))
+    http_workers: int = field(default_factory=lambda: int(os.getenv("AXI_HTTP_WORKERS", "16")))
+    http_queue_size: int = field(default_factory=lambda: int(os.getenv("AXI_HTTP_QUEUE_SIZE", "256")))
+    http_keepalive_timeout: float = 5.0   # Connexion keep-alive inactive fermée après N s
+    http_retry_after: int = 2             # Retry-After des 503 de saturation
     
     # === SÉCURITÉ API ===
     api_secret: str = field(default_factory=lambda: os.getenv("AXI_API_SECRET", ""))
@@ -208,39 +214,43 @@ PROTECTED_ENDPOINTS = [
 ]
 
 
-def check_auth(path: str, method: str, query: dict, headers: dict) -> tuple:
+# Lookup O(1) (la liste reste la référence lisible)
+_PUBLIC_ENDPOINTS_SET = frozenset(PUBLIC_ENDPOINTS)
+
+# Préfixes publics (authentification gérée par le module ou routes ouvertes)
+PUBLIC_PREFIXES = (
+    "/agent/",        # Routes agent (patterns) - auth propre au module agent
+    "/trio/",         # Routes Trio (Axis/Lumo) - publiques
+    "/sweepbright/",  # Routes SweepBright (patterns) - publiques
+    "/webhook/",
+)
+
+
+def is_public_endpoint(path: str, method: str) -> bool:
     """
-    Vérifie l'authentification pour un endpoint.
-    
-    Args:
-        path: Chemin de l'endpoint
-        method: GET, POST, etc.
-        query: Paramètres de requête
-        headers: Headers HTTP
-    
-    Returns:
-        (authorized: bool, error_message: str or None)
+    Politique d'accès d'un endpoint, sans vérification de token.
+    Utilisée une fois par route à l'enregistrement (router) et par check_auth.
     """
-    # Endpoints publics - toujours autorisés
-    if path in PUBLIC_ENDPOINTS:
-        return True, None
-    
-    # Routes agent (patterns) - authentification gérée par le module agent
-    if path.startswith("/agent/"):
-        return True, None
-    
-    # Routes Trio (Axis/Lumo) - publiques
-    if path.startswith("/trio/"):
-        return True, None
+    if path in _PUBLIC_ENDPOINTS_SET:
+        return True
     
-    # Routes SweepBright (patterns) - publiques
-    if path.startswith("/sweepbright/") or path.startswith("/webhook/"):
-        return True, None
+    if path.startswith(PUBLIC_PREFIXES):
+        return True
     
     # GET sur /v19/brain est public (lecture mémoire)
     if path == "/v19/brain" and method == "GET":
-        return True, None
+        return True
     
+    return False
+
+
+def verify_token(path: str, query: dict, headers: dict) -> tuple:
+    """
+    Vérifie le token d'un endpoint protégé.
+    
+    Returns:
+        (authorized: bool, error_message: str or None)
+    """
     # Si pas de secret configuré, on laisse passer (dev mode)
     if not settings.api_secret:
         logger.warning(f"⚠️ Accès non authentifié à {path} (AXI_API_SECRET non configuré)")
@@ -271,6 +281,27 @@ def check_auth(path: str, method: str, query: dict, headers: dict) -> tuple:
     return False, "Unauthorized - Token invalide ou manquant"
 
 
+def check_auth(path: str, method: str, query: dict, headers: dict) -> tuple:
+    """
+    Vérifie l'authentification pour un endpoint.
+    
+    Les routes enregistrées passent par la politique précalculée du router;
+    check_auth reste utilisé pour les chemins hors table (système, 404).
+    
+    Args:
+        path: Chemin de l'endpoint
+        method: GET, POST, etc.
+        query: Paramètres de requête
+        headers: Headers HTTP
+    
+    Returns:
+        (authorized: bool, error_message: str or None)
+    """
+    if is_public_endpoint(path, method):
+        return True, None
+    return verify_token(path, query, headers)
+
+
 # =============================================================================
 # TABLES V19 (Préfixées pour isolation)
 # =============================================================================
@@ -280,6 +311,7 @@ V19_TABLES = {
     "conversations": "v19_conversations",
     "veille_results": "v19_veille_results",
     "brain": "v19_brain",
+    "email_curseurs": "v19_email_curseurs",
 }
 
 # Liste blanche pour validation SQL (sécurité injection)
@@ -9,6 +9,7 @@ Plan Lumo V3 - Sections 3-4: Base de données sécurisée
 import re
 import logging
 import threading
+import time
 from contextlib import contextmanager
 from typing import Optional, List, Dict, Any, Generator
 
@@ -22,6 +23,7 @@ except ImportError:
     PSYCOPG2_OK = False
 
 from .config import settings, ALLOWED_TABLE_PATTERN, V19_TABLES
+from .metrics import metrics
 
 logger = logging.getLogger("axi_v19.database")
 
@@ -101,7 +103,9 @@ class DatabaseManager:
         
         conn = None
         try:
+            start = time.perf_counter()
             conn = self._pool.getconn()
+            metrics.db_pool_wait.observe(time.perf_counter() - start)
             yield conn
             conn.commit()
         except Exception as e:
@@ -256,6 +260,16 @@ class DatabaseManager:
             )
             """,
             "CREATE INDEX IF NOT EXISTS idx_v19_brain_cat ON v19_brain(category)",
+            
+            # Curseurs de synchronisation IMAP (email watcher)
+            """
+            CREATE TABLE IF NOT EXISTS v19_email_curseurs (
+                dossier VARCHAR(100) PRIMARY KEY,
+                uidvalidity BIGINT NOT NULL,
+                last_uid BIGINT NOT NULL,
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+            )
+            """,
         ]
         
         try:
@@ -0,0 +1,214 @@
+# axi_v19/core/http_cache.py
+"""
+Cache d'artefacts HTTP V19 - Architecture Bunker
+Miroir disque des téléchargements (archives DVF, pages ADEME) avec
+revalidation conditionnelle (ETag / Last-Modified).
+
+- 200: corps écrit sur disque (fichier temporaire puis remplacement atomique)
+- 304: corps servi depuis le disque, rien n'est retéléchargé
+- Erreur réseau: copie disque servie seulement si l'appelant l'accepte
+  (allow_stale=True) et qu'elle a moins de stale_ttl; sinon l'erreur est
+  propagée (boucles de retry, pagination ADEME)
+- Mode hors-ligne (AXI_HTTP_CACHE_OFFLINE=1): disque uniquement, pour
+  rejouer/benchmarker le pipeline d'enrichissement sans réseau
+
+    with http_cache.ouvrir(url, timeout=60) as f:   # fichier binaire
+        ...
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from .metrics import outbound_timer, service_for_url
+
+logger = logging.getLogger("axi_v19.http_cache")
+
+CHUNK_BYTES = 1024 * 1024
+
+
+class CacheMissError(LookupError):
+    """URL absente du cache en mode hors-ligne."""
+    pass
+
+
+class HttpArtifactCache:
+    """
+    Cache disque clé = sha256(url): <clé>.body (corps brut) + <clé>.json
+    (url, etag, last_modified, date). Taille bornée: les entrées les moins
+    récemment utilisées sont supprimées au-delà de max_bytes.
+    """
+
+    def __init__(self, directory: str, offline: bool = False, max_bytes: int = 500 * 1024 * 1024,
+                 stale_ttl: float = 7 * 86400):
+        self.directory = directory
+        self.offline = offline
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl  # Âge max (s) d'une copie servie sur erreur réseau
+        self._lock = threading.Lock()
+        self.hits = 0            # 304: servi depuis le disque après revalidation
+        self.misses = 0          # 200: téléchargé
+        self.offline_served = 0
+        self.stale_served = 0    # Erreur réseau, copie disque servie
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        base = os.path.join(self.directory, key)
+        return f"{base}.body", f"{base}.json"
+
+    @staticmethod
+    def _read_meta(meta_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _count(self, attr: str):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    @staticmethod
+    def _write_meta(meta_path: str, meta: Dict[str, Any]):
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+
+    def _serve_disk(self, body_path: str):
+        os.utime(body_path)  # LRU par date de modification
+        return open(body_path, "rb")
+
+    @contextmanager
+    def ouvrir(self, url: str, headers: Optional[Dict[str, str]] = None,
+               timeout: float = 30, context=None, allow_stale: bool = False):
+        """
+        Produit un fichier binaire (sur disque) avec le corps de la réponse.
+        Les erreurs HTTP autres que 304 sont propagées (HTTPError). Sur
+        erreur réseau, la copie disque n'est servie qu'avec allow_stale=True
+        et si sa dernière validation date de moins de stale_ttl.
+        """
+        body_path, meta_path = self._paths(url)
+        meta = self._read_meta(meta_path) if os.path.exists(body_path) else None
+
+        if self.offline:
+            if meta is None:
+                raise CacheMissError(f"Hors-ligne: {url} absent du cache")
+            self._count("offline_served")
+            with self._serve_disk(body_path) as f:
+                yield f
+            return
+
+        request_headers = dict(headers or {})
+        if meta:
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        req = urllib.request.Request(url, headers=request_headers)
+        try:
+            with outbound_timer(service_for_url(url)):
+                with urllib.request.urlopen(req, timeout=timeout, context=context) as resp:
+                    self._store(resp, url, body_path, meta_path)
+            self._count("misses")
+        except urllib.error.HTTPError as e:
+            if e.code != 304 or meta is None:
+                raise
+            # Copie revalidée: son âge repart de zéro
+            meta["validated_at"] = time.time()
+            self._write_meta(meta_path, meta)
+            self._count("hits")
+        except (urllib.error.URLError, TimeoutError, OSError) as e:
+            if meta is None or not allow_stale:
+                raise
+            age = time.time() - meta.get("validated_at", 0)
+            if age > self.stale_ttl:
+                raise
+            logger.warning(f"⚠️ {url} injoignable ({e}) - copie disque du {meta.get('date')}")
+            self._count("stale_served")
+
+        with self._serve_disk(body_path) as f:
+            yield f
+
+    def lire(self, url: str, **kwargs) -> bytes:
+        """Corps complet en mémoire (réponses JSON)."""
+        with self.ouvrir(url, **kwargs) as f:
+            return f.read()
+
+    def _store(self, resp, url: str, body_path: str, meta_path: str):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = resp.read(CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+            os.replace(tmp_path, body_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        meta = {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "validated_at": time.time(),
+            "size": os.path.getsize(body_path)
+        }
+        self._write_meta(meta_path, meta)
+        self._prune(keep=body_path)
+
+    def _prune(self, keep: Optional[str] = None):
+        """Supprime les corps les moins récemment utilisés au-delà de max_bytes."""
+        try:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".body"):
+                    path = os.path.join(self.directory, name)
+                    st = os.stat(path)
+                    entries.append((st.st_mtime, st.st_size, path))
+        except OSError:
+            return
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            for p in (path, path[:-len(".body")] + ".json"):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "offline": self.offline,
+            "stale_ttl_s": self.stale_ttl,
+            "hits_304": self.hits,
+            "misses": self.misses,
+            "offline_served": self.offline_served,
+            "stale_served": self.stale_served
+        }
+
+
+# Instance globale
+http_cache = HttpArtifactCache(
+    directory=os.environ.get("AXI_HTTP_CACHE_DIR", "/tmp/axi_http_cache"),
+    offline=os.environ.get("AXI_HTTP_CACHE_OFFLINE", "").lower() in ("1", "true", "yes"),
+    max_bytes=int(os.environ.get("AXI_HTTP_CACHE_MAX_MO", "500")) * 1024 * 1024,
+    stale_ttl=float(os.environ.get("AXI_HTTP_CACHE_STALE_MAX_H", "168")) * 3600
+)
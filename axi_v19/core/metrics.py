@@ -0,0 +1,194 @@
+# axi_v19/core/metrics.py
+"""
+Métriques V19 - Architecture Bunker
+Compteurs + histogrammes de latence en mémoire, exposés au format texte
+Prometheus sur GET /metrics.
+
+- Requêtes HTTP: nombre par route/méthode/code, latence, requêtes en cours
+- Pool PostgreSQL: attente de checkout (DatabaseManager.get_connection)
+- Appels sortants: Trello, ADEME, Anthropic, Tavily (outbound_timer)
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse
+
+
+def _log_linear_bounds() -> List[float]:
+    """Bornes log-linéaires (style HDR): 1-1.5-2-3-5-7.5 par décade, 1 ms -> 75 s."""
+    bounds = []
+    for exponent in range(-3, 2):
+        for mantissa in (1, 1.5, 2, 3, 5, 7.5):
+            bounds.append(round(mantissa * 10 ** exponent, 6))
+    return bounds
+
+
+LATENCY_BUCKETS = _log_linear_bounds()
+
+# Hôtes connus -> label "service" des appels sortants
+OUTBOUND_SERVICES = {
+    "api.trello.com": "trello",
+    "data.ademe.fr": "ademe",
+    "api.anthropic.com": "anthropic",
+    "api.tavily.com": "tavily",
+}
+
+
+class Histogram:
+    """Histogramme à bornes fixes, thread-safe."""
+
+    __slots__ = ("bounds", "counts", "total", "count", "_lock")
+
+    def __init__(self, bounds: List[float] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Dernier bucket = +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class MetricsRegistry:
+    """Registre unique du process (instance globale `metrics`)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._http_requests: Dict[Tuple[str, str, int], int] = {}
+        self._http_latency: Dict[Tuple[str, str], Histogram] = {}
+        self._in_flight = 0
+        self.db_pool_wait = Histogram()
+        self._outbound_latency: Dict[str, Histogram] = {}
+        self._outbound_requests: Dict[Tuple[str, str], int] = {}
+        self.started_at = time.time()
+
+    # === HTTP entrant ===
+
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float):
+        with self._lock:
+            self._in_flight -= 1
+            key = (method, route, status)
+            self._http_requests[key] = self._http_requests.get(key, 0) + 1
+            histogram = self._http_latency.get((method, route))
+            if histogram is None:
+                histogram = self._http_latency[(method, route)] = Histogram()
+        histogram.observe(seconds)
+
+    # === Appels sortants ===
+
+    def observe_outbound(self, service: str, outcome: str, seconds: float):
+        with self._lock:
+            key = (service, outcome)
+            self._outbound_requests[key] = self._outbound_requests.get(key, 0) + 1
+            histogram = self._outbound_latency.get(service)
+            if histogram is None:
+                histogram = self._outbound_latency[service] = Histogram()
+        histogram.observe(seconds)
+
+    # === Export Prometheus ===
+
+    @staticmethod
+    def _render_histogram(lines: List[str], name: str, histogram: Histogram, **labels):
+        counts, total, count = histogram.snapshot()
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.bounds, counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_labels(**labels, le=format(bound, 'g'))} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {count}")
+        lines.append(f"{name}_sum{_labels(**labels) if labels else ''} {total:.6f}")
+        lines.append(f"{name}_count{_labels(**labels) if labels else ''} {count}")
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            http_requests = dict(self._http_requests)
+            http_latency = dict(self._http_latency)
+            in_flight = self._in_flight
+            outbound_requests = dict(self._outbound_requests)
+            outbound_latency = dict(self._outbound_latency)
+
+        lines = [
+            "# HELP axi_uptime_seconds Uptime du process V19",
+            "# TYPE axi_uptime_seconds gauge",
+            f"axi_uptime_seconds {time.time() - self.started_at:.0f}",
+            "# HELP axi_http_in_flight_requests Requêtes HTTP en cours de traitement",
+            "# TYPE axi_http_in_flight_requests gauge",
+            f"axi_http_in_flight_requests {in_flight}",
+            "# HELP axi_http_requests_total Requêtes HTTP par route, méthode et code",
+            "# TYPE axi_http_requests_total counter",
+        ]
+        for (method, route, status), value in sorted(http_requests.items()):
+            lines.append(f"axi_http_requests_total{_labels(method=method, route=route, status=status)} {value}")
+
+        lines.append("# HELP axi_http_request_duration_seconds Latence des requêtes HTTP")
+        lines.append("# TYPE axi_http_request_duration_seconds histogram")
+        for (method, route), histogram in sorted(http_latency.items()):
+            self._render_histogram(lines, "axi_http_request_duration_seconds", histogram, method=method, route=route)
+
+        lines.append("# HELP axi_db_pool_wait_seconds Attente de checkout d'une connexion du pool PostgreSQL")
+        lines.append("# TYPE axi_db_pool_wait_seconds histogram")
+        self._render_histogram(lines, "axi_db_pool_wait_seconds", self.db_pool_wait)
+
+        lines.append("# HELP axi_outbound_requests_total Appels HTTP sortants par service et résultat")
+        lines.append("# TYPE axi_outbound_requests_total counter")
+        for (service, outcome), value in sorted(outbound_requests.items()):
+            lines.append(f"axi_outbound_requests_total{_labels(service=service, outcome=outcome)} {value}")
+
+        lines.append("# HELP axi_outbound_request_duration_seconds Latence des appels HTTP sortants")
+        lines.append("# TYPE axi_outbound_request_duration_seconds histogram")
+        for service, histogram in sorted(outbound_latency.items()):
+            self._render_histogram(lines, "axi_outbound_request_duration_seconds", histogram, service=service)
+
+        return "\n".join(lines) + "\n"
+
+
+# Instance globale
+metrics = MetricsRegistry()
+
+
+def service_for_url(url: str) -> str:
+    """Label service d'une URL sortante (hôte brut si inconnu)."""
+    host = urlparse(url).hostname or "unknown"
+    return OUTBOUND_SERVICES.get(host, host)
+
+
+@contextmanager
+def outbound_timer(service: str):
+    """
+    Chronomètre un appel sortant. Usage dans les modules:
+
+        with outbound_timer("trello"):
+            resp = requests.get(...)
+    """
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        metrics.observe_outbound(service, outcome, time.perf_counter() - start)
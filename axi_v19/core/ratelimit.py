@@ -0,0 +1,111 @@
+# axi_v19/core/ratelimit.py
+"""
+Limitation de débit V19 - Architecture Bunker
+Token bucket thread-safe + backoff avec jitter pour les API externes
+(ADEME data-fair, Trello).
+
+trello_bucket est partagé par tous les modules qui appellent Trello avec le
+même token (veille DPE, email watcher): la limite Trello (~100 requêtes /
+10 s par token) vaut pour le process entier.
+
+    bucket = TokenBucket(rate=4, capacity=4)   # 4 req/s, rafale de 4
+    bucket.acquire()                           # bloque jusqu'au jeton suivant
+"""
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+# Codes HTTP qui justifient un nouvel essai
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """
+    Seau à jetons partagé entre threads.
+
+    rate: jetons rechargés par seconde; capacity: rafale maximale.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"rate doit être > 0 ({rate})")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Prend des jetons sans attendre. False si le seau est vide."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.acquired += 1
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> float:
+        """
+        Bloque jusqu'à obtenir les jetons. Retourne le temps d'attente (s).
+        Lève TimeoutError si timeout est dépassé.
+        """
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    waited = now - start
+                    self.acquired += 1
+                    self.waited += waited
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            if timeout is not None and time.monotonic() - start + delay > timeout:
+                raise TimeoutError(f"Pas de jeton disponible en {timeout}s")
+            time.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "acquired": self.acquired,
+            "waited_seconds": round(self.waited, 3)
+        }
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Backoff exponentiel 'full jitter': uniforme sur [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Interprète un en-tête Retry-After (secondes ou date HTTP)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Instance globale: quota Trello du token API, partagé entre modules
+trello_bucket = TokenBucket(
+    rate=float(os.environ.get("TRELLO_REQ_PAR_SEC", "8")),
+    capacity=float(os.environ.get("TRELLO_RAFALE", "10"))
+)
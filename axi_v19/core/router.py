@@ -0,0 +1,143 @@
+# axi_v19/core/router.py
+"""
+Table de routage compilée V19 - Architecture Bunker
+Trie par segments de chemin + paramètres typés + politique d'auth par route.
+
+Remplace le dict exact + liste de regex parcourue linéairement et le scan de
+PUBLIC_ENDPOINTS à chaque requête : dispatch et autorisation = un seul lookup.
+
+    /agent/result/{id}        -> path_params = {"id": "abc"}
+    /prospects/{id:int}       -> path_params = {"id": 42}  (404 si non entier)
+"""
+
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import is_public_endpoint, verify_token
+
+# Convertisseurs de paramètres typés: {nom:type}
+CONVERTERS: Dict[str, Callable[[str], Any]] = {
+    "str": str,
+    "int": int,
+}
+
+_PARAM_RE = re.compile(r'^\{(\w+)(?::(\w+))?\}$')
+
+
+class Route:
+    """Route enregistrée: handler + politique d'auth + limite de concurrence + cache."""
+
+    __slots__ = ("method", "template", "handler", "public", "limit", "cache_ttl", "cache_tags")
+
+    def __init__(self, method: str, template: str, handler: Callable,
+                 public: bool, max_concurrency: Optional[int] = None,
+                 cache_ttl: Optional[float] = None, cache_tags: Tuple[str, ...] = ()):
+        self.method = method
+        self.template = template
+        self.handler = handler
+        self.public = public
+        self.limit = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.cache_ttl = cache_ttl
+        self.cache_tags = tuple(cache_tags)
+
+    def authorize(self, path: str, query: dict, headers: dict) -> Tuple[bool, Optional[str]]:
+        """Politique calculée à l'enregistrement: aucun scan à la requête."""
+        if self.public:
+            return True, None
+        return verify_token(path, query, headers)
+
+
+class _Node:
+    __slots__ = ("static", "params", "routes")
+
+    def __init__(self):
+        self.static: Dict[str, "_Node"] = {}
+        # [(nom, convertisseur, enfant)] dans l'ordre d'enregistrement
+        self.params: List[Tuple[str, Callable[[str], Any], "_Node"]] = []
+        self.routes: Dict[str, Route] = {}
+
+
+class Router:
+    """
+    Trie de routes. Un segment littéral est toujours prioritaire sur un
+    paramètre au même niveau (équivalent de l'ancien "exact puis patterns").
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._count = 0
+
+    @staticmethod
+    def _segments(path: str):
+        return path[1:].split('/') if path.startswith('/') else path.split('/')
+
+    def add(self, method: str, template: str, handler: Callable,
+            public: Optional[bool] = None, max_concurrency: Optional[int] = None,
+            cache_ttl: Optional[float] = None, cache_tags: Tuple[str, ...] = ()) -> Route:
+        """
+        Enregistre une route. public=None: politique déduite des règles de
+        config (PUBLIC_ENDPOINTS, préfixes publics, GET /v19/brain).
+        """
+        method = method.upper()
+        if public is None:
+            public = is_public_endpoint(template, method)
+
+        node = self._root
+        for segment in self._segments(template):
+            match = _PARAM_RE.match(segment)
+            if match:
+                name, type_name = match.group(1), match.group(2) or "str"
+                if type_name not in CONVERTERS:
+                    raise ValueError(f"Type de paramètre inconnu: {type_name} ({template})")
+                conv = CONVERTERS[type_name]
+                for p_name, p_conv, p_child in node.params:
+                    if p_name == name and p_conv is conv:
+                        node = p_child
+                        break
+                else:
+                    child = _Node()
+                    node.params.append((name, conv, child))
+                    node = child
+            else:
+                node = node.static.setdefault(segment, _Node())
+
+        if method not in node.routes:
+            self._count += 1
+        route = Route(method, template, handler, public, max_concurrency, cache_ttl, cache_tags)
+        node.routes[method] = route
+        return route
+
+    def resolve(self, method: str, path: str) -> Tuple[Optional[Route], Optional[Dict[str, Any]]]:
+        """Retourne (route, path_params) ou (None, None)."""
+        params: Dict[str, Any] = {}
+        route = self._walk(self._root, self._segments(path), 0, method, params)
+        if route is None:
+            return None, None
+        return route, params
+
+    def _walk(self, node: _Node, segments, i: int, method: str, params: Dict[str, Any]) -> Optional[Route]:
+        if i == len(segments):
+            return node.routes.get(method)
+
+        segment = segments[i]
+        child = node.static.get(segment)
+        if child is not None:
+            route = self._walk(child, segments, i + 1, method, params)
+            if route is not None:
+                return route
+
+        if segment:
+            for name, conv, child in node.params:
+                try:
+                    value = conv(segment)
+                except ValueError:
+                    continue
+                route = self._walk(child, segments, i + 1, method, params)
+                if route is not None:
+                    params[name] = value
+                    return route
+        return None
+
+    def __len__(self) -> int:
+        return self._count
@@ -6,21 +6,46 @@ Remplace FastAPI par http.server natif (zéro dépendance nouvelle)
 Plan Lumo V3 - Section 5: Serveur HTTP
 + SÉCURISATION API - 4 janvier 2026
 + AGENT SUPPORT - 7 janvier 2026 (headers, routes dynamiques)
++ POOL DE WORKERS - mode "pooled" (file bornée, 503 si saturé, keep-alive HTTP/1.1)
++ RÉPONSES - streaming chunked, compression gzip/brotli, ETag / 304
 """
 
+import gzip
+import hashlib
 import json
 import logging
-import re
+import queue
+import selectors
+import socket
 import threading
-from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from typing import Dict, Any, Callable, Optional, Tuple
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from typing import Dict, Any, Callable, Optional
 from urllib.parse import urlparse, parse_qs
 
 from .config import settings, check_auth
+from .router import Router
 from .database import db
+from .cache import response_cache
+from .metrics import metrics
+
+# Import conditionnel brotli (optionnel, gzip sinon)
+try:
+    import brotli
+    BROTLI_OK = True
+except ImportError:
+    BROTLI_OK = False
 
 logger = logging.getLogger("axi_v19.server")
 
+# Seuils des réponses
+COMPRESS_MIN_BYTES = 1024     # En dessous, la compression ne rapporte rien
+STREAM_MIN_ITEMS = 1000       # Liste (ou dict contenant une liste) à partir de laquelle on streame
+STREAM_CHUNK_BYTES = 16384    # Taille cible d'un chunk HTTP
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+
 
 class AxiRequestHandler(BaseHTTPRequestHandler):
     """
@@ -30,51 +55,71 @@ class AxiRequestHandler(BaseHTTPRequestHandler):
     + Support headers et routes dynamiques pour Agent.
     """
     
-    # Routes enregistrées dynamiquement
+    # Table de routage compilée (dispatch + politique d'auth en un lookup)
+    router: Router = Router()
+    # Vues par méthode (introspection /status, compatibilité)
     routes_get: Dict[str, Callable] = {}
     routes_post: Dict[str, Callable] = {}
-    # Routes avec patterns (regex)
-    routes_get_patterns: list = []  # [(pattern, handler)]
+    routes_get_patterns: list = []  # [(template, handler)]
     routes_post_patterns: list = []
     
+    def _authorize(self, route, path, method, query, headers_dict):
+        """Route enregistrée: politique précalculée. Sinon: règles de config."""
+        if route is not None:
+            return route.authorize(path, query, headers_dict)
+        return check_auth(path, method, query, headers_dict)
+    
+    # Routes système (hors table de routage)
+    SYSTEM_ROUTES = ('/health', '/ready', '/status', '/metrics')
+    
+    def send_response(self, code, message=None):
+        """Mémorise le code HTTP pour les métriques."""
+        self._status_code = code
+        super().send_response(code, message)
+    
+    def _instrumented(self, method: str, handle: Callable):
+        """Compte la requête, mesure sa latence et les requêtes en cours."""
+        self._status_code = None
+        self._route_label = "unmatched"  # Évite l'explosion de cardinalité sur les 404
+        start = time.perf_counter()
+        metrics.request_started()
+        try:
+            handle()
+        finally:
+            metrics.request_finished(method, self._route_label, self._status_code or 500,
+                                     time.perf_counter() - start)
+    
     def do_GET(self):
         """Gère les requêtes GET."""
+        self._instrumented('GET', self._handle_get)
+    
+    def do_POST(self):
+        """Gère les requêtes POST."""
+        self._instrumented('POST', self._handle_post)
+    
+    def _handle_get(self):
         parsed = urlparse(self.path)
         path = parsed.path
         query = parse_qs(parsed.query)
+        route, path_params = self.router.resolve('GET', path)
+        if route is not None:
+            self._route_label = route.template
+        elif path in self.SYSTEM_ROUTES:
+            self._route_label = path
         
         # === AUTHENTIFICATION ===
         headers_dict = {k: v for k, v in self.headers.items()}
-        authorized, error_msg = check_auth(path, 'GET', query, headers_dict)
+        authorized, error_msg = self._authorize(route, path, 'GET', query, headers_dict)
         
         if not authorized:
             self._send_json(401, {"error": error_msg, "code": 401})
             return
         
-        # Routing exact
-        if path in self.routes_get:
-            try:
-                handler = self.routes_get[path]
-                result = self._call_handler(handler, query, None, headers_dict)
-                self._handle_result(result)
-            except Exception as e:
-                logger.error(f"Erreur GET {path}: {e}")
-                self._send_json(500, {"error": str(e)})
+        # Routes enregistrées (exactes ou avec paramètres, ex: /agent/result/{id})
+        if route is not None:
+            self._run_route(route, path, query, None, headers_dict, path_params or None)
             return
         
-        # Routing patterns (ex: /agent/result/{id})
-        for pattern, handler in self.routes_get_patterns:
-            match = pattern.match(path)
-            if match:
-                try:
-                    path_params = match.groupdict()
-                    result = self._call_handler(handler, query, None, headers_dict, path_params)
-                    self._handle_result(result)
-                except Exception as e:
-                    logger.error(f"Erreur GET {path}: {e}")
-                    self._send_json(500, {"error": str(e)})
-                return
-        
         # Routes système
         if path == '/health':
             self._handle_health()
@@ -82,21 +127,27 @@ class AxiRequestHandler(BaseHTTPRequestHandler):
             self._handle_ready()
         elif path == '/status':
             self._handle_status()
+        elif path == '/metrics':
+            self._send_text(200, metrics.render_prometheus(), 'text/plain; version=0.0.4; charset=utf-8')
         else:
             self.send_error(404, f"Endpoint non trouvé: {path}")
     
-    def do_POST(self):
-        """Gère les requêtes POST."""
+    def _handle_post(self):
         parsed = urlparse(self.path)
         path = parsed.path
         query = parse_qs(parsed.query)
+        route, path_params = self.router.resolve('POST', path)
+        if route is not None:
+            self._route_label = route.template
         
         # === AUTHENTIFICATION ===
         headers_dict = {k: v for k, v in self.headers.items()}
-        authorized, error_msg = check_auth(path, 'POST', query, headers_dict)
+        authorized, error_msg = self._authorize(route, path, 'POST', query, headers_dict)
         
         if not authorized:
-            self._send_json(401, {"error": error_msg, "code": 401})
+            # Body non lu: la connexion ne peut pas être réutilisée
+            self.close_connection = True
+            self._send_json(401, {"error": error_msg, "code": 401}, extra_headers={'Connection': 'close'})
             return
         
         # Lire le body
@@ -127,30 +178,11 @@ class AxiRequestHandler(BaseHTTPRequestHandler):
                 self._send_json(400, {"error": "Données invalides"})
                 return
         
-        # Routing exact
-        if path in self.routes_post:
-            try:
-                handler = self.routes_post[path]
-                result = self._call_handler(handler, query, data, headers_dict)
-                self._handle_result(result)
-            except Exception as e:
-                logger.error(f"Erreur POST {path}: {e}")
-                self._send_json(500, {"error": str(e)})
+        # Routes enregistrées (exactes ou avec paramètres, ex: /agent/result/{id})
+        if route is not None:
+            self._run_route(route, path, query, data, headers_dict, path_params or None)
             return
         
-        # Routing patterns (ex: /agent/result/{id})
-        for pattern, handler in self.routes_post_patterns:
-            match = pattern.match(path)
-            if match:
-                try:
-                    path_params = match.groupdict()
-                    result = self._call_handler(handler, query, data, headers_dict, path_params)
-                    self._handle_result(result)
-                except Exception as e:
-                    logger.error(f"Erreur POST {path}: {e}")
-                    self._send_json(500, {"error": str(e)})
-                return
-        
         self.send_error(404, f"Endpoint POST non trouvé: {path}")
     
     def do_OPTIONS(self):
@@ -166,6 +198,45 @@ class AxiRequestHandler(BaseHTTPRequestHandler):
         self.send_header('Content-Length', '0')
         self.end_headers()
     
+    def _run_route(self, route, path, query, body, headers, path_params=None):
+        """Exécute un handler sous sa limite de concurrence éventuelle."""
+        limit = route.limit
+        if limit is not None and not limit.acquire(blocking=False):
+            self._send_json(503, {"error": "Route saturée, réessayer plus tard", "code": 503},
+                            extra_headers={'Retry-After': str(settings.http_retry_after)})
+            return
+        try:
+            if route.cache_ttl and route.method == 'GET':
+                cache_key = response_cache.make_key(path, query)
+                found, result = response_cache.get(cache_key)
+                if not found:
+                    result = self._call_handler(route.handler, query, body, headers, path_params)
+                    if self._is_cacheable(result):
+                        response_cache.set(cache_key, result, route.cache_ttl, route.cache_tags)
+            else:
+                result = self._call_handler(route.handler, query, body, headers, path_params)
+            self._handle_result(result)
+        except Exception as e:
+            logger.error(f"Erreur {route.method} {path}: {e}")
+            if self._status_code is not None:
+                # Réponse déjà commencée (stream, écriture socket): pas de
+                # seconde ligne de statut, le client voit une réponse tronquée
+                self.close_connection = True
+            else:
+                self._send_json(500, {"error": str(e)})
+        finally:
+            if limit is not None:
+                limit.release()
+    
+    @staticmethod
+    def _is_cacheable(result) -> bool:
+        """Seules les réponses réussies sont mises en cache."""
+        if isinstance(result, tuple) and len(result) == 2:
+            code, result = result
+            if code != 200:
+                return False
+        return not (isinstance(result, dict) and "error" in result)
+    
     def _call_handler(self, handler, query, body, headers, path_params=None):
         """Appelle un handler avec les bons arguments."""
         import inspect
@@ -226,16 +297,71 @@ class AxiRequestHandler(BaseHTTPRequestHandler):
             "environment": settings.environment,
             "secured": bool(settings.api_secret),
             "database": db.health_check(),
+            "http": self.server.stats() if hasattr(self.server, "stats") else {"mode": "threading"},
+            "cache": response_cache.stats(),
             "features": ["V19 Bunker", "Chat Interface", "Tavily Search", "Prospects", "Conversations", "Brain", "Auth", "Agent"],
             "public_endpoints": ["/", "/health", "/ready", "/status", "/memory", "/briefing", "/chat", "/trio", "/nouvelle-session", "/agent/status"],
             "protected_endpoints": ["/run-veille", "/run-veille-concurrence", "/v19/brain (POST)", "/agent/execute", "/agent/pending"],
             "endpoints": list(self.routes_get.keys()) + list(self.routes_post.keys()) + [
-                "/health", "/ready", "/status"
+                "/health", "/ready", "/status", "/metrics"
             ]
         })
     
-    def _send_json(self, code: int, data: Any):
-        """Helper pour envoyer des réponses JSON ou HTML avec CORS complet."""
+    def _send_json(self, code: int, data: Any, extra_headers: Optional[Dict[str, str]] = None):
+        """
+        Helper pour envoyer des réponses JSON ou HTML avec CORS complet.
+        
+        - ETag faible + 304 sur If-None-Match (GET 200)
+        - Compression br/gzip selon Accept-Encoding au-delà de COMPRESS_MIN_BYTES
+        - Grosses listes: encodage JSON incrémental en Transfer-Encoding chunked (HTTP/1.1)
+        """
+        cacheable = self.command == 'GET' and code == 200
+        
+        if self._should_stream(data):
+            self._send_json_stream(code, data, extra_headers, cacheable)
+            return
+        
+        # Détecter si c'est du HTML (string commençant par <!DOCTYPE ou <html)
+        if isinstance(data, str) and (data.strip().startswith('<!DOCTYPE') or data.strip().startswith('<html')):
+            content_type = 'text/html; charset=utf-8'
+            payload = data.encode('utf-8')
+        else:
+            content_type = 'application/json; charset=utf-8'
+            payload = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        
+        headers = dict(extra_headers or {})
+        if cacheable:
+            etag = f'W/"{hashlib.md5(payload).hexdigest()}"'
+            if self._etag_matches(etag):
+                self._send_not_modified(etag)
+                return
+            headers['ETag'] = etag
+        
+        encoding = self._negotiate_encoding() if len(payload) >= COMPRESS_MIN_BYTES else None
+        if encoding == 'br':
+            payload = brotli.compress(payload, quality=5)
+        elif encoding == 'gzip':
+            payload = gzip.compress(payload, compresslevel=6)
+        
+        self._send_headers(code, content_type, headers, encoding)
+        # Content-Length obligatoire pour le keep-alive HTTP/1.1
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _send_text(self, code: int, text: str, content_type: str):
+        payload = text.encode('utf-8')
+        encoding = self._negotiate_encoding() if len(payload) >= COMPRESS_MIN_BYTES else None
+        if encoding == 'br':
+            payload = brotli.compress(payload, quality=5)
+        elif encoding == 'gzip':
+            payload = gzip.compress(payload, compresslevel=6)
+        self._send_headers(code, content_type, {}, encoding)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _send_headers(self, code: int, content_type: str, headers: Dict[str, str], encoding: Optional[str]):
         self.send_response(code)
         
         # Headers CORS complets (critiques pour sites vitrines)
@@ -243,16 +369,96 @@ class AxiRequestHandler(BaseHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Requested-With')
         
-        # Détecter si c'est du HTML (string commençant par <!DOCTYPE ou <html)
-        if isinstance(data, str) and (data.strip().startswith('<!DOCTYPE') or data.strip().startswith('<html')):
-            self.send_header('Content-Type', 'text/html; charset=utf-8')
-            self.end_headers()
-            self.wfile.write(data.encode('utf-8'))
+        self.send_header('Content-Type', content_type)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        for name, value in headers.items():
+            self.send_header(name, value)
+    
+    def _should_stream(self, data: Any) -> bool:
+        """Chunked seulement si les deux côtés parlent HTTP/1.1 et que la réponse est volumineuse."""
+        if self.protocol_version != 'HTTP/1.1' or self.request_version != 'HTTP/1.1':
+            return False
+        if isinstance(data, list):
+            return len(data) >= STREAM_MIN_ITEMS
+        if isinstance(data, dict):
+            return any(isinstance(v, list) and len(v) >= STREAM_MIN_ITEMS for v in data.values())
+        return False
+    
+    def _negotiate_encoding(self) -> Optional[str]:
+        accepted = self.headers.get('Accept-Encoding', '')
+        encodings = {part.split(';')[0].strip().lower() for part in accepted.split(',')}
+        if BROTLI_OK and 'br' in encodings:
+            return 'br'
+        if 'gzip' in encodings:
+            return 'gzip'
+        return None
+    
+    def _etag_matches(self, etag: str) -> bool:
+        if_none_match = self.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        candidates = {tag.strip() for tag in if_none_match.split(',')}
+        # Comparaison faible: W/"x" == "x"
+        return '*' in candidates or etag in candidates or etag[2:] in candidates
+    
+    def _send_not_modified(self, etag: str):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def _send_json_stream(self, code: int, data: Any, extra_headers: Optional[Dict[str, str]], cacheable: bool):
+        """Encodage incrémental: la réponse n'est jamais entièrement en mémoire."""
+        headers = dict(extra_headers or {})
+        if cacheable:
+            # Premier passage: empreinte seule (ETag), sans rien conserver
+            digest = hashlib.md5()
+            for fragment in _json_encoder.iterencode(data):
+                digest.update(fragment.encode('utf-8'))
+            etag = f'W/"{digest.hexdigest()}"'
+            if self._etag_matches(etag):
+                self._send_not_modified(etag)
+                return
+            headers['ETag'] = etag
+        
+        encoding = self._negotiate_encoding()
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=5)
+            compress, flush = compressor.process, compressor.finish
+        elif encoding == 'gzip':
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: format gzip
+            compress, flush = compressor.compress, compressor.flush
         else:
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.end_headers()
-            response = json.dumps(data, ensure_ascii=False, default=str)
-            self.wfile.write(response.encode('utf-8'))
+            compress, flush = None, None
+        
+        self._send_headers(code, 'application/json; charset=utf-8', headers, encoding)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        
+        buffer = []
+        size = 0
+        for fragment in _json_encoder.iterencode(data):
+            chunk = fragment.encode('utf-8')
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_CHUNK_BYTES:
+                self._write_chunk(b''.join(buffer), compress)
+                buffer, size = [], 0
+        if buffer:
+            self._write_chunk(b''.join(buffer), compress)
+        if flush:
+            self._write_chunk(flush(), None)
+        self.wfile.write(b'0\r\n\r\n')
+    
+    def _write_chunk(self, chunk: bytes, compress: Optional[Callable[[bytes], bytes]]):
+        if compress:
+            chunk = compress(chunk)
+        if chunk:
+            self.wfile.write(f'{len(chunk):X}\r\n'.encode('ascii') + chunk + b'\r\n')
     
     def log_message(self, format, *args):
         """Redirige les logs HTTP vers notre logger structuré."""
@@ -262,6 +468,225 @@ class AxiRequestHandler(BaseHTTPRequestHandler):
             logger.debug(f"HTTP {self.client_address[0]} - {message}")
 
 
+class PooledRequestHandler(AxiRequestHandler):
+    """
+    Variante HTTP/1.1 du handler pour le mode "pooled".
+    Keep-alive et pipelining, mais une connexion inactive ne garde pas son
+    worker: après chaque réponse (et les requêtes déjà reçues en pipeline),
+    la socket est rendue au serveur qui la surveille hors pool
+    (PooledHTTPServer._park) jusqu'à la requête suivante.
+    """
+    
+    protocol_version = "HTTP/1.1"
+    
+    def setup(self):
+        self.timeout = settings.http_keepalive_timeout
+        self.keep_alive = False
+        super().setup()
+    
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self._requete_en_tampon():
+            self.handle_one_request()
+        self.keep_alive = not self.close_connection
+    
+    def _requete_en_tampon(self) -> bool:
+        """Octets déjà reçus (pipeline)? Lecture non bloquante du tampon rfile."""
+        try:
+            self.connection.setblocking(False)
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            try:
+                self.connection.settimeout(self.timeout)
+            except OSError:
+                pass
+    
+    def end_headers(self):
+        # D'autres clients attendent un worker: on annonce la fermeture
+        # (send_header('Connection', 'close') positionne close_connection)
+        if not self.close_connection and self.server.is_saturated():
+            self.send_header('Connection', 'close')
+        super().end_headers()
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer à pool de workers borné.
+    
+    Le thread d'accept dépose les sockets dans une file bornée consommée par
+    N workers. File pleine: 503 + Retry-After écrit sur la socket en non
+    bloquant, sans mobiliser de worker (backpressure). Les connexions
+    keep-alive inactives sont surveillées par un sélecteur (thread "park")
+    et remises en file dès qu'une requête arrive, fermées après
+    http_keepalive_timeout.
+    """
+    
+    daemon_threads = True
+    request_queue_size = 1024  # Backlog listen()
+    PARK_TICK = 0.25
+    
+    def __init__(self, server_address, handler_class, workers: int, queue_size: int):
+        super().__init__(server_address, handler_class)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._workers = []
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+        self.rejected = 0
+        self._closing = False
+        self._selector = selectors.DefaultSelector()
+        self._parked: Dict[Any, tuple] = {}  # socket -> (client_address, échéance)
+        self._park_lock = threading.Lock()
+        # Réveil du sélecteur quand une socket est garée (sinon attente du tick)
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        for i in range(workers):
+            t = threading.Thread(target=self._worker, name=f"axi-http-{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+        self._park_thread = threading.Thread(target=self._park_loop, name="axi-http-park", daemon=True)
+        self._park_thread.start()
+    
+    def process_request(self, request, client_address):
+        """Appelé par le thread d'accept: mise en file, jamais bloquant."""
+        self._enqueue(request, client_address)
+    
+    def _enqueue(self, request, client_address):
+        try:
+            self._queue.put_nowait((request, client_address))
+        except queue.Full:
+            self.rejected += 1
+            self._reject(request)
+    
+    def _reject(self, request):
+        body = json.dumps({"error": "Serveur saturé, réessayer plus tard", "code": 503}).encode('utf-8')
+        response = (
+            "HTTP/1.1 503 Service Unavailable\r\n"
+            f"Retry-After: {settings.http_retry_after}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode('ascii') + body
+        try:
+            # Non bloquant: ~300 octets tiennent dans le tampon d'émission;
+            # un client qui ne lit pas ne bloque jamais le thread d'accept
+            request.setblocking(False)
+            request.send(response)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+    
+    def finish_request(self, request, client_address):
+        return self.RequestHandlerClass(request, client_address, self)
+    
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            request, client_address = item
+            with self._busy_lock:
+                self._busy += 1
+            keep_alive = False
+            try:
+                handler = self.finish_request(request, client_address)
+                keep_alive = getattr(handler, "keep_alive", False)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                if keep_alive and not self._closing:
+                    self._park(request, client_address)
+                else:
+                    self.shutdown_request(request)
+                with self._busy_lock:
+                    self._busy -= 1
+    
+    # === Connexions keep-alive inactives ===
+    
+    def _park(self, request, client_address):
+        with self._park_lock:
+            try:
+                self._selector.register(request, selectors.EVENT_READ)
+            except (ValueError, KeyError, OSError):
+                self.shutdown_request(request)
+                return
+            self._parked[request] = (client_address, time.monotonic() + settings.http_keepalive_timeout)
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass  # Tampon plein: un réveil est déjà en attente
+    
+    def _unpark(self, request):
+        self._selector.unregister(request)
+        return self._parked.pop(request)[0]
+    
+    def _park_loop(self):
+        while not self._closing:
+            try:
+                events = self._selector.select(timeout=self.PARK_TICK)
+            except (OSError, ValueError):
+                if self._closing:
+                    return
+                raise
+            prets, expires = [], []
+            with self._park_lock:
+                for key, _ in events:
+                    if key.fileobj is self._wake_r:
+                        try:
+                            while self._wake_r.recv(4096):
+                                pass
+                        except OSError:
+                            pass
+                    elif key.fileobj in self._parked:
+                        prets.append((key.fileobj, self._unpark(key.fileobj)))
+                now = time.monotonic()
+                for request, (_, deadline) in list(self._parked.items()):
+                    if deadline <= now:
+                        self._unpark(request)
+                        expires.append(request)
+            for request, client_address in prets:
+                self._enqueue(request, client_address)
+            for request in expires:
+                self.shutdown_request(request)
+    
+    def is_saturated(self) -> bool:
+        """Des connexions attendent un worker (keep-alive à libérer)."""
+        return not self._queue.empty()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "pooled",
+            "workers": len(self._workers),
+            "busy": self._busy,
+            "queued": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "parked": len(self._parked),
+            "rejected": self.rejected
+        }
+    
+    def server_close(self):
+        self._closing = True
+        super().server_close()
+        with self._park_lock:
+            for request in list(self._parked):
+                self._unpark(request)
+                self.shutdown_request(request)
+        self._park_thread.join(timeout=1)
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+        for _ in self._workers:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+
+
 class ServerManager:
     """
     Gestionnaire du serveur HTTP threadé.
@@ -269,41 +694,48 @@ class ServerManager:
     """
     
     def __init__(self):
-        self._server: Optional[ThreadingHTTPServer] = None
+        self._server: Optional[HTTPServer] = None
         self._thread: Optional[threading.Thread] = None
         self._running = False
     
-    def register_route(self, method: str, path: str, handler: Callable):
+    def register_route(self, method: str, path: str, handler: Callable,
+                       max_concurrency: Optional[int] = None, public: Optional[bool] = None,
+                       cache_ttl: Optional[float] = None, cache_tags: tuple = ()):
         """
         Enregistre une route dynamiquement.
-        Supporte les patterns avec {param} (ex: /agent/result/{id})
+        Supporte les paramètres {param} et typés {param:int} (ex: /agent/result/{id})
         
         Args:
             method: 'GET' ou 'POST'
             path: Chemin de l'endpoint (ex: '/api/prospects' ou '/agent/result/{id}')
             handler: Fonction qui traite la requête
+            max_concurrency: Nombre max d'exécutions simultanées (503 au-delà)
+            public: Force la politique d'auth (défaut: règles de config.py)
+            cache_ttl: GET uniquement - durée de cache de la réponse (secondes)
+            cache_tags: Tags d'invalidation du cache (voir invalidate_cache)
         """
-        # Détecter si c'est un pattern
-        if '{' in path:
-            # Convertir /agent/result/{id} en regex /agent/result/(?P<id>[^/]+)
-            pattern_str = re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', path)
-            pattern = re.compile(f'^{pattern_str}$')
-            
-            if method.upper() == 'GET':
-                AxiRequestHandler.routes_get_patterns.append((pattern, handler))
-                logger.info(f"📍 Route GET pattern {path} enregistrée")
-            elif method.upper() == 'POST':
-                AxiRequestHandler.routes_post_patterns.append((pattern, handler))
-                logger.info(f"📍 Route POST pattern {path} enregistrée")
+        method = method.upper()
+        if method not in ('GET', 'POST'):
+            raise ValueError(f"Méthode HTTP non supportée: {method}")
+        
+        route = AxiRequestHandler.router.add(method, path, handler, public=public,
+                                             max_concurrency=max_concurrency,
+                                             cache_ttl=cache_ttl, cache_tags=cache_tags)
+        
+        is_pattern = '{' in path
+        if is_pattern:
+            patterns = AxiRequestHandler.routes_get_patterns if method == 'GET' else AxiRequestHandler.routes_post_patterns
+            patterns.append((path, handler))
         else:
-            if method.upper() == 'GET':
-                AxiRequestHandler.routes_get[path] = handler
-                logger.info(f"📍 Route GET {path} enregistrée")
-            elif method.upper() == 'POST':
-                AxiRequestHandler.routes_post[path] = handler
-                logger.info(f"📍 Route POST {path} enregistrée")
-            else:
-                raise ValueError(f"Méthode HTTP non supportée: {method}")
+            routes = AxiRequestHandler.routes_get if method == 'GET' else AxiRequestHandler.routes_post
+            routes[path] = handler
+        
+        logger.info(f"📍 Route {method}{' pattern' if is_pattern else ''} {path} enregistrée"
+                    f"{'' if route.public else ' (protégée)'}")
+    
+    def invalidate_cache(self, *tags: str) -> int:
+        """Invalide les réponses en cache portant ces tags (hooks d'écriture)."""
+        return response_cache.invalidate(*tags)
     
     def start(self):
         """Démarre le serveur HTTP dans un thread séparé."""
@@ -312,10 +744,19 @@ class ServerManager:
             return
         
         try:
-            self._server = ThreadingHTTPServer(
-                (settings.http_host, settings.http_port),
-                AxiRequestHandler
-            )
+            if settings.http_mode == "pooled":
+                self._server = PooledHTTPServer(
+                    (settings.http_host, settings.http_port),
+                    PooledRequestHandler,
+                    workers=settings.http_workers,
+                    queue_size=settings.http_queue_size
+                )
+                logger.info(f"🧵 Mode pooled: {settings.http_workers} workers, file {settings.http_queue_size}")
+            else:
+                self._server = ThreadingHTTPServer(
+                    (settings.http_host, settings.http_port),
+                    AxiRequestHandler
+                )
             self._thread = threading.Thread(target=self._serve, daemon=True)
             self._thread.start()
             self._running = True
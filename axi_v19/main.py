@@ -148,7 +148,7 @@ try:
     print("  ✅ chat_vitrine V2: loaded", flush=True)
     
     # Import Email Watcher (IMAP polling agence@icidordogne.fr)
-    from .modules.email_watcher import process_new_emails, handle_check_emails, handle_email_status, handle_move_email, debug_imap_search, handle_scan_all, handle_test_create_card, handle_v2_test
+    from .modules.email_watcher import process_new_emails, poll_fallback, demarrer_idle, arreter_idle, handle_check_emails, handle_email_status, handle_move_email, debug_imap_search, handle_scan_all, handle_test_create_card, handle_v2_test
     print("  ✅ email_watcher: loaded", flush=True)
     
     print("  ✅ modules.trello loaded (Sync + Matching)", flush=True)
@@ -281,16 +281,16 @@ class AxiV19:
             logger.info("📡 Job Veille Concurrence programmé: 7h00 Paris")
         
         
-        # Email Watcher - Poll toutes les 5 minutes
+        # Email Watcher - Poll de secours toutes les 5 minutes (IMAP IDLE en push)
         try:
             self._scheduler.add_job(
-                process_new_emails,
+                poll_fallback,
                 'interval',
                 minutes=5,
                 id='email_watcher',
-                name='Email Watcher IMAP'
+                name='Email Watcher IMAP (secours IDLE)'
             )
-            logger.info("📧 Job Email Watcher programmé: toutes les 5 minutes")
+            logger.info("📧 Job Email Watcher programmé: toutes les 5 minutes (secours IDLE)")
         except Exception as e:
             logger.warning(f"⚠️ Email Watcher non activé: {e}")
         else:
@@ -368,6 +368,7 @@ class AxiV19:
                     (category, key, value, data.get('metadata', '{}')),
                     table_name="v19_brain"
                 )
+                server.invalidate_cache("brain")
                 return {"success": True, "category": category, "key": key}
             except Exception as e:
                 return {"error": str(e), "success": False}
@@ -391,7 +392,7 @@ class AxiV19:
         
         # Enregistrement des routes API
         server.register_route('GET', '/v19/prospects', get_prospects)
-        server.register_route('GET', '/v19/brain', get_brain)
+        server.register_route('GET', '/v19/brain', get_brain, cache_ttl=300, cache_tags=("brain",))
         server.register_route('POST', '/v19/brain', post_brain)
         server.register_route('GET', '/v19/veille', get_veille_results)
         
@@ -525,6 +526,13 @@ class AxiV19:
         # 7. Démarrage scheduler
         self._init_scheduler()
         
+        # 7b. Email Watcher en push (IMAP IDLE)
+        if TRELLO_OK:
+            try:
+                demarrer_idle()
+            except Exception as e:
+                logger.warning(f"⚠️ IMAP IDLE non démarré: {e}")
+        
         # 8. Message de bienvenue
         logger.info("=" * 60)
         logger.info("🎉 AXI V19.4 est opérationnel et en attente")
@@ -554,6 +562,10 @@ class AxiV19:
             self._scheduler.shutdown(wait=True)
             logger.info("✅ Scheduler arrêté")
         
+        # 1b. Arrêter la session IMAP IDLE
+        if TRELLO_OK:
+            arreter_idle()
+        
         # 2. Arrêter le serveur HTTP
         server.stop()
         
@@ -12,6 +12,8 @@ import requests
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 
+from ..core.metrics import outbound_timer
+
 logger = logging.getLogger("axi_v19.chat")
 
 # =============================================================================
@@ -106,21 +108,22 @@ def generate_response(messages: List[Dict], system_prompt: str, search_results:
         system += context
     
     try:
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": ANTHROPIC_API_KEY,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json"
-            },
-            json={
-                "model": "claude-sonnet-4-20250514",
-                "max_tokens": 2048,
-                "system": system,
-                "messages": messages
-            },
-            timeout=60
-        )
+        with outbound_timer("anthropic"):
+            response = requests.post(
+                "https://api.anthropic.com/v1/messages",
+                headers={
+                    "x-api-key": ANTHROPIC_API_KEY,
+                    "anthropic-version": "2023-06-01",
+                    "content-type": "application/json"
+                },
+                json={
+                    "model": "claude-sonnet-4-20250514",
+                    "max_tokens": 2048,
+                    "system": system,
+                    "messages": messages
+                },
+                timeout=60
+            )
         
         if response.status_code == 200:
             return response.json()["content"][0]["text"]
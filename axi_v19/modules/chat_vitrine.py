@@ -22,6 +22,8 @@ from typing import Dict, Any, Optional, List
 import requests
 from datetime import datetime
 
+from ..core.metrics import outbound_timer
+
 logger = logging.getLogger("axi_v19.chat_vitrine")
 
 # =============================================================================
@@ -319,11 +321,12 @@ def search_web(query: str, domains: List[str] = None) -> str:
         return ""
     default_domains = ["bordeaux.fr", "lormont.fr", "seloger.com", "leboncoin.fr", "meilleursagents.com"]
     try:
-        response = requests.post(
-            "https://api.tavily.com/search",
-            json={"api_key": TAVILY_API_KEY, "query": query, "search_depth": "basic", "max_results": 3, "include_domains": domains or default_domains},
-            timeout=8
-        )
+        with outbound_timer("tavily"):
+            response = requests.post(
+                "https://api.tavily.com/search",
+                json={"api_key": TAVILY_API_KEY, "query": query, "search_depth": "basic", "max_results": 3, "include_domains": domains or default_domains},
+                timeout=8
+            )
         if response.status_code == 200:
             results = response.json().get("results", [])
             if results:
@@ -453,12 +456,13 @@ def chat_vitrine_handler(body: Dict[str, Any]) -> Dict[str, Any]:
         if not ANTHROPIC_API_KEY:
             return {"content": [{"type": "text", "text": "Erreur technique. Appelez le 05 53 13 33 33 !"}], "error": "API non configurée"}
         system_prompt = build_system_prompt(bien, langue)
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={"x-api-key": ANTHROPIC_API_KEY, "anthropic-version": "2023-06-01", "content-type": "application/json"},
-            json={"model": "claude-sonnet-4-20250514", "max_tokens": 600, "system": system_prompt, "messages": messages},
-            timeout=30
-        )
+        with outbound_timer("anthropic"):
+            response = requests.post(
+                "https://api.anthropic.com/v1/messages",
+                headers={"x-api-key": ANTHROPIC_API_KEY, "anthropic-version": "2023-06-01", "content-type": "application/json"},
+                json={"model": "claude-sonnet-4-20250514", "max_tokens": 600, "system": system_prompt, "messages": messages},
+                timeout=30
+            )
         if response.status_code != 200:
             return {"content": [{"type": "text", "text": "Erreur technique. Appelez le 05 53 13 33 33 !"}], "error": f"API error: {response.status_code}"}
         result = response.json()
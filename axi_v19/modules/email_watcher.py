@@ -23,6 +23,8 @@ RÈGLE D'OR: Ce module ne doit RIEN exécuter lors de l'import.
 import os
 import re
 import json
+import base64
+import quopri
 import imaplib
 import email
 import logging
@@ -30,9 +32,18 @@ import urllib.request
 import urllib.parse
 import time
 import html
+import select
+import difflib
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from email.header import decode_header
 from datetime import datetime
-from typing import Optional, List, Dict, Tuple
+from typing import Callable, Optional, List, Dict, Tuple
+
+from ..core.database import db
+from ..core.metrics import outbound_timer
+from ..core.ratelimit import backoff_delay, trello_bucket
 
 # =============================================================================
 # UTILITAIRES EMAIL (ajouté 13/01/2026 - recommandé par Lumo)
@@ -164,7 +175,8 @@ def trello_request(method: str, endpoint: str, data: dict = None) -> Optional[di
         logger.error("Credentials Trello manquants")
         return None
     
-    url = f"https://api.trello.com/1{endpoint}?key={TRELLO_KEY}&token={TRELLO_TOKEN}"
+    sep = "&" if "?" in endpoint else "?"
+    url = f"https://api.trello.com/1{endpoint}{sep}key={TRELLO_KEY}&token={TRELLO_TOKEN}"
     
     try:
         if data:
@@ -173,8 +185,9 @@ def trello_request(method: str, endpoint: str, data: dict = None) -> Optional[di
             encoded_data = None
         
         req = urllib.request.Request(url, data=encoded_data, method=method)
+        trello_bucket.acquire()  # Quota du token partagé avec la veille DPE
         
-        with urllib.request.urlopen(req, timeout=30) as resp:
+        with outbound_timer("trello"), urllib.request.urlopen(req, timeout=30) as resp:
             return json.loads(resp.read().decode())
     
     except Exception as e:
@@ -201,50 +214,318 @@ def trello_put(endpoint: str, data: dict) -> Optional[dict]:
 # VÉRIFICATION DOUBLON
 # =============================================================================
 
-def check_prospect_exists(nom: str, prenom: str = "", email_addr: str = "") -> Optional[Dict]:
-    """
-    Vérifie si un prospect existe déjà dans Trello (tous les boards).
-    Retourne les infos de la carte si trouvée, None sinon.
-    """
+# Index local de toutes les cartes acquéreurs (actives et archivées), par
+# email, téléphone et nom normalisés. Chargement complet au premier usage puis
+# rafraîchissement incrémental depuis les actions du board, au plus toutes les
+# INDEX_PROSPECTS_RAFRAICHISSEMENT s. Le test de doublon est une recherche
+# locale: seuls email, téléphone et nom exact (normalisé) font un doublon; un
+# nom proche (score flou) est journalisé comme indice sans bloquer la
+# création. La recherche Trello /search ne sert plus que si l'index n'a pas
+# pu être chargé.
+#
+# Périmètre: les boards où le watcher crée les cartes prospects (ACQUÉREURS
+# par défaut), et non plus tous les boards du compte comme l'ancien /search;
+# une carte homonyme sur le board BIENS n'est pas un prospect. Le repli
+# /search est restreint aux mêmes boards. Élargir via INDEX_PROSPECTS_BOARDS
+# (ids séparés par des virgules).
+
+INDEX_PROSPECTS_BOARDS = [b.strip() for b in os.getenv("INDEX_PROSPECTS_BOARDS", BOARD_ACQUEREURS).split(",")
+                          if b.strip()]
+INDEX_PROSPECTS_RAFRAICHISSEMENT = int(os.getenv("INDEX_PROSPECTS_RAFRAICHISSEMENT", "60"))
+INDEX_PROSPECTS_SEUIL_FLOU = 0.88
+_TRELLO_PAGE_CARTES = 1000
+_TRELLO_PAGE_ACTIONS = 1000
+_TRELLO_BATCH_MAX = 10
+_ACTIONS_CARTES = ("createCard,updateCard,deleteCard,copyCard,moveCardToBoard,"
+                   "moveCardFromBoard,convertToCardFromCheckItem")
+_CHAMPS_CARTES = "name,desc,closed,shortUrl,idBoard"
+_NOMS_GENERIQUES = {"PROSPECT"}
+
+_TEL_RE = re.compile(r'(?:\+33|0033|0)\s*[1-9](?:[\s.\-]*\d{2}){4}')
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+')
+
+
+def normaliser_nom(nom: str) -> str:
+    """'Dupont Jean-Pierre - 0612345678' -> 'DUPONT JEAN PIERRE' (mots triés, sans accents)."""
+    if not nom:
+        return ""
+    nom = nom.split(" - ")[0]  # Suffixe téléphone des cartes V2
+    nom = unicodedata.normalize("NFKD", nom).encode("ascii", "ignore").decode()
+    cle = " ".join(sorted(re.findall(r"[A-Z]{2,}", nom.upper())))
+    return "" if cle in _NOMS_GENERIQUES else cle
+
+
+def normaliser_email(email_addr: str) -> str:
+    return (email_addr or "").strip().lower()
+
+
+def normaliser_tel(tel: str) -> str:
+    """9 derniers chiffres (indépendant de 0 / +33 / séparateurs)."""
+    chiffres = re.sub(r"\D", "", tel or "")
+    return chiffres[-9:] if len(chiffres) >= 9 else ""
+
+
+class IndexProspects:
+    """Index des cartes prospects des boards INDEX_PROSPECTS_BOARDS."""
+
+    def __init__(self, boards: List[str]):
+        self.boards = boards
+        self._lock = threading.RLock()
+        self._cartes: Dict[str, Dict] = {}
+        self._par_email: Dict[str, set] = {}
+        self._par_tel: Dict[str, set] = {}
+        self._par_nom: Dict[str, set] = {}
+        self._par_mot: Dict[str, set] = {}
+        self._derniere_action: Dict[str, Optional[str]] = {}
+        self.charge = False
+        self._rafraichi = 0.0
+        self.chargements = 0
+        self.rafraichissements = 0
+        self.actions_lues = 0
+        self.recherches = 0
+
+    # === Maintenance ===
+
+    def _desindexer(self, card_id: str):
+        carte = self._cartes.pop(card_id, None)
+        if not carte:
+            return
+        for table, cles in ((self._par_email, carte["_emails"]), (self._par_tel, carte["_tels"]),
+                            (self._par_nom, [carte["_nom"]]), (self._par_mot, carte["_nom"].split())):
+            for cle in cles:
+                ids = table.get(cle)
+                if ids:
+                    ids.discard(card_id)
+                    if not ids:
+                        del table[cle]
+
+    def _indexer(self, card: Dict):
+        card_id = card.get("id")
+        if not card_id:
+            return
+        self._desindexer(card_id)
+        texte = f"{card.get('name', '')}\n{card.get('desc', '')}"
+        carte = {
+            "id": card_id,
+            "name": card.get("name", ""),
+            "shortUrl": card.get("shortUrl") or card.get("url"),
+            "idBoard": card.get("idBoard"),
+            "closed": bool(card.get("closed")),
+            "_nom": normaliser_nom(card.get("name", "")),
+            "_emails": {normaliser_email(e) for e in _EMAIL_RE.findall(texte)},
+            "_tels": {t for t in (normaliser_tel(m) for m in _TEL_RE.findall(texte)) if t},
+        }
+        self._cartes[card_id] = carte
+        for e in carte["_emails"]:
+            self._par_email.setdefault(e, set()).add(card_id)
+        for t in carte["_tels"]:
+            self._par_tel.setdefault(t, set()).add(card_id)
+        if carte["_nom"]:
+            self._par_nom.setdefault(carte["_nom"], set()).add(card_id)
+            for mot in carte["_nom"].split():
+                self._par_mot.setdefault(mot, set()).add(card_id)
+
+    def ajouter_carte(self, card: Dict):
+        """Indexe une carte tout juste créée (sans attendre les actions du board)."""
+        with self._lock:
+            self._indexer(card)
+
+    def _charger_board(self, board: str) -> bool:
+        # Position dans le flux d'actions AVANT la liste: rien n'est perdu entre les deux
+        actions = trello_get(f"/boards/{board}/actions?filter={_ACTIONS_CARTES}&limit=1&fields=id")
+        if actions is None:
+            return False
+        cartes, before = [], None
+        while True:
+            page = trello_get(f"/boards/{board}/cards/all?fields={_CHAMPS_CARTES}&limit={_TRELLO_PAGE_CARTES}"
+                              + (f"&before={before}" if before else ""))
+            if page is None:
+                return False
+            cartes.extend(page)
+            if len(page) < _TRELLO_PAGE_CARTES:
+                break
+            before = min(c["id"] for c in page)
+
+        for card_id in [cid for cid, c in self._cartes.items() if c["idBoard"] == board]:
+            self._desindexer(card_id)
+        for card in cartes:
+            self._indexer(card)
+        self._derniere_action[board] = actions[0]["id"] if actions else None
+        return True
+
+    def _relire_cartes(self, card_ids: List[str]):
+        """Relit des cartes par lots via /batch (10 URLs par requête)."""
+        for i in range(0, len(card_ids), _TRELLO_BATCH_MAX):
+            lot = card_ids[i:i + _TRELLO_BATCH_MAX]
+            urls = ",".join(f"/cards/{cid}" for cid in lot)
+            reponses = trello_get(f"/batch?urls={urllib.parse.quote(urls, safe='/,')}")
+            if reponses is None:
+                raise RuntimeError("Trello /batch indisponible")
+            for card_id, reponse in zip(lot, reponses):
+                card = reponse.get("200") if isinstance(reponse, dict) else None
+                if card and card.get("idBoard") in self.boards:
+                    self._indexer(card)
+                elif card or "404" in (reponse or {}):
+                    self._desindexer(card_id)  # Supprimée ou partie sur un autre board
+
+    def _rafraichir_board(self, board: str) -> bool:
+        depuis = self._derniere_action.get(board)
+        actions = trello_get(f"/boards/{board}/actions?filter={_ACTIONS_CARTES}&limit={_TRELLO_PAGE_ACTIONS}"
+                             f"&fields=id,type,data" + (f"&since={depuis}" if depuis else ""))
+        if actions is None:
+            return False
+        if len(actions) >= _TRELLO_PAGE_ACTIONS:
+            return self._charger_board(board)  # Trop de retard: rechargement complet
+        if not actions:
+            return True
+
+        self.actions_lues += len(actions)
+        a_relire = []
+        for action in reversed(actions):  # Plus ancienne d'abord
+            card_id = (action.get("data") or {}).get("card", {}).get("id")
+            if not card_id:
+                continue
+            if action.get("type") in ("deleteCard", "moveCardFromBoard"):
+                self._desindexer(card_id)
+                if card_id in a_relire:
+                    a_relire.remove(card_id)
+            elif card_id not in a_relire:
+                a_relire.append(card_id)
+        self._relire_cartes(a_relire)
+        self._derniere_action[board] = actions[0]["id"]  # Plus récente en tête
+        return True
+
+    def assurer_frais(self) -> bool:
+        """Charge ou rafraîchit l'index si nécessaire. False si inutilisable."""
+        with self._lock:
+            if self.charge and time.time() - self._rafraichi < INDEX_PROSPECTS_RAFRAICHISSEMENT:
+                return True
+            try:
+                if not self.charge:
+                    self.charge = all(self._charger_board(b) for b in self.boards)
+                    if self.charge:
+                        self.chargements += 1
+                        logger.info(f"📇 Index prospects chargé: {len(self._cartes)} cartes")
+                else:
+                    if all(self._rafraichir_board(b) for b in self.boards):
+                        self.rafraichissements += 1
+                    # Échec réseau: l'index existant reste utilisable
+                if self.charge:
+                    self._rafraichi = time.time()
+            except Exception as e:
+                logger.warning(f"⚠️ Index prospects: {e}")
+            return self.charge
+
+    # === Recherche ===
+
+    def rechercher(self, nom: str = "", email_addr: str = "", tel: str = "") -> List[Tuple[Dict, str, float]]:
+        """
+        Cartes correspondantes, les plus sûres d'abord: (carte, motif, score)
+        avec motif email | tel | nom | nom_flou. À motif égal, actives avant
+        archivées.
+        """
+        cle_nom, cle_email, cle_tel = normaliser_nom(nom), normaliser_email(email_addr), normaliser_tel(tel)
+        trouves: Dict[str, Tuple[int, str, float]] = {}
+        with self._lock:
+            self.recherches += 1
+            for rang, motif, ids in ((0, "email", self._par_email.get(cle_email) if cle_email else None),
+                                     (1, "tel", self._par_tel.get(cle_tel) if cle_tel else None),
+                                     (2, "nom", self._par_nom.get(cle_nom) if cle_nom else None)):
+                for card_id in ids or ():
+                    trouves.setdefault(card_id, (rang, motif, 1.0))
+
+            if cle_nom:
+                candidats = set()
+                for mot in cle_nom.split():
+                    candidats |= self._par_mot.get(mot, set())
+                for card_id in candidats - trouves.keys():
+                    score = difflib.SequenceMatcher(None, cle_nom, self._cartes[card_id]["_nom"]).ratio()
+                    if score >= INDEX_PROSPECTS_SEUIL_FLOU:
+                        trouves[card_id] = (3, "nom_flou", score)
+
+            resultats = [(self._cartes[cid], motif, score, rang) for cid, (rang, motif, score) in trouves.items()]
+        resultats.sort(key=lambda r: (r[3], r[0]["closed"], -r[2]))
+        return [(carte, motif, round(score, 3)) for carte, motif, score, _ in resultats]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "charge": self.charge,
+                "cartes": len(self._cartes),
+                "archivees": sum(1 for c in self._cartes.values() if c["closed"]),
+                "rafraichi": datetime.fromtimestamp(self._rafraichi).isoformat() if self._rafraichi else None,
+                "chargements": self.chargements,
+                "rafraichissements": self.rafraichissements,
+                "actions_lues": self.actions_lues,
+                "recherches": self.recherches
+            }
+
+
+_index_prospects = IndexProspects(INDEX_PROSPECTS_BOARDS)
+
+
+def _rechercher_cartes_trello(nom: str, email_addr: str) -> List[Dict]:
+    """Repli réseau (index indisponible): /search Trello filtré sur le nom."""
     search_terms = []
-    
     if nom:
         search_terms.append(nom.upper())
-    if prenom:
-        search_terms.append(prenom)
     if email_addr and "@" in email_addr:
         search_terms.append(email_addr.split("@")[0])
-    
     if not search_terms:
-        return None
+        return []
     
     query = " ".join(search_terms[:2])
-    
-    logger.info(f"🔍 Recherche doublon: '{query}'")
-    
-    result = trello_get(f"/search?query={urllib.parse.quote(query)}&modelTypes=cards&card_fields=name,shortUrl,idBoard,closed")
-    
-    if not result or not result.get("cards"):
-        return None
-    
+    logger.info(f"🔍 Recherche doublon Trello: '{query}'")
+    result = trello_get(
+        f"/search?query={urllib.parse.quote(query)}&modelTypes=cards"
+        f"&idBoards={','.join(INDEX_PROSPECTS_BOARDS)}"
+        f"&card_fields=name,shortUrl,idBoard,closed&cards_limit=20"
+    )
     nom_upper = nom.upper() if nom else ""
+    return [card for card in (result or {}).get("cards", [])
+            if nom_upper and nom_upper in card.get("name", "").upper()]
+
+
+def _cartes_doublons(nom: str, email_addr: str, tel: str) -> List[Dict]:
+    """
+    Doublons (index local, sinon /search), les plus sûrs d'abord. Un nom
+    seulement proche n'est qu'un indice: journalisé, jamais renvoyé.
+    """
+    if _index_prospects.assurer_frais():
+        resultats = _index_prospects.rechercher(nom, email_addr, tel)
+        doublons = [(carte, motif, score) for carte, motif, score in resultats if motif != "nom_flou"]
+        for carte, motif, score in doublons[:1]:
+            logger.info(f"🔍 Doublon index local ({motif}): {carte['name']}")
+        if not doublons:
+            for carte, _, score in resultats[:3]:
+                logger.info(f"ℹ️ Nom proche de '{nom}' ({score}): {carte['name']} - "
+                            f"{carte.get('shortUrl')} (indice, création maintenue)")
+        return [carte for carte, _, _ in doublons]
+    return _rechercher_cartes_trello(nom, email_addr)
+
+
+def check_prospect_exists(nom: str, prenom: str = "", email_addr: str = "", tel: str = "") -> Optional[Dict]:
+    """
+    Vérifie si un prospect existe déjà dans Trello (carte active).
+    Retourne les infos de la carte si trouvée, None sinon.
+    """
+    nom_complet = f"{nom} {prenom}".strip()
+    if not (nom_complet or email_addr or tel):
+        return None
     
-    for card in result.get("cards", []):
-        card_name = card.get("name", "").upper()
+    for card in _cartes_doublons(nom_complet, email_addr, tel):
+        if card.get("closed"):
+            logger.info(f"  → Trouvé archivé: {card.get('name')} (ignoré)")
+            continue
         
-        if nom_upper and nom_upper in card_name:
-            if card.get("closed"):
-                logger.info(f"  → Trouvé archivé: {card.get('name')} (ignoré)")
-                continue
-            
-            logger.info(f"  → DOUBLON TROUVÉ: {card.get('name')} - {card.get('shortUrl')}")
-            return {
-                "found": True,
-                "card_id": card.get("id"),
-                "card_name": card.get("name"),
-                "card_url": card.get("shortUrl"),
-                "board_id": card.get("idBoard")
-            }
+        logger.info(f"  → DOUBLON TROUVÉ: {card.get('name')} - {card.get('shortUrl')}")
+        return {
+            "found": True,
+            "card_id": card.get("id"),
+            "card_name": card.get("name"),
+            "card_url": card.get("shortUrl"),
+            "board_id": card.get("idBoard")
+        }
     
     logger.info(f"  → Aucun doublon trouvé")
     return None
@@ -343,8 +624,8 @@ def create_enriched_prospect_card(prospect: Dict) -> Optional[Dict]:
     nom = prospect.get("nom", "")
     email_addr = prospect.get("email", "")
     
-    if nom or email_addr:
-        existing = check_prospect_exists(nom, "", email_addr)
+    if nom or email_addr or prospect.get("tel"):
+        existing = check_prospect_exists(nom, "", email_addr, prospect.get("tel", ""))
         if existing and existing.get("found"):
             logger.info(f"⚠️ Prospect existe déjà, création annulée")
             return {
@@ -442,6 +723,7 @@ def create_enriched_prospect_card(prospect: Dict) -> Optional[Dict]:
     # 6b. ATTENDRE que Butler finisse puis PUT pour écraser avec la vraie description
     time.sleep(5)  # Butler applique son template, on attend qu'il finisse
     put_result = trello_put(f"/cards/{card_id}", {"desc": description})
+    _index_prospects.ajouter_carte(put_result or {**card_result, "desc": description})
     if put_result:
         logger.info(f"   📝 Description mise à jour via PUT")
     else:
@@ -727,9 +1009,7 @@ def get_email_body(msg) -> str:
             elif content_type == "text/html" and not body:
                 payload = part.get_payload(decode=True)
                 if payload:
-                    html = payload.decode('utf-8', errors='ignore')
-                    body = re.sub(r'<[^>]+>', ' ', html)
-                    body = re.sub(r'\s+', ' ', body)
+                    body = html_vers_texte(payload.decode('utf-8', errors='ignore'))
     else:
         payload = msg.get_payload(decode=True)
         if payload:
@@ -737,70 +1017,554 @@ def get_email_body(msg) -> str:
     return body
 
 
-def check_emails() -> List[Dict]:
-    """Vérifie les nouveaux emails et retourne les prospects détectés."""
-    prospects = []
-    
+# Curseur de synchronisation IMAP (UIDVALIDITY + plus haut UID traité).
+# Le flag \Seen n'est plus utilisé comme curseur: un lead ouvert dans Gmail
+# par un humain n'est plus perdu pour le watcher. Stocké en base
+# (v19_email_curseurs), sinon dans un fichier sur le volume persistant.
+IMAP_CURSEUR_PATH = os.getenv("IMAP_CURSEUR_PATH") or os.path.join(
+    os.getenv("RAILWAY_VOLUME_MOUNT_PATH") or "/tmp", "email_watcher_curseur.json")
+IMAP_LOT_CORPS = 100  # UIDs par requête UID FETCH des corps
+IMAP_MAX_ESSAIS_UID = 3  # Relèves en échec avant d'abandonner un message
+IMAP_CARTE_ABANDON_S = 24 * 3600  # Carte Trello en échec: abandon après ce délai
+
+IMAP_CHAMPS_ENTETE = "BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE MESSAGE-ID)]"
+IMAP_MAX_OCTETS_PARTIE = 256 * 1024  # Fetch partiel <0.N> de la partie texte
+_UID_RE = re.compile(rb'UID (\d+)')
+
+# Statistiques de la dernière relève (exposées par /emails/status)
+_derniere_releve: Dict = {}
+_releve_lock = threading.Lock()
+_echecs_uid: Dict[int, int] = {}  # UID -> relèves en échec (sous _releve_lock)
+_echecs_cartes: Dict[int, float] = {}  # UID -> date du premier échec de carte
+
+
+def charger_curseur_imap(dossier: str = "INBOX") -> Optional[Dict]:
+    """
+    Retourne {"uidvalidity": int, "last_uid": int} ou None si jamais synchronisé.
+    Une erreur de lecture en base est propagée: un curseur illisible n'est
+    pas un curseur absent.
+    """
+    if db.is_connected:
+        rows = db.execute_safe(
+            "SELECT uidvalidity, last_uid FROM v19_email_curseurs WHERE dossier = %s",
+            (dossier,), table_name="v19_email_curseurs"
+        )
+        if rows:
+            return {"uidvalidity": int(rows[0]["uidvalidity"]), "last_uid": int(rows[0]["last_uid"])}
+        # Pas encore en base: reprise du curseur fichier d'une version précédente
+    return _charger_curseur_fichier(dossier)
+
+
+def _charger_curseur_fichier(dossier: str) -> Optional[Dict]:
+    try:
+        with open(IMAP_CURSEUR_PATH, "r") as f:
+            return json.load(f).get(dossier)
+    except (OSError, ValueError):
+        return None
+
+
+def sauver_curseur_imap(dossier: str, uidvalidity: int, last_uid: int):
+    """Persiste le curseur en base, sinon dans IMAP_CURSEUR_PATH."""
+    if db.is_connected:
+        db.execute_safe(
+            """
+            INSERT INTO v19_email_curseurs (dossier, uidvalidity, last_uid, updated_at)
+            VALUES (%s, %s, %s, NOW())
+            ON CONFLICT (dossier) DO UPDATE
+            SET uidvalidity = EXCLUDED.uidvalidity, last_uid = EXCLUDED.last_uid, updated_at = NOW()
+            """,
+            (dossier, uidvalidity, last_uid), table_name="v19_email_curseurs"
+        )
+        return
+    _sauver_curseur_fichier(dossier, uidvalidity, last_uid)
+
+
+def _sauver_curseur_fichier(dossier: str, uidvalidity: int, last_uid: int):
+    """Écriture atomique: fichier temporaire puis remplacement."""
+    try:
+        with open(IMAP_CURSEUR_PATH, "r") as f:
+            curseurs = json.load(f)
+    except (OSError, ValueError):
+        curseurs = {}
+    curseurs[dossier] = {
+        "uidvalidity": uidvalidity,
+        "last_uid": last_uid,
+        "date": datetime.now().isoformat()
+    }
+    tmp_path = f"{IMAP_CURSEUR_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(curseurs, f)
+    os.replace(tmp_path, IMAP_CURSEUR_PATH)
+
+
+def _entier_reponse(mail, code: str) -> Optional[int]:
+    """Code de réponse numérique du SELECT (UIDVALIDITY, UIDNEXT)."""
+    typ, data = mail.response(code)
     try:
-        logger.info(f"📧 Connexion IMAP {IMAP_EMAIL}...")
+        return int(data[-1])
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _dernier_uid(mail) -> int:
+    """UID du message le plus récent du dossier sélectionné (0 si vide)."""
+    status, data = mail.uid("FETCH", "*", "(UID)")
+    uids = [int(m) for m in _UID_RE.findall(b" ".join(p for p in data or [] if isinstance(p, bytes)))]
+    return max(uids) if status == "OK" and uids else 0
+
+
+def _avancer_curseur(last_uid: int, uids_vus, echecs: List[int], echecs_cartes: List[int] = ()) -> int:
+    """
+    Nouveau curseur: plus haut UID dont tous les prédécesseurs vus ont été
+    traités. Un UID en échec bloque le curseur juste avant lui: corps
+    introuvable ou erreur de parser jusqu'à IMAP_MAX_ESSAIS_UID relèves,
+    carte Trello non créée pendant IMAP_CARTE_ABANDON_S (une panne Trello
+    peut durer plusieurs relèves).
+    """
+    bloquants = []
+    for uid in echecs:
+        essais = _echecs_uid.get(uid, 0) + 1
+        if essais >= IMAP_MAX_ESSAIS_UID:
+            logger.error(f"❌ UID {uid} abandonné après {essais} relèves en échec")
+            _echecs_uid.pop(uid, None)
+        else:
+            _echecs_uid[uid] = essais
+            bloquants.append(uid)
+    maintenant = time.time()
+    for uid in echecs_cartes:
+        premier = _echecs_cartes.setdefault(uid, maintenant)
+        if maintenant - premier >= IMAP_CARTE_ABANDON_S:
+            logger.error(f"❌ UID {uid} abandonné: carte Trello en échec depuis {int(maintenant - premier)}s")
+            _echecs_cartes.pop(uid, None)
+        else:
+            bloquants.append(uid)
+    for uid in set(uids_vus) - set(echecs) - set(echecs_cartes):
+        _echecs_uid.pop(uid, None)
+        _echecs_cartes.pop(uid, None)
+    if bloquants:
+        return max(last_uid, min(bloquants) - 1)
+    return max([last_uid, *uids_vus])
+
+
+def ouvrir_session_imap(dossier: str = "INBOX"):
+    """Login + SELECT en lecture seule. Retourne (mail, uidvalidity, uidnext)."""
+    logger.info(f"📧 Connexion IMAP {IMAP_EMAIL}...")
+    with outbound_timer("imap"):
         mail = imaplib.IMAP4_SSL(IMAP_SERVER, IMAP_PORT)
         mail.login(IMAP_EMAIL, IMAP_PASSWORD)
-        mail.select("INBOX")
-        
-        status, messages = mail.search(None, "(UNSEEN)")
-        unread_ids = messages[0].split()
-        
-        logger.info(f"📬 {len(unread_ids)} emails non lus")
-        
-        for mail_id in unread_ids:
-            try:
-                status, msg_data = mail.fetch(mail_id, "(RFC822)")
-                
-                for response_part in msg_data:
-                    if isinstance(response_part, tuple):
-                        msg = email.message_from_bytes(response_part[1])
-                        
-                        subject_raw = msg.get("Subject", "")
-                        subject, encoding = decode_header(subject_raw)[0]
-                        if isinstance(subject, bytes):
-                            subject = subject.decode(encoding or "utf-8", errors='ignore')
-                        
-                        from_addr = msg.get("From", "")
-                        body = get_email_body(msg)
-                        
-                        prospect = None
-                        
-                        if "sweepbright" in from_addr.lower() or "noreply@sweepbright" in from_addr.lower():
-                            prospect = parse_sweepbright(body, subject)
-                        elif "leboncoin" in from_addr.lower() or "leboncoin" in subject.lower():
-                            prospect = parse_leboncoin(body, subject)
-                        elif "seloger" in from_addr.lower() or "seloger" in subject.lower():
-                            prospect = parse_seloger(body, subject)
-                        elif any(kw in subject.lower() for kw in ["contact", "demande", "visite", "information", "intéressé"]):
-                            prospect = parse_generic(body, subject, from_addr)
-                        
+        mail.select(dossier, readonly=True)
+    return mail, _entier_reponse(mail, "UIDVALIDITY"), _entier_reponse(mail, "UIDNEXT")
+
+
+def _decoder_sujet(subject_raw: str) -> str:
+    subject, encoding = decode_header(subject_raw)[0]
+    if isinstance(subject, bytes):
+        subject = subject.decode(encoding or "utf-8", errors='ignore')
+    return subject
+
+
+# Routeur compilé: (parser, motif sur From, motif sur Subject), premier qui
+# correspond. Même ordre de priorité que l'ancienne cascade de if.
+_ROUTES_PARSERS = [
+    ("sweepbright", re.compile(r"sweepbright", re.IGNORECASE), None),
+    ("leboncoin", re.compile(r"leboncoin", re.IGNORECASE), re.compile(r"leboncoin", re.IGNORECASE)),
+    ("seloger", re.compile(r"seloger", re.IGNORECASE), re.compile(r"seloger", re.IGNORECASE)),
+    ("generic", None, re.compile(r"contact|demande|visite|information|intéressé", re.IGNORECASE)),
+]
+
+
+def choisir_parser(from_addr: str, subject: str) -> Optional[str]:
+    """Routage sur les seuls en-têtes: nom du parser ou None (corps inutile)."""
+    for parser, motif_from, motif_sujet in _ROUTES_PARSERS:
+        if (motif_from and motif_from.search(from_addr)) or (motif_sujet and motif_sujet.search(subject)):
+            return parser
+    return None
+
+
+def _appliquer_parser(parser: str, body: str, subject: str, from_addr: str) -> Optional[Dict]:
+    if parser == "sweepbright":
+        return parse_sweepbright(body, subject)
+    if parser == "leboncoin":
+        return parse_leboncoin(body, subject)
+    if parser == "seloger":
+        return parse_seloger(body, subject)
+    return parse_generic(body, subject, from_addr)
+
+
+def _uid_fetch(mail, uids: str, items: str) -> Dict[int, bytes]:
+    """UID FETCH groupé -> {uid: contenu littéral}."""
+    status, data = mail.uid("FETCH", uids, f"(UID {items})")
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"UID FETCH {uids}: {status}")
+    resultats = {}
+    for part in data or []:
+        if isinstance(part, tuple):
+            match = _UID_RE.search(part[0])
+            if match:
+                resultats[int(match.group(1))] = part[1]
+    return resultats
+
+
+def _reponses_fetch(data) -> List[bytes]:
+    """Réponses FETCH brutes, littéraux {n} réinsérés en ligne."""
+    reponses, courante = [], b""
+    for part in data or []:
+        if isinstance(part, tuple):
+            courante += part[0] + b"\r\n" + part[1]
+        elif part is not None:
+            courante += part
+            reponses.append(courante)
+            courante = b""
+    if courante:
+        reponses.append(courante)
+    return reponses
+
+
+_SEXP_TOKEN_RE = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|\{(\d+)\}\r\n|([^\s()"]+))')
+
+
+def _parse_sexp(data: bytes, pos: int = 0):
+    """Parse une liste IMAP parenthésée à partir de data[pos] -> (liste, fin)."""
+    pile = [[]]
+    while pos < len(data):
+        match = _SEXP_TOKEN_RE.match(data, pos)
+        if not match:
+            break
+        pos = match.end()
+        ouvrante, fermante, quoted, litteral, atome = match.groups()
+        if ouvrante:
+            pile.append([])
+        elif fermante:
+            liste = pile.pop()
+            pile[-1].append(liste)
+            if len(pile) == 1:
+                return liste, pos
+        elif quoted is not None:
+            pile[-1].append(re.sub(rb'\\(.)', rb'\1', quoted).decode("utf-8", errors="ignore"))
+        elif litteral is not None:
+            taille = int(litteral)
+            pile[-1].append(data[pos:pos + taille].decode("utf-8", errors="ignore"))
+            pos += taille
+        else:
+            pile[-1].append(None if atome.upper() == b"NIL" else atome.decode("ascii", errors="ignore"))
+    raise ValueError("Liste IMAP non terminée")
+
+
+def _parties_texte(structure, prefixe: str = ""):
+    """
+    Parcours en profondeur d'un BODYSTRUCTURE (ordre de msg.walk()).
+    Produit (section, sous-type, encodage, charset) des parties text/plain et
+    text/html hors pièces jointes. Les message/rfc822 ne sont pas descendus.
+    """
+    if structure and isinstance(structure[0], list):  # multipart
+        numero = 0
+        for enfant in structure:
+            if not isinstance(enfant, list):
+                break
+            numero += 1
+            yield from _parties_texte(enfant, f"{prefixe}{numero}.")
+        return
+    if len(structure) < 7 or not isinstance(structure[0], str) or structure[0].upper() != "TEXT":
+        return
+    sous_type = (structure[1] or "").lower()
+    if sous_type not in ("plain", "html"):
+        return
+    disposition = structure[9] if len(structure) > 9 else None
+    if isinstance(disposition, list) and disposition and str(disposition[0]).lower() == "attachment":
+        return
+    params = structure[2] if isinstance(structure[2], list) else []
+    charset = None
+    for cle, valeur in zip(params[::2], params[1::2]):
+        if str(cle).lower() == "charset":
+            charset = valeur
+    yield (prefixe.rstrip(".") or "1"), sous_type, (structure[5] or "7bit").lower(), charset
+
+
+def choisir_partie_texte(structure) -> Optional[Tuple[str, str, str, Optional[str]]]:
+    """Première partie text/plain, sinon première text/html (comme get_email_body)."""
+    premiere_html = None
+    for partie in _parties_texte(structure):
+        if partie[1] == "plain":
+            return partie
+        if premiere_html is None:
+            premiere_html = partie
+    return premiere_html
+
+
+def html_vers_texte(contenu: str) -> str:
+    texte = re.sub(r'<[^>]+>', ' ', contenu)
+    return re.sub(r'\s+', ' ', texte)
+
+
+def decoder_partie(brut: bytes, encodage: str, charset: Optional[str], sous_type: str) -> str:
+    """Décode une partie (éventuellement tronquée par le fetch partiel)."""
+    if encodage == "base64":
+        compact = re.sub(rb'[^A-Za-z0-9+/=]', b'', brut)
+        brut = base64.b64decode(compact[:len(compact) // 4 * 4] or b"")
+    elif encodage == "quoted-printable":
+        brut = quopri.decodestring(brut)
+    try:
+        texte = brut.decode(charset or "utf-8", errors="ignore")
+    except LookupError:
+        texte = brut.decode("utf-8", errors="ignore")
+    return html_vers_texte(texte) if sous_type == "html" else texte
+
+
+def _fetch_corps_textes(mail, uids: List[int], releve: Dict) -> Dict[int, str]:
+    """
+    Corps texte des messages routés sans télécharger les pièces jointes:
+    UID FETCH BODYSTRUCTURE groupé, puis BODY.PEEK[section]<0.N> groupé par
+    section. Repli sur le message complet si aucune partie texte n'est
+    identifiée ou si le fetch de la section ne renvoie rien pour un UID.
+    """
+    with outbound_timer("imap"):
+        status, data = mail.uid("FETCH", ",".join(map(str, uids)), "(UID BODYSTRUCTURE)")
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"UID FETCH BODYSTRUCTURE: {status}")
+
+    parties, complets = {}, []
+    for reponse in _reponses_fetch(data):
+        match = _UID_RE.search(reponse)
+        debut = reponse.find(b"BODYSTRUCTURE (")
+        if not match or debut < 0:
+            continue
+        uid = int(match.group(1))
+        try:
+            structure, _ = _parse_sexp(reponse, debut + len(b"BODYSTRUCTURE "))
+            partie = choisir_partie_texte(structure)
+        except (ValueError, IndexError, TypeError):
+            partie = None
+        if partie:
+            parties[uid] = partie
+        else:
+            complets.append(uid)
+    complets.extend(uid for uid in uids if uid not in parties and uid not in complets)
+
+    corps = {}
+    par_section: Dict[str, List[int]] = {}
+    for uid, partie in parties.items():
+        par_section.setdefault(partie[0], []).append(uid)
+    for section, uids_section in par_section.items():
+        with outbound_timer("imap"):
+            bruts = _uid_fetch(mail, ",".join(map(str, uids_section)),
+                               f"BODY.PEEK[{section}]<0.{IMAP_MAX_OCTETS_PARTIE}>")
+        for uid, brut in bruts.items():
+            releve["octets_corps"] += len(brut)
+            _, sous_type, encodage, charset = parties[uid]
+            corps[uid] = decoder_partie(brut, encodage, charset, sous_type)
+        complets.extend(uid for uid in uids_section if uid not in bruts)
+
+    if complets:
+        with outbound_timer("imap"):
+            bruts = _uid_fetch(mail, ",".join(map(str, complets)), "BODY.PEEK[]")
+        for uid, brut in bruts.items():
+            releve["octets_corps"] += len(brut)
+            corps[uid] = get_email_body(email.message_from_bytes(brut))
+    return corps
+
+
+def check_emails(dossier: str = "INBOX", mail=None, uidvalidity: Optional[int] = None,
+                 traiter: Optional[Callable[[List[Dict]], List[Dict]]] = None) -> List[Dict]:
+    """
+    Vérifie les nouveaux emails et retourne les prospects détectés.
+
+    Synchronisation incrémentale par UID: un seul UID FETCH des en-têtes sur
+    la plage ]dernier UID traité, UIDNEXT[, routage compilé sur From/Subject,
+    puis pour les seuls messages routés vers un parser: BODYSTRUCTURE et
+    fetch partiel de la partie texte (pièces jointes jamais téléchargées).
+    BODY.PEEK ne touche pas au flag \\Seen. Première synchro (ou
+    UIDVALIDITY changé): curseur posé sur le dernier UID existant, sans
+    retraiter la boîte. Le curseur n'avance pas au-delà d'un message en
+    échec (voir _avancer_curseur).
+
+    mail/uidvalidity: connexion déjà ouverte sur `dossier` (session IDLE),
+    réutilisée sans login ni logout.
+    traiter: appelé avec les prospects avant l'avancée du curseur; renvoie
+    ceux dont le traitement (carte Trello) a échoué, repris ensuite.
+    """
+    global _derniere_releve
+    prospects = []
+    debut = time.perf_counter()
+    releve = {"date": datetime.now().isoformat(), "dossier": dossier, "entetes": 0, "corps": 0, "octets_corps": 0}
+    
+    session_externe = mail is not None
+    try:
+        if session_externe:
+            uidnext = None
+        else:
+            mail, uidvalidity, uidnext = ouvrir_session_imap(dossier)
+        
+        try:
+            curseur = charger_curseur_imap(dossier)
+            if not curseur or curseur.get("uidvalidity") != uidvalidity:
+                # Les leads sont lus par l'équipe dans Gmail: ni \Seen ni un
+                # retraitement de la boîte ne sont fiables, on part de maintenant
+                last_uid = uidnext - 1 if uidnext else _dernier_uid(mail)
+                logger.warning(f"🔄 Curseur IMAP {dossier} absent ou UIDVALIDITY changé: "
+                               f"posé à l'UID {last_uid}, messages antérieurs non retraités")
+                if uidvalidity is not None:
+                    sauver_curseur_imap(dossier, uidvalidity, last_uid)
+                releve["uidvalidity"] = uidvalidity
+                releve["last_uid"] = last_uid
+                releve["curseur_initialise"] = True
+                uids = ""
+            else:
+                last_uid = int(curseur["last_uid"])
+                if uidnext is not None and uidnext - 1 <= last_uid:
+                    uids = ""
+                else:
+                    # n:* renvoie au moins le dernier message: filtré plus bas
+                    uids = f"{last_uid + 1}:{uidnext - 1 if uidnext else '*'}"
+            
+            entetes = {}
+            if uids:
+                with outbound_timer("imap"):
+                    entetes = _uid_fetch(mail, uids, IMAP_CHAMPS_ENTETE)
+            entetes = {uid: raw for uid, raw in entetes.items() if uid > last_uid}
+            releve["entetes"] = len(entetes)
+            logger.info(f"📬 {len(entetes)} nouveaux emails (UID > {last_uid})")
+            
+            # Routage sur les en-têtes
+            routes = {}
+            for uid, raw in entetes.items():
+                headers = email.message_from_bytes(raw)
+                subject = _decoder_sujet(headers.get("Subject", ""))
+                from_addr = headers.get("From", "")
+                parser = choisir_parser(from_addr, subject)
+                if parser:
+                    routes[uid] = (parser, subject, from_addr, headers.get("Date", ""),
+                                   headers.get("Message-ID", "").strip())
+            
+            # Parties texte des seuls messages routés, par lots
+            uids_routes = sorted(routes)
+            echecs = []
+            for i in range(0, len(uids_routes), IMAP_LOT_CORPS):
+                lot = uids_routes[i:i + IMAP_LOT_CORPS]
+                corps = _fetch_corps_textes(mail, lot, releve)
+                releve["corps"] += len(corps)
+                for uid in lot:
+                    if uid not in corps:
+                        logger.warning(f"⚠️ UID {uid}: corps non récupéré, repris à la prochaine relève")
+                        echecs.append(uid)
+                        continue
+                    parser, subject, from_addr, date, message_id = routes[uid]
+                    try:
+                        prospect = _appliquer_parser(parser, corps[uid], subject, from_addr)
                         if prospect:
                             prospect["raw_subject"] = subject
                             prospect["raw_from"] = from_addr
-                            prospect["date"] = msg.get("Date", "")
-                            prospect["mail_id"] = mail_id
+                            prospect["date"] = date
+                            prospect["message_id"] = message_id
+                            prospect["mail_id"] = str(uid)
                             prospects.append(prospect)
                             logger.info(f"🔥 Prospect détecté: {prospect.get('nom', prospect.get('email'))}")
-                        
-            except Exception as e:
-                logger.error(f"Erreur traitement email {mail_id}: {e}")
-                continue
-        
-        mail.logout()
+                    except Exception as e:
+                        logger.error(f"Erreur traitement email UID {uid}: {e}")
+                        echecs.append(uid)
+            
+            echecs_cartes = []
+            if traiter and prospects:
+                echecs_cartes = [int(p["mail_id"]) for p in traiter(prospects)]
+            
+            if entetes:
+                nouveau_last_uid = _avancer_curseur(last_uid, entetes, echecs, echecs_cartes)
+                if uidvalidity is not None and nouveau_last_uid > last_uid:
+                    sauver_curseur_imap(dossier, uidvalidity, nouveau_last_uid)
+                releve["uidvalidity"] = uidvalidity
+                releve["last_uid"] = nouveau_last_uid
+                releve["echecs"] = len(echecs) + len(echecs_cartes)
+            elif "last_uid" not in releve:
+                releve["uidvalidity"] = uidvalidity
+                releve["last_uid"] = last_uid
+        finally:
+            if not session_externe:
+                mail.logout()
         
     except Exception as e:
         logger.error(f"❌ Erreur IMAP: {e}")
+        releve["erreur"] = str(e)
+        if session_externe:
+            raise
+    
+    duree = time.perf_counter() - debut
+    releve["prospects"] = len(prospects)
+    releve["duree_s"] = round(duree, 3)
+    releve["msgs_par_sec"] = round(releve["entetes"] / duree, 1) if duree > 0 else 0.0
+    _derniere_releve = releve
+    logger.info(f"⏱️ Relève IMAP: {releve['entetes']} en-têtes, {releve['corps']} corps "
+                f"({releve['octets_corps'] // 1024} Ko) en {releve['duree_s']}s ({releve['msgs_par_sec']} msgs/s)")
     
     return prospects
 
 
-def process_new_emails() -> Dict:
-    """Fonction principale: vérifie emails et crée cartes Trello enrichies."""
+# Création des cartes en parallèle (appels Trello bloquants + pause Butler de
+# 5 s par carte), débit global borné par trello_bucket. Verrou par clé
+# (email, sinon Message-ID): deux emails du même lead dans une relève, ou un
+# lead relu après l'échec d'une autre carte, ne créent jamais deux cartes. La
+# clé reste réservée EMAIL_CLE_TTL s après création, le temps que la
+# recherche Trello (check_prospect_exists) indexe la nouvelle carte.
+EMAIL_WORKERS_TRELLO = int(os.getenv("EMAIL_WORKERS_TRELLO", "4"))
+EMAIL_CLE_TTL = 900
+
+_cles_prospects: Dict[str, Optional[float]] = {}  # clé -> None (en cours) ou date de création
+_cles_lock = threading.Lock()
+
+
+def cle_prospect(prospect: Dict) -> Optional[str]:
+    email_addr = (prospect.get("email") or "").strip().lower()
+    if email_addr:
+        return f"email:{email_addr}"
+    if prospect.get("message_id"):
+        return f"msgid:{prospect['message_id']}"
+    return None
+
+
+def _reserver_cle(cle: Optional[str]) -> bool:
+    """False si la clé est déjà en cours de traitement ou créée récemment."""
+    if cle is None:
+        return True
+    with _cles_lock:
+        maintenant = time.time()
+        for k in [k for k, cree in _cles_prospects.items() if cree and maintenant - cree > EMAIL_CLE_TTL]:
+            del _cles_prospects[k]
+        if cle in _cles_prospects:
+            return False
+        _cles_prospects[cle] = None
+        return True
+
+
+def _liberer_cle(cle: Optional[str], creee: bool):
+    if cle is None:
+        return
+    with _cles_lock:
+        if creee:
+            _cles_prospects[cle] = time.time()
+        else:
+            _cles_prospects.pop(cle, None)
+
+
+def _traiter_prospect(prospect: Dict) -> Optional[Dict]:
+    """Worker: une carte par prospect, sous verrou de clé."""
+    cle = cle_prospect(prospect)
+    if not _reserver_cle(cle):
+        logger.info(f"⚠️ Prospect {cle} déjà en cours ou créé, ignoré")
+        return {"created": False, "reason": "doublon", "en_cours": True}
+    card_result = None
+    try:
+        card_result = create_enriched_prospect_card(prospect)
+        return card_result
+    finally:
+        _liberer_cle(cle, bool(card_result and card_result.get("created")))
+
+
+def process_new_emails(mail=None, uidvalidity: Optional[int] = None) -> Dict:
+    """
+    Fonction principale: vérifie emails et crée cartes Trello enrichies.
+    Relève et création des cartes sont sérialisées par _releve_lock: le
+    curseur UID n'avance qu'une fois les cartes créées, un lead dont la
+    carte a échoué est relu à la relève suivante. Les cartes d'une relève
+    sont créées par un pool de EMAIL_WORKERS_TRELLO threads.
+    """
     result = {
         "version": EMAIL_WATCHER_VERSION,
         "timestamp": datetime.now().isoformat(),
@@ -812,36 +1576,240 @@ def process_new_emails() -> Dict:
         "cards": []
     }
     
+    def creer_cartes(prospects: List[Dict]) -> List[Dict]:
+        """Crée les cartes, renvoie les prospects en échec."""
+        echoues = []
+        debut = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(EMAIL_WORKERS_TRELLO, len(prospects)),
+                                thread_name_prefix="email-trello") as pool:
+            futures = {pool.submit(_traiter_prospect, prospect): prospect for prospect in prospects}
+            for future in as_completed(futures):
+                prospect = futures[future]
+                try:
+                    card_result = future.result()
+                except Exception as e:
+                    card_result = None
+                    logger.error(f"Erreur carte {prospect.get('email')}: {e}")
+                
+                if card_result:
+                    if card_result.get("created"):
+                        result["cards_created"] += 1
+                        result["cards"].append({
+                            "name": card_result.get("card_name"),
+                            "url": card_result.get("card_url")
+                        })
+                    elif card_result.get("reason") == "doublon":
+                        result["doublons_ignores"] += 1
+                else:
+                    echoues.append(prospect)
+                    result["errors"].append(f"Échec création carte pour {prospect.get('email')} (reprise)")
+        result["duree_cartes_s"] = round(time.perf_counter() - debut, 2)
+        return echoues
+    
     try:
-        prospects = check_emails()
+        with _releve_lock:
+            prospects = check_emails(mail=mail, uidvalidity=uidvalidity, traiter=creer_cartes)
+            result["emails_checked"] = _derniere_releve.get("entetes", 0)
+            result["releve"] = _derniere_releve
         result["prospects_found"] = len(prospects)
-        
-        for prospect in prospects:
-            card_result = create_enriched_prospect_card(prospect)
-            
-            if card_result:
-                if card_result.get("created"):
-                    result["cards_created"] += 1
-                    result["cards"].append({
-                        "name": card_result.get("card_name"),
-                        "url": card_result.get("card_url")
-                    })
-                elif card_result.get("reason") == "doublon":
-                    result["doublons_ignores"] += 1
-            else:
-                result["errors"].append(f"Échec création carte pour {prospect.get('email')}")
+        result.setdefault("duree_cartes_s", 0.0)
         
         logger.info(f"📊 Résultat: {result['prospects_found']} prospects, "
                    f"{result['cards_created']} cartes créées, "
-                   f"{result['doublons_ignores']} doublons ignorés")
+                   f"{result['doublons_ignores']} doublons ignorés "
+                   f"en {result['duree_cartes_s']}s")
         
     except Exception as e:
+        if mail is not None:
+            raise  # Session IDLE: la connexion est à refaire
         result["errors"].append(str(e))
         logger.error(f"Erreur process_new_emails: {e}")
     
     return result
 
 
+# =============================================================================
+# IMAP IDLE (PUSH)
+# =============================================================================
+# Connexion IMAP longue durée dans un thread dédié: IDLE (RFC 2177) signale
+# les nouveaux messages (* n EXISTS), la relève réutilise la même connexion.
+# IDLE est renouvelé toutes les IMAP_IDLE_RENOUVELLEMENT secondes (NOOP de
+# maintien entre deux cycles, bien sous les ~10 min où Gmail coupe).
+# Reconnexion avec backoff exponentiel. Le job de polling reste en secours
+# (poll_fallback) et ne fait rien tant que la session IDLE est saine.
+
+IMAP_IDLE_ACTIF = os.getenv("IMAP_IDLE", "1").lower() in ("1", "true", "yes")
+IMAP_IDLE_RENOUVELLEMENT = int(os.getenv("IMAP_IDLE_RENOUVELLEMENT", "240"))
+IMAP_IDLE_BACKOFF_MAX = 300
+IMAP_IDLE_TICK = 1.0  # Réactivité à l'arrêt (s)
+
+
+def _donnees_en_tampon(mail, sock) -> bool:
+    """Octets déjà lus du socket et restés dans mail.file? Lecture non bloquante."""
+    fichier = getattr(mail, "file", None)
+    if not hasattr(fichier, "peek"):
+        return False
+    timeout = sock.gettimeout()
+    try:
+        sock.setblocking(False)
+        return bool(fichier.peek(1))
+    except OSError:
+        return False
+    finally:
+        try:
+            sock.settimeout(timeout)
+        except OSError:
+            pass
+
+
+class IdleWatcher:
+    """Thread IDLE unique par process (demarrer_idle / arreter_idle)."""
+
+    def __init__(self, dossier: str = "INBOX"):
+        self.dossier = dossier
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connecte = False
+        self.dernier_signe = 0.0  # time.time() du dernier échange réussi
+        self.connexions = 0
+        self.pushs = 0
+        self.erreurs = 0
+        self.derniere_erreur: Optional[str] = None
+
+    def demarrer(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._boucle, name="imap-idle", daemon=True)
+        self._thread.start()
+        logger.info(f"📨 IMAP IDLE démarré ({self.dossier}, renouvellement {IMAP_IDLE_RENOUVELLEMENT}s)")
+
+    def arreter(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.connecte = False
+
+    def est_actif(self) -> bool:
+        """Session IDLE saine: le polling de secours peut s'abstenir."""
+        return (self.connecte and self._thread is not None and self._thread.is_alive()
+                and time.time() - self.dernier_signe < 2 * IMAP_IDLE_RENOUVELLEMENT)
+
+    def _boucle(self):
+        essai = 0
+        while not self._stop.is_set():
+            mail = None
+            try:
+                mail, uidvalidity, _ = ouvrir_session_imap(self.dossier)
+                typ, capabilities = mail.capability()
+                if b"IDLE" not in b" ".join(capabilities).upper().split():
+                    logger.warning("⚠️ Serveur IMAP sans IDLE - polling seul")
+                    return
+                self.connexions += 1
+                self.connecte = True
+                self.dernier_signe = time.time()
+                essai = 0
+                # Rattrapage de ce qui est arrivé pendant la déconnexion
+                process_new_emails(mail=mail, uidvalidity=uidvalidity)
+
+                while not self._stop.is_set():
+                    nouveaux = self._idle(mail, IMAP_IDLE_RENOUVELLEMENT)
+                    self.dernier_signe = time.time()
+                    if nouveaux:
+                        self.pushs += 1
+                        process_new_emails(mail=mail, uidvalidity=uidvalidity)
+                    elif not self._stop.is_set():
+                        mail.noop()
+            except Exception as e:
+                self.connecte = False
+                self.erreurs += 1
+                self.derniere_erreur = str(e)
+                delai = backoff_delay(essai, base=2.0, cap=IMAP_IDLE_BACKOFF_MAX)
+                essai += 1
+                logger.warning(f"⚠️ IMAP IDLE: {e} - reconnexion dans {delai:.0f}s")
+                self._stop.wait(delai)
+            finally:
+                self.connecte = False
+                if mail is not None:
+                    try:
+                        mail.logout()
+                    except Exception:
+                        pass
+
+    def _idle(self, mail, duree: float) -> bool:
+        """
+        Un cycle IDLE de `duree` secondes au plus. True si le serveur a
+        signalé de nouveaux messages (EXISTS).
+        """
+        tag = mail._new_tag()
+        mail.send(tag + b" IDLE\r\n")
+        ligne = mail.readline()
+        if not ligne.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE refusé: {ligne!r}")
+
+        sock = mail.socket()
+        nouveaux = False
+        fin = time.monotonic() + duree
+        while not nouveaux and not self._stop.is_set() and time.monotonic() < fin:
+            # select() sur le socket: pas de timeout sur le fichier tamponné
+            # d'imaplib (inutilisable après un timeout de lecture). Une ligne
+            # déjà dans ce tampon (arrivée avec le "+") ou dans celui de SSL
+            # ne réveillerait pas select(): on les regarde d'abord.
+            pret = (_donnees_en_tampon(mail, sock) or getattr(sock, "pending", lambda: 0)()
+                    or select.select([sock], [], [], IMAP_IDLE_TICK)[0])
+            if not pret:
+                continue
+            ligne = mail.readline()
+            if not ligne or ligne.startswith(b"* BYE"):
+                raise imaplib.IMAP4.abort(f"Connexion IDLE fermée: {ligne!r}")
+            nouveaux = ligne.rstrip().endswith(b"EXISTS")
+
+        mail.send(b"DONE\r\n")
+        while True:
+            ligne = mail.readline()
+            if not ligne:
+                raise imaplib.IMAP4.abort("Connexion fermée pendant DONE")
+            if ligne.startswith(tag):
+                if not ligne[len(tag):].strip().upper().startswith(b"OK"):
+                    raise imaplib.IMAP4.error(f"IDLE terminé en erreur: {ligne!r}")
+                return nouveaux
+            nouveaux = nouveaux or ligne.rstrip().endswith(b"EXISTS")
+
+    def stats(self) -> Dict:
+        return {
+            "actif": self.est_actif(),
+            "connecte": self.connecte,
+            "dernier_signe": datetime.fromtimestamp(self.dernier_signe).isoformat() if self.dernier_signe else None,
+            "connexions": self.connexions,
+            "pushs": self.pushs,
+            "erreurs": self.erreurs,
+            "derniere_erreur": self.derniere_erreur
+        }
+
+
+_idle_watcher = IdleWatcher()
+
+
+def demarrer_idle() -> bool:
+    """Démarre le thread IDLE (sans effet si IMAP_IDLE=0 ou déjà démarré)."""
+    if not IMAP_IDLE_ACTIF:
+        logger.info("📨 IMAP IDLE désactivé (IMAP_IDLE=0) - polling seul")
+        return False
+    _idle_watcher.demarrer()
+    return True
+
+
+def arreter_idle():
+    _idle_watcher.arreter()
+
+
+def poll_fallback() -> Optional[Dict]:
+    """Job de polling: ne relève que si la session IDLE n'est pas saine."""
+    if _idle_watcher.est_actif():
+        return None
+    return process_new_emails()
+
+
 # =============================================================================
 # ENDPOINTS HTTP
 # =============================================================================
@@ -854,6 +1822,10 @@ def handle_check_emails(params: Dict) -> Tuple[int, Dict]:
 
 def handle_email_status(params: Dict) -> Tuple[int, Dict]:
     """Handler pour endpoint /emails/status"""
+    try:
+        curseur = charger_curseur_imap()
+    except Exception as e:
+        curseur = {"erreur": str(e)}
     return 200, {
         "service": "Email Watcher V2",
         "version": EMAIL_WATCHER_VERSION,
@@ -861,6 +1833,10 @@ def handle_email_status(params: Dict) -> Tuple[int, Dict]:
         "trello_board": BOARD_ACQUEREURS,
         "trello_list": LIST_SUIVI_CLIENTS,
         "labels": [LABEL_PAS_SWEEPBRIGHT, LABEL_PAS_TRAITE],
+        "curseur_imap": curseur,
+        "derniere_releve": _derniere_releve,
+        "idle": _idle_watcher.stats(),
+        "index_prospects": _index_prospects.stats(),
         "status": "ready"
     }
 
@@ -1260,10 +2236,11 @@ def handle_test_create_card(query=None, body=None, headers=None) -> Tuple[int, D
 # Elles seront activées après validation via l'endpoint /emails/v2/test
 # =============================================================================
 
-def v2_check_prospect_exists(nom: str, email_addr: str = "") -> Dict:
+def v2_check_prospect_exists(nom: str, email_addr: str = "", tel: str = "") -> Dict:
     """
     V2: Vérifie si un prospect existe déjà dans Trello.
     NOUVEAU: Distingue carte ACTIVE vs ARCHIVÉE.
+    Recherche dans l'index local (email, téléphone, nom exact).
     
     Returns:
         {
@@ -1284,50 +2261,27 @@ def v2_check_prospect_exists(nom: str, email_addr: str = "") -> Dict:
         "board_id": None
     }
     
-    search_terms = []
-    if nom:
-        search_terms.append(nom.upper())
-    if email_addr and "@" in email_addr:
-        search_terms.append(email_addr.split("@")[0])
-    
-    if not search_terms:
-        return result
-    
-    query = " ".join(search_terms[:2])
-    logger.info(f"🔍 [V2] Recherche prospect: '{query}'")
-    
-    # Chercher avec cards:all pour inclure les archivées
-    search_result = trello_get(
-        f"/search?query={urllib.parse.quote(query)}&modelTypes=cards"
-        f"&card_fields=name,shortUrl,idBoard,closed&cards_limit=20"
-    )
-    
-    if not search_result or not search_result.get("cards"):
-        logger.info(f"  → Aucun résultat")
+    if not (nom or email_addr or tel):
         return result
     
-    nom_upper = nom.upper() if nom else ""
-    
-    for card in search_result.get("cards", []):
-        card_name = card.get("name", "").upper()
+    logger.info(f"🔍 [V2] Recherche prospect: '{nom}' / '{email_addr}'")
+    for card in _cartes_doublons(nom, email_addr, tel):
+        result["found"] = True
+        result["card_id"] = card.get("id")
+        result["card_url"] = card.get("shortUrl")
+        result["card_name"] = card.get("name")
+        result["board_id"] = card.get("idBoard")
+        
+        if card.get("closed"):
+            result["status"] = "archived"
+            logger.info(f"  → ARCHIVÉE trouvée: {card.get('name')}")
+        else:
+            result["status"] = "active"
+            logger.info(f"  → ACTIVE trouvée: {card.get('name')}")
         
-        if nom_upper and nom_upper in card_name:
-            result["found"] = True
-            result["card_id"] = card.get("id")
-            result["card_url"] = card.get("shortUrl")
-            result["card_name"] = card.get("name")
-            result["board_id"] = card.get("idBoard")
-            
-            if card.get("closed"):
-                result["status"] = "archived"
-                logger.info(f"  → ARCHIVÉE trouvée: {card.get('name')}")
-            else:
-                result["status"] = "active"
-                logger.info(f"  → ACTIVE trouvée: {card.get('name')}")
-            
-            return result
+        return result
     
-    logger.info(f"  → Aucune correspondance exacte")
+    logger.info(f"  → Aucune correspondance")
     return result
 
 
@@ -1615,7 +2569,7 @@ def v2_create_prospect_card(prospect: Dict, dry_run: bool = False) -> Dict:
     
     # ÉTAPE C: Vérification doublon
     result["steps"].append("C. Vérification doublon")
-    existing = v2_check_prospect_exists(nom, email_addr)
+    existing = v2_check_prospect_exists(nom, email_addr, tel)
     
     if existing["found"]:
         if existing["status"] == "active":
@@ -1749,7 +2703,8 @@ def v2_create_prospect_card(prospect: Dict, dry_run: bool = False) -> Dict:
     result["steps"].append("  F2. Attente Butler (5s)")
     
     # F3: PUT description
-    trello_put(f"/cards/{card_id}", {"desc": description})
+    put_result = trello_put(f"/cards/{card_id}", {"desc": description})
+    _index_prospects.ajouter_carte(put_result or {**card_result, "desc": description})
     result["steps"].append("  F3. Description mise à jour")
     
     # ÉTAPE G: Enrichissement
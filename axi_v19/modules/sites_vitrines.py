@@ -16,6 +16,8 @@ from email.mime.multipart import MIMEMultipart
 from typing import Dict, Any
 import requests
 
+from ..core.metrics import outbound_timer
+
 logger = logging.getLogger("axi_v19.sites_vitrines")
 
 # =============================================================================
@@ -49,21 +51,22 @@ def chat_proxy_handler(body: Dict[str, Any]) -> Dict[str, Any]:
             return {"error": "API key not configured"}
         
         # Appel Claude API
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": ANTHROPIC_API_KEY,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json"
-            },
-            json={
-                "model": "claude-sonnet-4-20250514",
-                "max_tokens": 500,
-                "system": system_prompt,
-                "messages": messages
-            },
-            timeout=30
-        )
+        with outbound_timer("anthropic"):
+            response = requests.post(
+                "https://api.anthropic.com/v1/messages",
+                headers={
+                    "x-api-key": ANTHROPIC_API_KEY,
+                    "anthropic-version": "2023-06-01",
+                    "content-type": "application/json"
+                },
+                json={
+                    "model": "claude-sonnet-4-20250514",
+                    "max_tokens": 500,
+                    "system": system_prompt,
+                    "messages": messages
+                },
+                timeout=30
+            )
         
         if response.status_code == 200:
             result = response.json()
@@ -523,23 +523,28 @@ def register_sweepbright_routes(server, db):
     
     # POST /webhook/sweepbright - Réception webhook
     def webhook_handler(query, body=None, headers=None):
-        return handle_webhook(body or {}, db)
+        code, result = handle_webhook(body or {}, db)
+        if code < 300:
+            server.invalidate_cache("sweepbright")
+        return code, result
     server.register_route("POST", "/webhook/sweepbright", webhook_handler)
     
     # GET /sweepbright/biens - Liste des biens
     def biens_handler(query, headers=None):
         return handle_get_biens(query, db)
-    server.register_route("GET", "/sweepbright/biens", biens_handler)
+    server.register_route("GET", "/sweepbright/biens", biens_handler, cache_ttl=300, cache_tags=("sweepbright",))
     
     # GET /sweepbright/biens/{id} - Détail d'un bien
     def bien_detail_handler(query, headers=None, path_params=None):
         estate_id = path_params.get("id", "") if path_params else ""
         return handle_get_bien(estate_id, db)
-    server.register_route("GET", "/sweepbright/biens/{id}", bien_detail_handler)
+    server.register_route("GET", "/sweepbright/biens/{id}", bien_detail_handler, cache_ttl=300, cache_tags=("sweepbright",))
     
     # POST /sweepbright/resync - Resynchroniser les biens
     def resync_handler(query, body=None, headers=None):
-        return handle_resync(db)
+        result = handle_resync(db)
+        server.invalidate_cache("sweepbright")
+        return result
     server.register_route("POST", "/sweepbright/resync", resync_handler)
     server.register_route("GET", "/sweepbright/resync", resync_handler)  # GET aussi pour faciliter
     
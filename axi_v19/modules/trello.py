@@ -19,6 +19,8 @@ import logging
 from datetime import datetime
 from typing import Optional, List, Dict, Any, Tuple
 
+from ..core.metrics import outbound_timer
+
 # =============================================================================
 # CONFIGURATION (constantes uniquement - pas d'exécution)
 # =============================================================================
@@ -111,8 +113,9 @@ def trello_get(endpoint: str, params: dict = None) -> Optional[dict]:
     params["token"] = TRELLO_TOKEN
     
     try:
-        resp = requests.get(url, params=params, timeout=30)
-        resp.raise_for_status()
+        with outbound_timer("trello"):
+            resp = requests.get(url, params=params, timeout=30)
+            resp.raise_for_status()
         return resp.json()
     except Exception as e:
         logger.error(f"Trello GET {endpoint} failed: {e}")
@@ -130,8 +133,9 @@ def trello_post(endpoint: str, data: dict = None) -> Optional[dict]:
     params = {"key": TRELLO_KEY, "token": TRELLO_TOKEN}
     
     try:
-        resp = requests.post(url, params=params, data=data, timeout=30)
-        resp.raise_for_status()
+        with outbound_timer("trello"):
+            resp = requests.post(url, params=params, data=data, timeout=30)
+            resp.raise_for_status()
         return resp.json()
     except Exception as e:
         logger.error(f"Trello POST {endpoint} failed: {e}")
@@ -675,6 +679,7 @@ def register_routes(server, db):
             init_secteurs_table(pool)
             load_secteurs_from_db(pool)
             stats = sync_biens_from_trello(pool, dry_run=False)
+            server.invalidate_cache("trello")
             return {"status": "ok", "mode": "live", "stats": stats}
         except Exception as e:
             logger.error(f"Erreur sync live: {e}")
@@ -717,7 +722,7 @@ def register_routes(server, db):
     server.register_route("GET", "/trello/sync", trello_sync_dry)
     server.register_route("POST", "/trello/sync", trello_sync_live)
     server.register_route("GET", "/trello/match", trello_match)
-    server.register_route("GET", "/trello/secteurs", trello_secteurs)
+    server.register_route("GET", "/trello/secteurs", trello_secteurs, cache_ttl=600, cache_tags=("trello",))
     
     logger.info("✅ Routes Trello enregistrées: /trello/status, /trello/sync, /trello/match, /trello/secteurs")
 
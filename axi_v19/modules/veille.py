@@ -22,6 +22,8 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from io import BytesIO
 
+from ..core.metrics import outbound_timer
+
 logger = logging.getLogger("axi_v19.veille")
 
 # =============================================================================
@@ -179,8 +181,9 @@ def get_dpe_ademe(code_postal):
     }
     
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=30)
-        response.raise_for_status()  # Lève exception si erreur HTTP
+        with outbound_timer("ademe"):
+            response = requests.get(url, params=params, headers=headers, timeout=30)
+            response.raise_for_status()  # Lève exception si erreur HTTP
         
         data = response.json()
         total = data.get('total', 0)
@@ -736,6 +739,14 @@ def register_veille_routes(server):
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
+    def handle_veille_dpe_rescorer(query=None, body=None):
+        """POST: recalcule le scoring de tout l'historique DPE (après changement de règles)."""
+        try:
+            from .veille_enrichie import rescorer_historique_dpe
+            return rescorer_historique_dpe()
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
     def handle_veille_dpe_enrichie(query):
         """Exécute la veille DPE enrichie (cron 1h00) avec monitoring Healthchecks."""
         # Ping START pour signaler le début
@@ -805,6 +816,7 @@ def register_veille_routes(server):
             return {"status": "error", "message": str(e)}
     
     server.register_route('GET', '/veille/dpe/stats', handle_veille_dpe_stats)
+    server.register_route('POST', '/veille/dpe/rescorer', handle_veille_dpe_rescorer)
     server.register_route('GET', '/veille/dpe/enrichie', handle_veille_dpe_enrichie)
     server.register_route('GET', '/veille/dpe/test-enrichie', handle_veille_dpe_test_enrichie)
     
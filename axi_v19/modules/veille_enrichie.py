@@ -14,14 +14,34 @@ Date: 10 janvier 2026
 
 import json
 import os
+import queue
 import time
 import urllib.request
 import urllib.parse
+import urllib.error
+import csv
 import gzip
+import heapq
+import math
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from io import BytesIO
 import ssl
 
+from ..core.http_cache import http_cache
+from ..core.metrics import outbound_timer, service_for_url
+from ..core.ratelimit import TokenBucket, RETRYABLE_STATUS, backoff_delay, retry_after_seconds, trello_bucket
+
+# NumPy optionnel: scoring par lot vectorisé
+try:
+    import numpy as np
+    NUMPY_OK = True
+except ImportError:
+    NUMPY_OK = False
+
 # === CONFIGURATION ===
 
 # Étiquettes DPE à surveiller (toutes par défaut)
@@ -70,6 +90,26 @@ TRELLO_JULIE_ID = "59db340040eb2c01fb7d4851"  # Conservé pour référence mais
 ADEME_BASE_URL = "https://data.ademe.fr/data-fair/api/v1/datasets/dpe03existant/lines"
 ADEME_FIELDS = "numero_dpe,date_reception_dpe,date_visite_diagnostiqueur,adresse_brut,adresse_ban,code_postal_ban,nom_commune_ban,surface_habitable_logement,type_batiment,nombre_niveau_logement,periode_construction,annee_construction,etiquette_dpe,conso_5_usages_par_m2_ep,etiquette_ges,emission_ges_5_usages_par_m2,type_energie_principale_chauffage,cout_chauffage,cout_ecs,cout_total_5_usages,indicateur_confort_ete,_geopoint"
 
+# Récupération parallèle ADEME: plafond de concurrence + token bucket partagé
+ADEME_CONCURRENCE = int(os.environ.get("ADEME_CONCURRENCE", "4"))
+ADEME_REQ_PAR_SEC = float(os.environ.get("ADEME_REQ_PAR_SEC", "4"))
+ADEME_RAFALE = int(os.environ.get("ADEME_RAFALE", "4"))
+ADEME_MAX_ESSAIS = int(os.environ.get("ADEME_MAX_ESSAIS", "4"))
+ADEME_TAILLE_PAGE = int(os.environ.get("ADEME_TAILLE_PAGE", "500"))
+ADEME_MAX_PAGES = 50  # Garde-fou par code postal et par run
+# Fenêtre de recouvrement: l'ADEME publie des DPE avec une date de réception
+# antérieure à leur mise en ligne; dpe_veille_vus écarte les doublons
+ADEME_RECOUVREMENT_JOURS = int(os.environ.get("ADEME_RECOUVREMENT_JOURS", "7"))
+_ademe_bucket = TokenBucket(ADEME_REQ_PAR_SEC, ADEME_RAFALE)
+
+# Pipeline du run: enrichissement et création de cartes en pools de threads
+# reliés par des files bornées; Trello limité à 100 requêtes / 10 s par token
+VEILLE_WORKERS_ENRICHISSEMENT = int(os.environ.get("VEILLE_WORKERS_ENRICHISSEMENT", "4"))
+VEILLE_WORKERS_TRELLO = int(os.environ.get("VEILLE_WORKERS_TRELLO", "3"))
+VEILLE_FILE_MAX = 100
+VEILLE_LOT_MARQUAGE = 50
+_trello_bucket = trello_bucket  # Quota du token partagé avec l'email watcher
+
 # SSL context pour éviter les erreurs de certificat
 SSL_CONTEXT = ssl.create_default_context()
 SSL_CONTEXT.check_hostname = False
@@ -78,82 +118,164 @@ SSL_CONTEXT.verify_mode = ssl.CERT_NONE
 
 # === POSTGRESQL - TRACKING DPE ===
 
-def get_db_connection():
-    """Connexion PostgreSQL Railway"""
-    import os
-    try:
-        import psycopg2
-    except ImportError:
-        print("[DB] psycopg2 non installé - mode fichier local")
-        return None
-    
-    db_url = os.environ.get("DATABASE_URL")
-    if not db_url:
-        print("[DB] DATABASE_URL non défini - mode fichier local")
-        return None
-    
+# Pool dédié à la veille (la table dpe_veille_vus est hors du périmètre v19_*
+# du DatabaseManager). Créé à la première utilisation, partagé par tout le run.
+VEILLE_DB_POOL_MAX = int(os.environ.get("VEILLE_DB_POOL_MAX", "4"))
+
+_db_pool = None
+_db_pool_indisponible = False
+_db_pool_lock = threading.Lock()
+_db_compteurs = {"connexions": 0, "emprunts": 0}
+
+
+def get_db_pool():
+    """Pool PostgreSQL Railway (None si psycopg2 ou DATABASE_URL absent)"""
+    global _db_pool, _db_pool_indisponible
+    if _db_pool is not None or _db_pool_indisponible:
+        return _db_pool
+
+    with _db_pool_lock:
+        if _db_pool is not None or _db_pool_indisponible:
+            return _db_pool
+
+        try:
+            from psycopg2 import pool
+        except ImportError:
+            print("[DB] psycopg2 non installé - mode fichier local")
+            _db_pool_indisponible = True
+            return None
+
+        db_url = os.environ.get("DATABASE_URL")
+        if not db_url:
+            print("[DB] DATABASE_URL non défini - mode fichier local")
+            _db_pool_indisponible = True
+            return None
+
+        class _PoolCompte(pool.ThreadedConnectionPool):
+            """Compte les connexions physiques ouvertes"""
+            def _connect(self, key=None):
+                _db_compteurs["connexions"] += 1
+                return super()._connect(key)
+
+        try:
+            _db_pool = _PoolCompte(0, VEILLE_DB_POOL_MAX, db_url)
+            print(f"[DB] Pool veille prêt (max {VEILLE_DB_POOL_MAX} connexions)")
+        except Exception as e:
+            # Pas de mémorisation: la connexion sera retentée au prochain run
+            print(f"[DB] Erreur création pool: {e}")
+        return _db_pool
+
+
+@contextmanager
+def db_session():
+    """
+    Emprunte une connexion du pool: commit en sortie, rollback sur exception.
+    Produit None si PostgreSQL est indisponible (fallback fichier local).
+    """
+    db_pool = get_db_pool()
+    if db_pool is None:
+        yield None
+        return
+
     try:
-        conn = psycopg2.connect(db_url)
-        return conn
+        conn = db_pool.getconn()
+        if conn.closed:
+            db_pool.putconn(conn, close=True)
+            conn = db_pool.getconn()
     except Exception as e:
         print(f"[DB] Erreur connexion: {e}")
-        return None
+        yield None
+        return
+
+    _db_compteurs["emprunts"] += 1
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn, close=bool(conn.closed))
+
+
+def get_db_compteurs():
+    """Compteurs du pool veille (connexions physiques / emprunts)"""
+    return dict(_db_compteurs)
 
 
 def init_table_dpe_vus():
     """Crée la table des DPE déjà traités si inexistante"""
-    conn = get_db_connection()
-    if not conn:
-        return False
-    
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS dpe_veille_vus (
-                numero_dpe VARCHAR(50) PRIMARY KEY,
-                date_reception DATE,
-                code_postal VARCHAR(10),
-                commune VARCHAR(100),
-                etiquette_dpe CHAR(1),
-                trello_card_url TEXT,
-                date_traitement TIMESTAMP DEFAULT NOW()
-            )
-        """)
-        conn.commit()
-        cur.close()
-        conn.close()
-        print("[DB] Table dpe_veille_vus prête")
+        with db_session() as conn:
+            if not conn:
+                return False
+            cur = conn.cursor()
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS dpe_veille_vus (
+                    numero_dpe VARCHAR(50) PRIMARY KEY,
+                    date_reception DATE,
+                    code_postal VARCHAR(10),
+                    commune VARCHAR(100),
+                    etiquette_dpe CHAR(1),
+                    trello_card_url TEXT,
+                    date_traitement TIMESTAMP DEFAULT NOW()
+                )
+            """)
+            # Scoring stocké avec les données nécessaires pour le recalculer
+            for colonne in ("dvf_trouve BOOLEAN", "dvf_date_derniere_vente VARCHAR(10)",
+                            "priorite VARCHAR(2)", "priorite_raisons TEXT",
+                            "vente_location VARCHAR(10)", "date_scoring TIMESTAMP"):
+                cur.execute(f"ALTER TABLE dpe_veille_vus ADD COLUMN IF NOT EXISTS {colonne}")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS dpe_veille_curseurs (
+                    code_postal VARCHAR(10) PRIMARY KEY,
+                    derniere_date_reception DATE NOT NULL,
+                    date_maj TIMESTAMP DEFAULT NOW()
+                )
+            """)
+            cur.close()
+        print("[DB] Tables dpe_veille_vus / dpe_veille_curseurs prêtes")
         return True
     except Exception as e:
         print(f"[DB] Erreur init table: {e}")
         return False
 
 
-def est_dpe_deja_vu(numero_dpe):
-    """Vérifie si un DPE a déjà été traité"""
-    conn = get_db_connection()
-    if not conn:
-        # Fallback fichier local
-        return est_dpe_deja_vu_fichier(numero_dpe)
-    
+def est_dpe_deja_vu(numero_dpe, conn=None):
+    """
+    Vérifie si un DPE a déjà été traité.
+    conn: connexion de la session du run (sinon emprunt ponctuel au pool)
+    """
+    if conn is None:
+        with db_session() as conn_session:
+            if not conn_session:
+                # Fallback fichier local
+                return est_dpe_deja_vu_fichier(numero_dpe)
+            return est_dpe_deja_vu(numero_dpe, conn_session)
+
     try:
         cur = conn.cursor()
         cur.execute("SELECT 1 FROM dpe_veille_vus WHERE numero_dpe = %s", (numero_dpe,))
         result = cur.fetchone()
         cur.close()
-        conn.close()
         return result is not None
     except Exception as e:
         print(f"[DB] Erreur vérification: {e}")
+        conn.rollback()
         return False
 
 
-def marquer_dpe_vu(dpe_enrichi, trello_url=None):
-    """Marque un DPE comme traité"""
-    conn = get_db_connection()
-    if not conn:
-        return marquer_dpe_vu_fichier(dpe_enrichi)
-    
+def marquer_dpe_vu(dpe_enrichi, trello_url=None, conn=None):
+    """
+    Marque un DPE comme traité.
+    conn: connexion de la session du run, commit laissé à l'appelant
+    """
+    if conn is None:
+        with db_session() as conn_session:
+            if not conn_session:
+                return marquer_dpe_vu_fichier(dpe_enrichi)
+            return marquer_dpe_vu(dpe_enrichi, trello_url, conn_session)
+
     try:
         cur = conn.cursor()
         cur.execute("""
@@ -168,30 +290,239 @@ def marquer_dpe_vu(dpe_enrichi, trello_url=None):
             dpe_enrichi.get("dpe_lettre"),
             trello_url
         ))
-        conn.commit()
         cur.close()
-        conn.close()
         return True
     except Exception as e:
         print(f"[DB] Erreur marquage: {e}")
+        conn.rollback()
         return False
 
 
-def get_stats_dpe_vus():
-    """Statistiques des DPE déjà traités"""
-    conn = get_db_connection()
-    if not conn:
-        return {"total": 0, "source": "aucune"}
-    
+def filtrer_dpe_deja_vus(numeros, conn=None):
+    """
+    Retourne le sous-ensemble des numéros DPE déjà traités.
+    Une seule requête (= ANY) pour tout un lot, au lieu d'un SELECT par DPE.
+    """
+    numeros = [n for n in set(numeros) if n]
+    if not numeros:
+        return set()
+
+    if conn is None:
+        with db_session() as conn_session:
+            if not conn_session:
+                charger_dpe_vus_fichier()
+                return _dpe_vus_fichier.intersection(numeros)
+            return filtrer_dpe_deja_vus(numeros, conn_session)
+
     try:
         cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM dpe_veille_vus")
-        total = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM dpe_veille_vus WHERE date_traitement > NOW() - INTERVAL '24 hours'")
-        dernieres_24h = cur.fetchone()[0]
+        cur.execute("SELECT numero_dpe FROM dpe_veille_vus WHERE numero_dpe = ANY(%s)", (numeros,))
+        vus = {row[0] for row in cur.fetchall()}
         cur.close()
-        conn.close()
-        return {"total": total, "dernieres_24h": dernieres_24h, "source": "postgresql"}
+        return vus
+    except Exception as e:
+        print(f"[DB] Erreur filtrage lot: {e}")
+        conn.rollback()
+        return set()
+
+
+def marquer_dpe_vus_lot(dpes_traites, conn=None):
+    """
+    Marque un lot de DPE comme traités en un seul INSERT groupé.
+    dpes_traites: liste de (dpe_enrichi, trello_url)
+    Retourne le nombre de lignes insérées (0 si toutes déjà présentes),
+    None si l'INSERT a échoué (transaction annulée).
+    """
+    if not dpes_traites:
+        return 0
+
+    if conn is None:
+        with db_session() as conn_session:
+            if not conn_session:
+                charger_dpe_vus_fichier()
+                _dpe_vus_fichier.update(d.get("numero_dpe") for d, _ in dpes_traites)
+                sauver_dpe_vus_fichier()
+                return len(dpes_traites)
+            return marquer_dpe_vus_lot(dpes_traites, conn_session)
+
+    try:
+        from psycopg2.extras import execute_values
+        cur = conn.cursor()
+        lignes = execute_values(cur, """
+            INSERT INTO dpe_veille_vus (numero_dpe, date_reception, code_postal, commune, etiquette_dpe, trello_card_url,
+                                        dvf_trouve, dvf_date_derniere_vente, priorite, priorite_raisons,
+                                        vente_location, date_scoring)
+            VALUES %s
+            ON CONFLICT (numero_dpe) DO NOTHING
+            RETURNING numero_dpe
+        """, [(
+            dpe_enrichi.get("numero_dpe"),
+            dpe_enrichi.get("date_reception"),
+            dpe_enrichi.get("code_postal"),
+            dpe_enrichi.get("commune"),
+            dpe_enrichi.get("dpe_lettre"),
+            trello_url,
+            bool(dpe_enrichi.get("dvf_trouve", False)),
+            (dpe_enrichi.get("dvf_date_derniere_vente") or "")[:10] or None,
+            dpe_enrichi.get("priorite") or None,
+            " | ".join(dpe_enrichi.get("priorite_raisons") or []),
+            dpe_enrichi.get("probable_vente_location") or None
+        ) for dpe_enrichi, trello_url in dpes_traites],
+            template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())", page_size=500, fetch=True)
+        # rowcount ne compte que la dernière page: on compte les lignes RETURNING
+        inseres = len(lignes)
+        cur.close()
+        return inseres
+    except Exception as e:
+        print(f"[DB] Erreur marquage lot: {e}")
+        conn.rollback()
+        return None
+
+
+def charger_curseurs_dpe(conn=None):
+    """
+    Curseurs incrémentaux: dict code_postal -> dernière date_reception_dpe
+    traitée (YYYY-MM-DD). Le run suivant repart de cette date moins
+    ADEME_RECOUVREMENT_JOURS (voir date_debut_incrementale).
+    """
+    if conn is None:
+        with db_session() as conn_session:
+            if not conn_session:
+                return charger_curseurs_fichier()
+            return charger_curseurs_dpe(conn_session)
+
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT code_postal, derniere_date_reception FROM dpe_veille_curseurs")
+        curseurs = {cp: str(date_reception) for cp, date_reception in cur.fetchall()}
+        cur.close()
+        return curseurs
+    except Exception as e:
+        print(f"[DB] Erreur lecture curseurs: {e}")
+        conn.rollback()
+        return {}
+
+
+def date_debut_incrementale(curseur, recouvrement=None):
+    """
+    Date de début de la requête ADEME pour un curseur (YYYY-MM-DD ou None):
+    curseur - ADEME_RECOUVREMENT_JOURS, jamais avant DATE_DEBUT_COLLECTE.
+    """
+    if not curseur:
+        return DATE_DEBUT_COLLECTE
+    if recouvrement is None:
+        recouvrement = ADEME_RECOUVREMENT_JOURS
+    try:
+        debut = (datetime.strptime(str(curseur)[:10], "%Y-%m-%d") - timedelta(days=recouvrement)).strftime("%Y-%m-%d")
+    except ValueError:
+        return DATE_DEBUT_COLLECTE
+    return max(debut, DATE_DEBUT_COLLECTE)
+
+
+def sauver_curseur_dpe(code_postal, date_reception, conn=None):
+    """Avance le curseur d'un code postal (jamais de retour en arrière)"""
+    if not date_reception:
+        return False
+
+    if conn is None:
+        with db_session() as conn_session:
+            if not conn_session:
+                return sauver_curseur_fichier(code_postal, date_reception)
+            return sauver_curseur_dpe(code_postal, date_reception, conn_session)
+
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO dpe_veille_curseurs (code_postal, derniere_date_reception)
+            VALUES (%s, %s)
+            ON CONFLICT (code_postal) DO UPDATE SET
+                derniere_date_reception = GREATEST(dpe_veille_curseurs.derniere_date_reception, EXCLUDED.derniere_date_reception),
+                date_maj = NOW()
+        """, (code_postal, date_reception))
+        cur.close()
+        return True
+    except Exception as e:
+        print(f"[DB] Erreur curseur {code_postal}: {e}")
+        conn.rollback()
+        return False
+
+
+def rescorer_historique_dpe(conn=None):
+    """
+    Recalcule priorité et vente/location de tout l'historique dpe_veille_vus
+    avec les règles actuelles (fraîcheur recalculée à la date du jour), en un
+    SELECT, un scoring par lot et un UPDATE groupé.
+    Lignes antérieures au stockage DVF (dvf_trouve NULL): considérées sans vente DVF.
+    """
+    if conn is None:
+        with db_session() as conn_session:
+            if not conn_session:
+                return {"success": False, "message": "Pas de connexion DB"}
+            return rescorer_historique_dpe(conn_session)
+
+    debut = time.time()
+    try:
+        from psycopg2.extras import execute_values
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT numero_dpe, etiquette_dpe, date_reception, dvf_trouve, dvf_date_derniere_vente
+            FROM dpe_veille_vus
+        """)
+        rows = cur.fetchall()
+        if not rows:
+            cur.close()
+            return {"success": True, "total": 0}
+        
+        aujourd_hui = datetime.now().date()
+        priorites, raisons, ventes = scorer_dpe_lot(
+            etiquettes=[(r[1] or "").strip() for r in rows],
+            jours=[(aujourd_hui - r[2]).days if r[2] else 999 for r in rows],
+            dvf_trouve=[bool(r[3]) for r in rows],
+            dvf_annees=[_annee_dvf(r[4]) if r[3] else -1 for r in rows]
+        )
+        
+        execute_values(cur, """
+            UPDATE dpe_veille_vus AS d
+            SET priorite = v.priorite, priorite_raisons = v.raisons,
+                vente_location = v.vente, date_scoring = NOW()
+            FROM (VALUES %s) AS v(numero_dpe, priorite, raisons, vente)
+            WHERE d.numero_dpe = v.numero_dpe
+        """, [
+            (row[0], priorite, " | ".join(raisons_dpe), vente)
+            for row, priorite, raisons_dpe, vente in zip(rows, priorites, raisons, ventes)
+        ], page_size=1000)
+        cur.close()
+        
+        resultat = {
+            "success": True,
+            "total": len(rows),
+            "p1": priorites.count("P1"),
+            "p2": priorites.count("P2"),
+            "p3": priorites.count("P3"),
+            "numpy": NUMPY_OK,
+            "duree_s": round(time.time() - debut, 2)
+        }
+        print(f"[DB] Historique rescoré: {resultat}")
+        return resultat
+    except Exception as e:
+        print(f"[DB] Erreur rescoring: {e}")
+        conn.rollback()
+        return {"success": False, "message": str(e)}
+
+
+def get_stats_dpe_vus():
+    """Statistiques des DPE déjà traités"""
+    try:
+        with db_session() as conn:
+            if not conn:
+                return {"total": 0, "source": "aucune"}
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM dpe_veille_vus")
+            total = cur.fetchone()[0]
+            cur.execute("SELECT COUNT(*) FROM dpe_veille_vus WHERE date_traitement > NOW() - INTERVAL '24 hours'")
+            dernieres_24h = cur.fetchone()[0]
+            cur.close()
+        return {"total": total, "dernieres_24h": dernieres_24h, "source": "postgresql", "pool": get_db_compteurs()}
     except Exception as e:
         print(f"[DB] Erreur stats: {e}")
         return {"total": 0, "source": "erreur"}
@@ -199,17 +530,16 @@ def get_stats_dpe_vus():
 
 def reset_dpe_vus():
     """Vide la table des DPE vus (pour forcer re-création des cartes)"""
-    conn = get_db_connection()
-    if not conn:
-        return {"success": False, "message": "Pas de connexion DB"}
-    
     try:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM dpe_veille_vus")
-        deleted = cur.rowcount
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_session() as conn:
+            if not conn:
+                return {"success": False, "message": "Pas de connexion DB"}
+            cur = conn.cursor()
+            cur.execute("DELETE FROM dpe_veille_vus")
+            deleted = cur.rowcount
+            # Sans curseurs, le prochain run repart de DATE_DEBUT_COLLECTE
+            cur.execute("DELETE FROM dpe_veille_curseurs")
+            cur.close()
         print(f"[DB] Table dpe_veille_vus vidée ({deleted} entrées supprimées)")
         return {"success": True, "deleted": deleted}
     except Exception as e:
@@ -262,6 +592,32 @@ def marquer_dpe_vu_fichier(dpe_enrichi):
     return True
 
 
+_CURSEURS_FICHIER = "/tmp/dpe_curseurs.json"
+
+def charger_curseurs_fichier():
+    """Curseurs incrémentaux (fallback fichier)"""
+    try:
+        with open(_CURSEURS_FICHIER, "r") as f:
+            return json.load(f)
+    except:
+        return {}
+
+
+def sauver_curseur_fichier(code_postal, date_reception):
+    """Avance un curseur incrémental (fallback fichier)"""
+    curseurs = charger_curseurs_fichier()
+    if date_reception <= curseurs.get(code_postal, ""):
+        return True
+    curseurs[code_postal] = date_reception
+    try:
+        with open(_CURSEURS_FICHIER, "w") as f:
+            json.dump(curseurs, f)
+        return True
+    except Exception as e:
+        print(f"[FICHIER] Erreur sauvegarde curseurs: {e}")
+        return False
+
+
 # === FONCTIONS API ===
 
 def api_request(url, method="GET", data=None, headers=None):
@@ -273,9 +629,11 @@ def api_request(url, method="GET", data=None, headers=None):
         data = urllib.parse.urlencode(data).encode()
     
     req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    if "api.trello.com" in url:
+        _trello_bucket.acquire()
     
     try:
-        with urllib.request.urlopen(req, timeout=30, context=SSL_CONTEXT) as resp:
+        with outbound_timer(service_for_url(url)), urllib.request.urlopen(req, timeout=30, context=SSL_CONTEXT) as resp:
             return json.loads(resp.read().decode())
     except Exception as e:
         print(f"[API] Erreur: {e}")
@@ -291,15 +649,49 @@ def trello_api_json(url, method="POST", data=None):
     
     body = json.dumps(data).encode() if data else None
     req = urllib.request.Request(url, data=body, headers=headers, method=method)
+    _trello_bucket.acquire()
     
     try:
-        with urllib.request.urlopen(req, timeout=30, context=SSL_CONTEXT) as resp:
+        with outbound_timer("trello"), urllib.request.urlopen(req, timeout=30, context=SSL_CONTEXT) as resp:
             return json.loads(resp.read().decode())
     except Exception as e:
         print(f"[TRELLO] Erreur: {e}")
         return None
 
 
+def ademe_request(url):
+    """
+    GET ADEME data-fair: token bucket partagé entre threads + retry avec
+    jitter sur 429/5xx et erreurs réseau (Retry-After respecté si fourni).
+    """
+    headers = {"User-Agent": "ICI-Dordogne-Veille/1.0"}
+    
+    for essai in range(ADEME_MAX_ESSAIS):
+        _ademe_bucket.acquire()
+        try:
+            # Cache disque: revalidation ETag/Last-Modified, hors-ligne possible.
+            # Pas de copie périmée sur erreur réseau: le retry doit la voir, et
+            # une page ancienne fausserait la pagination (curseur after)
+            return json.loads(http_cache.lire(url, headers=headers, timeout=30, context=SSL_CONTEXT).decode())
+        except urllib.error.HTTPError as e:
+            if e.code not in RETRYABLE_STATUS or essai == ADEME_MAX_ESSAIS - 1:
+                print(f"[ADEME] Erreur HTTP {e.code}: {e.reason}")
+                return None
+            attente = retry_after_seconds(e.headers.get("Retry-After")) or backoff_delay(essai)
+            print(f"[ADEME] HTTP {e.code} - nouvel essai dans {attente:.1f}s")
+        except (urllib.error.URLError, TimeoutError) as e:
+            if essai == ADEME_MAX_ESSAIS - 1:
+                print(f"[ADEME] Erreur réseau: {e}")
+                return None
+            attente = backoff_delay(essai)
+            print(f"[ADEME] Erreur réseau ({e}) - nouvel essai dans {attente:.1f}s")
+        except Exception as e:
+            print(f"[ADEME] Erreur: {e}")
+            return None
+        time.sleep(attente)
+    return None
+
+
 def get_dpe_ademe(code_postal, jours=None, etiquettes=None, date_debut=None):
     """
     Récupère les DPE récents depuis l'API ADEME
@@ -325,102 +717,380 @@ def get_dpe_ademe(code_postal, jours=None, etiquettes=None, date_debut=None):
     else:
         date_limite = DATE_DEBUT_COLLECTE
     
-    # Construire la requête avec le bon format qs=
-    url = f"{ADEME_BASE_URL}?size=200&qs=code_postal_ban:{code_postal}&select={ADEME_FIELDS}&sort=-date_reception_dpe"
-    
-    result = api_request(url)
-    
-    if not result or "results" not in result:
-        print(f"[ADEME] Pas de résultats pour {code_postal}")
-        return []
+    # Filtrage côté serveur (syntaxe qs data-fair) + tri croissant: en cas
+    # d'échec en cours de pagination, le curseur ne dépasse jamais une page
+    # non reçue
+    qs = f'code_postal_ban:"{code_postal}" AND date_reception_dpe:[{date_limite} TO *]'
+    if set(ETIQUETTES_DPE) - set(etiquettes):
+        qs += f" AND etiquette_dpe:({' OR '.join(etiquettes)})"
+    params = {
+        "size": ADEME_TAILLE_PAGE,
+        "qs": qs,
+        "select": ADEME_FIELDS,
+        "sort": "date_reception_dpe"
+    }
+    url = f"{ADEME_BASE_URL}?{urllib.parse.urlencode(params)}"
     
-    # Validation des champs obligatoires (détection changement API)
-    results = result.get("results", [])
-    if results:
-        premier_dpe = results[0]
-        champs_manquants = [c for c in CHAMPS_API_OBLIGATOIRES if c not in premier_dpe]
-        if champs_manquants:
-            erreur = f"⚠️ API ADEME a changé ! Champs manquants: {champs_manquants}"
-            print(f"[ADEME] {erreur}")
-            raise ValueError(erreur)
-    
-    # Filtrer par étiquette DPE et par date
     dpes = []
-    for dpe in result.get("results", []):
-        # Vérifier étiquette
-        if dpe.get("etiquette_dpe") not in etiquettes:
-            continue
+    pages = 0
+    while url and pages < ADEME_MAX_PAGES:
+        result = ademe_request(url)
+        if not result or "results" not in result:
+            if pages == 0:
+                print(f"[ADEME] Pas de résultats pour {code_postal}")
+            else:
+                print(f"[ADEME] {code_postal}: pagination interrompue page {pages + 1}")
+            break
+        
+        results = result.get("results", [])
+        pages += 1
+        
+        # Validation des champs obligatoires (détection changement API)
+        if pages == 1 and results:
+            premier_dpe = results[0]
+            champs_manquants = [c for c in CHAMPS_API_OBLIGATOIRES if c not in premier_dpe]
+            if champs_manquants:
+                erreur = f"⚠️ API ADEME a changé ! Champs manquants: {champs_manquants}"
+                print(f"[ADEME] {erreur}")
+                raise ValueError(erreur)
+        
+        # Filet de sécurité: étiquette et date revérifiées côté client
+        for dpe in results:
+            if dpe.get("etiquette_dpe") not in etiquettes:
+                continue
+            date_reception = dpe.get("date_reception_dpe", "")
+            if date_reception and date_reception >= date_limite:
+                dpes.append(dpe)
         
-        # Vérifier date
-        date_reception = dpe.get("date_reception_dpe", "")
-        if date_reception and date_reception >= date_limite:
-            dpes.append(dpe)
+        # Page incomplète = fin; sinon lien "next" (curseur after) fourni par data-fair
+        if len(results) < ADEME_TAILLE_PAGE:
+            break
+        url = result.get("next")
+    
+    if pages > 1:
+        print(f"[ADEME] {code_postal}: {len(dpes)} DPE sur {pages} pages")
     
     return dpes
 
 
+def recuperer_dpe_codes_postaux(codes_postaux, dates_debut=None, **kwargs):
+    """
+    Récupère les DPE de plusieurs codes postaux en parallèle
+    (ADEME_CONCURRENCE threads, débit borné par le token bucket ADEME).
+    
+    Args:
+        dates_debut: dict code_postal -> date de début (curseurs incrémentaux)
+    
+    Returns:
+        dict code_postal -> liste des DPE, dans l'ordre de codes_postaux
+    """
+    codes_postaux = list(codes_postaux)
+    if not codes_postaux:
+        return {}
+    
+    workers = max(1, min(ADEME_CONCURRENCE, len(codes_postaux)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ademe") as pool:
+        futures = []
+        for cp in codes_postaux:
+            kwargs_cp = dict(kwargs)
+            if dates_debut and dates_debut.get(cp):
+                kwargs_cp["date_debut"] = dates_debut[cp]
+            futures.append((cp, pool.submit(get_dpe_ademe, cp, **kwargs_cp)))
+        # result() relance les exceptions (ex: changement de schéma API)
+        return {cp: future.result() for cp, future in futures}
+
+
 # === ENRICHISSEMENT DVF ===
 
-_dvf_cache = {}
+# Index DVF sur disque (SQLite), alimenté année par année à partir des CSV
+# geo-dvf puis interrogé à la demande. Une année déjà chargée n'est jamais
+# retraitée (table annees_chargees), sauf rechargement explicite.
+DVF_URL_MODELE = "https://files.data.gouv.fr/geo-dvf/latest/csv/{annee}/departements/24.csv.gz"
+DVF_ANNEES = [int(a) for a in os.environ.get("DVF_ANNEES", "2020,2021,2022,2023,2024").split(",") if a.strip()]
+# Index sur le volume persistant Railway s'il est monté; /tmp est vidé à
+# chaque redéploiement (toutes les années retéléchargées)
+DVF_INDEX_PATH = os.environ.get("DVF_INDEX_PATH") or os.path.join(
+    os.environ.get("RAILWAY_VOLUME_MOUNT_PATH") or "/tmp", "dvf_24.sqlite")
+DVF_CHEMINS_EPHEMERES = ("/tmp/", "/var/tmp/", "/dev/shm/")
+DVF_REESSAI_S = 300            # Index incomplet: nouvel essai après 5 min, doublé...
+DVF_REESSAI_MAX_S = 6 * 3600   # ...jusqu'à 6 h
+DVF_LOT_INSERTION = 5000
+DVF_MIN_MOTS_COMMUNS = 3  # Seuil d'acceptation de la recherche approximative
+DVF_INDEX_CP_MAX = 64     # Index inversés gardés en mémoire (codes postaux)
+
+# Seules colonnes du CSV conservées
+DVF_COLONNES = ("date_mutation", "valeur_fonciere", "adresse_numero", "adresse_nom_voie",
+                "code_postal", "nom_commune", "type_local", "surface_reelle_bati")
+
+_dvf_local = threading.local()  # Une connexion SQLite par thread
+_dvf_generation = 0             # Incrémenté à chaque modification de l'index
+_dvf_build_lock = threading.Lock()
+_dvf_annees_verifiees = False   # Vrai quand l'index couvre DVF_ANNEES
+_dvf_prochain_essai = 0.0       # time.monotonic() du prochain chargement permis
+_dvf_echecs = 0
+
+
+def _ouvrir_index_dvf_ecriture(chemin):
+    """Connexion d'écriture: schéma créé si besoin, WAL pour les lecteurs"""
+    conn = sqlite3.connect(chemin)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "mutations" in tables and "annees_chargees" not in tables:
+        # Index mono-année d'une version précédente: reconstruit de zéro
+        conn.close()
+        os.remove(chemin)
+        conn = sqlite3.connect(chemin)
+    
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS mutations (
+            cle TEXT NOT NULL,
+            annee INTEGER NOT NULL,
+            date TEXT,
+            prix REAL,
+            type TEXT,
+            surface REAL,
+            commune TEXT,
+            code_postal TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS annees_chargees (
+            annee INTEGER PRIMARY KEY,
+            source TEXT,
+            nb_mutations INTEGER,
+            date_chargement TEXT
+        )
+    """)
+    conn.commit()
+    return conn
 
-def charger_dvf_dordogne():
-    """Charge les données DVF de Dordogne (cache en mémoire)"""
-    global _dvf_cache
+
+def _lignes_dvf(flux_texte):
+    """
+    Parcours en flux du CSV DVF (csv.reader: champs entre guillemets gérés).
+    Produit les tuples prêts à insérer, sans la colonne annee.
+    """
+    reader = csv.reader(flux_texte)
+    headers = next(reader)
+    idx = {h: i for i, h in enumerate(headers)}
+    manquantes = [c for c in DVF_COLONNES if c not in idx]
+    if manquantes:
+        raise ValueError(f"Format DVF inattendu, colonnes manquantes: {manquantes}")
+    
+    i_date, i_prix, i_numero, i_voie, i_cp, i_commune, i_type, i_surface = (idx[c] for c in DVF_COLONNES)
+    nb_colonnes = max(idx[c] for c in DVF_COLONNES) + 1
+    
+    for cols in reader:
+        if len(cols) < nb_colonnes:
+            continue
+        
+        # Clé = code_postal + adresse normalisée
+        cp = cols[i_cp]
+        adresse = cols[i_numero] + " " + cols[i_voie]
+        yield (
+            f"{cp}:{normaliser_adresse(adresse)}",
+            cols[i_date],
+            safe_float(cols[i_prix]),
+            cols[i_type],
+            safe_float(cols[i_surface]),
+            cols[i_commune],
+            cp
+        )
+
+
+def charger_annee_dvf(conn, annee, url_modele=None):
+    """
+    Ajoute une année DVF à l'index en une transaction (archive via le cache
+    HTTP disque, lecture en flux du gzip, insertion par lots).
+    Retourne le nombre de mutations.
+    """
+    url = (url_modele or DVF_URL_MODELE).format(annee=annee)
+    debut = time.time()
+    
+    nb_lignes = 0
+    try:
+        # Archive servie par le miroir disque (304 = pas de retéléchargement,
+        # copie récente acceptée si data.gouv.fr est injoignable)
+        with http_cache.ouvrir(url, headers={"User-Agent": "ICI-Dordogne/1.0"}, timeout=60, context=SSL_CONTEXT,
+                               allow_stale=True) as archive, \
+                gzip.open(archive, "rt", encoding="utf-8", newline="") as flux:
+            # Rechargement éventuel: l'année est remplacée dans la même transaction
+            conn.execute("DELETE FROM mutations WHERE annee = ?", (annee,))
+            lot = []
+            for ligne in _lignes_dvf(flux):
+                lot.append((ligne[0], annee) + ligne[1:])
+                if len(lot) >= DVF_LOT_INSERTION:
+                    conn.executemany("INSERT INTO mutations VALUES (?, ?, ?, ?, ?, ?, ?, ?)", lot)
+                    nb_lignes += len(lot)
+                    lot = []
+            if lot:
+                conn.executemany("INSERT INTO mutations VALUES (?, ?, ?, ?, ?, ?, ?, ?)", lot)
+                nb_lignes += len(lot)
+        
+        conn.execute(
+            "INSERT OR REPLACE INTO annees_chargees VALUES (?, ?, ?, ?)",
+            (annee, url, nb_lignes, datetime.now().isoformat(timespec="seconds"))
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
     
-    if _dvf_cache:
-        return _dvf_cache
+    print(f"[DVF] {annee}: {nb_lignes} mutations ajoutées ({time.time() - debut:.1f}s)")
+    return nb_lignes
+
+
+def annees_dvf_chargees(chemin=None):
+    """Années présentes dans l'index (vide si pas d'index)"""
+    chemin = chemin or DVF_INDEX_PATH
+    if not os.path.exists(chemin):
+        return set()
+    try:
+        conn = sqlite3.connect(f"file:{chemin}?mode=ro", uri=True)
+        try:
+            return {row[0] for row in conn.execute("SELECT annee FROM annees_chargees")}
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return set()
+
+
+def construire_index_dvf(chemin=None, annees=None, url_modele=None, recharger=()):
+    """
+    Ajoute à l'index SQLite les années DVF pas encore chargées.
     
-    print("[DVF] Chargement des données Dordogne...")
+    Args:
+        annees: années voulues (None = DVF_ANNEES)
+        recharger: années à recharger même si déjà présentes (millésime en cours)
     
-    url = "https://files.data.gouv.fr/geo-dvf/latest/csv/2024/departements/24.csv.gz"
+    Returns:
+        dict de stats ou None si aucune année n'a pu être chargée
+    """
+    chemin = chemin or DVF_INDEX_PATH
+    annees = sorted(annees or DVF_ANNEES)
+    debut = time.time()
     
+    conn = _ouvrir_index_dvf_ecriture(chemin)
     try:
-        req = urllib.request.Request(url, headers={"User-Agent": "ICI-Dordogne/1.0"})
-        with urllib.request.urlopen(req, timeout=60, context=SSL_CONTEXT) as resp:
-            compressed = BytesIO(resp.read())
-            with gzip.open(compressed, 'rt', encoding='utf-8') as f:
-                # Parser CSV
-                lines = f.readlines()
-                headers = lines[0].strip().split(',')
-                
-                # Index des colonnes importantes
-                idx = {h: i for i, h in enumerate(headers)}
-                
-                for line in lines[1:]:
-                    try:
-                        cols = line.strip().split(',')
-                        if len(cols) < 10:
-                            continue
-                        
-                        # Clé = code_postal + adresse normalisée
-                        cp = cols[idx.get("code_postal", 16)]
-                        adresse = cols[idx.get("adresse_numero", 8)] + " " + cols[idx.get("adresse_nom_voie", 10)]
-                        adresse_norm = normaliser_adresse(adresse)
-                        
-                        cle = f"{cp}:{adresse_norm}"
-                        
-                        mutation = {
-                            "date": cols[idx.get("date_mutation", 1)],
-                            "prix": safe_float(cols[idx.get("valeur_fonciere", 4)]),
-                            "type": cols[idx.get("type_local", 13)],
-                            "surface": safe_float(cols[idx.get("surface_reelle_bati", 14)]),
-                            "commune": cols[idx.get("nom_commune", 17)],
-                            "code_postal": cp
-                        }
-                        
-                        if cle not in _dvf_cache:
-                            _dvf_cache[cle] = []
-                        _dvf_cache[cle].append(mutation)
-                        
-                    except Exception:
-                        continue
-                
-                print(f"[DVF] {len(_dvf_cache)} adresses indexées")
-                return _dvf_cache
-                
-    except Exception as e:
-        print(f"[DVF] Erreur chargement: {e}")
-        return {}
+        deja = {row[0] for row in conn.execute("SELECT annee FROM annees_chargees")}
+        a_charger = [a for a in annees if a not in deja or a in recharger]
+        if a_charger:
+            print(f"[DVF] Index {chemin}: chargement {a_charger} (déjà chargées: {sorted(deja)})")
+        
+        chargees, erreurs = [], {}
+        for annee in a_charger:
+            try:
+                charger_annee_dvf(conn, annee, url_modele)
+                chargees.append(annee)
+            except Exception as e:
+                print(f"[DVF] Erreur chargement {annee}: {e}")
+                erreurs[annee] = str(e)
+        
+        # Index créé après le premier chargement (plus rapide qu'en insertion)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_mutations_cle ON mutations (cle, date)")
+        conn.commit()
+        
+        nb_mutations, nb_adresses = conn.execute("SELECT COUNT(*), COUNT(DISTINCT cle) FROM mutations").fetchone()
+        presentes = sorted(row[0] for row in conn.execute("SELECT annee FROM annees_chargees"))
+    finally:
+        conn.close()
+    
+    if chargees:
+        fermer_index_dvf()
+    
+    if not presentes:
+        return None
+    
+    stats = {
+        "chemin": chemin,
+        "annees": presentes,
+        "annees_ajoutees": chargees,
+        "erreurs": erreurs,
+        "nb_mutations": nb_mutations,
+        "nb_adresses": nb_adresses,
+        "taille_mo": round(os.path.getsize(chemin) / 1e6, 1),
+        "duree_s": round(time.time() - debut, 1)
+    }
+    if chargees:
+        print(f"[DVF] {nb_adresses} adresses indexées ({nb_mutations} mutations, années {presentes}, {stats['taille_mo']} Mo)")
+    return stats
+
+
+def fermer_index_dvf():
+    """Invalide connexions et index inversés (après modification de l'index)"""
+    global _dvf_generation
+    _dvf_generation += 1
+    with _dvf_index_cp_lock:
+        _dvf_index_cp.clear()
+
+
+def index_dvf_ephemere(chemin=None):
+    """Vrai si l'index est sur un disque vidé au redéploiement (/tmp...)"""
+    chemin = os.path.realpath(chemin or DVF_INDEX_PATH)
+    return chemin.startswith(DVF_CHEMINS_EPHEMERES)
+
+
+def _completer_index_dvf():
+    """
+    Charge les années de DVF_ANNEES absentes de l'index (sous _dvf_build_lock).
+    Tant qu'il en manque, les essais suivants sont espacés (backoff
+    exponentiel) au lieu de retélécharger à chaque DPE.
+    """
+    global _dvf_annees_verifiees, _dvf_prochain_essai, _dvf_echecs
+    
+    if not set(DVF_ANNEES) <= annees_dvf_chargees():
+        if index_dvf_ephemere():
+            print(f"[DVF] ⚠️ DVF_INDEX_PATH={DVF_INDEX_PATH} est éphémère: index retéléchargé à chaque "
+                  f"redéploiement. Monter un volume (RAILWAY_VOLUME_MOUNT_PATH) ou définir DVF_INDEX_PATH.")
+        try:
+            construire_index_dvf()
+        except Exception as e:
+            print(f"[DVF] Erreur construction index {DVF_INDEX_PATH}: {e}")
+    
+    manquantes = sorted(set(DVF_ANNEES) - annees_dvf_chargees())
+    if not manquantes:
+        _dvf_annees_verifiees = True
+        _dvf_echecs = 0
+        return
+    
+    delai = min(DVF_REESSAI_MAX_S, DVF_REESSAI_S * 2 ** _dvf_echecs)
+    _dvf_echecs += 1
+    _dvf_prochain_essai = time.monotonic() + delai
+    print(f"[DVF] Années {manquantes} non chargées - nouvel essai dans {delai / 60:.0f} min")
+
+
+def charger_dvf_dordogne():
+    """
+    Connexion SQLite en lecture seule à l'index DVF du thread courant.
+    Charge d'abord les années de DVF_ANNEES absentes de l'index, jusqu'à
+    les avoir toutes (None si aucune donnée disponible).
+    """
+    # Avant la connexion en cache: un index partiel doit être complété
+    if not _dvf_annees_verifiees and time.monotonic() >= _dvf_prochain_essai:
+        with _dvf_build_lock:
+            if not _dvf_annees_verifiees and time.monotonic() >= _dvf_prochain_essai:
+                _completer_index_dvf()
+    
+    conn = getattr(_dvf_local, "conn", None)
+    if conn is not None and getattr(_dvf_local, "generation", None) == _dvf_generation:
+        return conn
+    if conn is not None:
+        conn.close()
+        _dvf_local.conn = None
+    
+    if not os.path.exists(DVF_INDEX_PATH):
+        return None
+    
+    try:
+        conn = sqlite3.connect(f"file:{DVF_INDEX_PATH}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+    except sqlite3.Error as e:
+        print(f"[DVF] Erreur ouverture index: {e}")
+        return None
+    
+    _dvf_local.conn = conn
+    _dvf_local.generation = _dvf_generation
+    return conn
 
 
 def normaliser_adresse(adresse):
@@ -462,6 +1132,99 @@ def safe_float(val):
         return 0
 
 
+class IndexAdressesCP:
+    """
+    Index inversé token -> adresses d'un code postal, pondéré TF-IDF.
+    Score = cosinus entre les ensembles de tokens (poids idf), égalités
+    départagées par l'ordre du fichier DVF: résultat déterministe.
+    """
+    
+    __slots__ = ("adresses", "tokens", "postings", "idf", "idf_inconnu", "normes")
+    
+    def __init__(self, adresses):
+        self.adresses = adresses
+        self.tokens = [frozenset(a.split()) for a in adresses]
+        self.postings = {}
+        for doc_id, tokens in enumerate(self.tokens):
+            for token in tokens:
+                self.postings.setdefault(token, []).append(doc_id)
+        
+        n = len(adresses)
+        self.idf = {t: math.log((n + 1) / (len(docs) + 1)) + 1 for t, docs in self.postings.items()}
+        self.idf_inconnu = math.log(n + 1) + 1
+        self.normes = [math.sqrt(sum(self.idf[t] ** 2 for t in tokens)) or 1.0 for tokens in self.tokens]
+    
+    def rechercher(self, adresse_norm, k=5, min_communs=DVF_MIN_MOTS_COMMUNS):
+        """Top-k [(score, adresse)] ayant au moins min_communs tokens en commun"""
+        tokens = set(adresse_norm.split())
+        if len(tokens) < min_communs:
+            return []
+        
+        # Un candidat partage au moins min_communs tokens: il contient donc
+        # forcément un des (n - min_communs + 1) tokens les plus rares
+        rares = sorted(tokens, key=lambda t: (len(self.postings.get(t, ())), t))
+        candidats = set()
+        for token in rares[:len(tokens) - min_communs + 1]:
+            candidats.update(self.postings.get(token, ()))
+        
+        norme_q = math.sqrt(sum(self.idf.get(t, self.idf_inconnu) ** 2 for t in tokens))
+        scores = []
+        for doc_id in candidats:
+            communs = tokens & self.tokens[doc_id]
+            if len(communs) >= min_communs:
+                produit = sum(self.idf[t] ** 2 for t in communs)
+                scores.append((produit / (norme_q * self.normes[doc_id]), -doc_id))
+        return [(score, self.adresses[-neg_id]) for score, neg_id in heapq.nlargest(k, scores)]
+
+
+_dvf_index_cp = OrderedDict()  # (génération, code_postal) -> IndexAdressesCP, LRU
+_dvf_index_cp_lock = threading.Lock()
+
+
+def get_index_adresses_cp(code_postal):
+    """Index inversé d'un code postal, construit depuis SQLite au premier appel"""
+    cle_cache = (_dvf_generation, code_postal)
+    with _dvf_index_cp_lock:
+        index = _dvf_index_cp.get(cle_cache)
+        if index is not None:
+            _dvf_index_cp.move_to_end(cle_cache)
+            return index
+    
+    conn = charger_dvf_dordogne()
+    if conn is None:
+        return None
+    
+    # Clés "cp:..." par plage d'index, dans l'ordre du fichier DVF
+    rows = conn.execute(
+        "SELECT cle FROM mutations WHERE cle >= ? AND cle < ? GROUP BY cle ORDER BY MIN(rowid)",
+        (f"{code_postal}:", f"{code_postal};")
+    ).fetchall()
+    index = IndexAdressesCP([cle.split(":", 1)[1] for (cle,) in rows])
+    
+    with _dvf_index_cp_lock:
+        _dvf_index_cp[cle_cache] = index
+        while len(_dvf_index_cp) > DVF_INDEX_CP_MAX:
+            _dvf_index_cp.popitem(last=False)
+    return index
+
+
+def candidats_dvf(code_postal, adresse_norm, k=5):
+    """Top-k adresses DVF du code postal les plus proches: [(score, adresse)]"""
+    index = get_index_adresses_cp(code_postal)
+    if index is None:
+        return []
+    return index.rechercher(adresse_norm, k)
+
+
+def _mutations_dvf(conn, cle):
+    """Mutations d'une clé, de la plus récente à la plus ancienne"""
+    rows = conn.execute(
+        "SELECT date, prix, type, surface, commune, code_postal FROM mutations WHERE cle = ? ORDER BY date DESC",
+        (cle,)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
 def rechercher_dvf(code_postal, adresse):
     """
     Recherche l'historique DVF pour une adresse
@@ -469,13 +1232,15 @@ def rechercher_dvf(code_postal, adresse):
     Returns:
         dict avec historique des ventes ou None
     """
-    dvf = charger_dvf_dordogne()
+    conn = charger_dvf_dordogne()
+    if conn is None:
+        return {"trouve": False}
     
     adresse_norm = normaliser_adresse(adresse)
     cle = f"{code_postal}:{adresse_norm}"
     
-    if cle in dvf:
-        mutations = sorted(dvf[cle], key=lambda x: x["date"], reverse=True)
+    mutations = _mutations_dvf(conn, cle)
+    if mutations:
         derniere = mutations[0]
         
         return {
@@ -487,28 +1252,24 @@ def rechercher_dvf(code_postal, adresse):
             "historique": mutations[:5]
         }
     
-    # Recherche approximative (même code postal, adresse similaire)
-    for k, v in dvf.items():
-        if k.startswith(f"{code_postal}:"):
-            k_adresse = k.split(":", 1)[1]
-            # Similarité simple : mots en commun
-            mots_recherche = set(adresse_norm.split())
-            mots_cle = set(k_adresse.split())
-            communs = mots_recherche & mots_cle
-            
-            if len(communs) >= 3:  # Au moins 3 mots en commun
-                mutations = sorted(v, key=lambda x: x["date"], reverse=True)
-                derniere = mutations[0]
-                
-                return {
-                    "trouve": True,
-                    "approximatif": True,
-                    "date_derniere_vente": derniere["date"],
-                    "prix_derniere_vente": derniere["prix"],
-                    "type_derniere_vente": derniere["type"],
-                    "nb_mutations": len(mutations),
-                    "historique": mutations[:5]
-                }
+    # Recherche approximative: meilleure adresse du même code postal
+    candidats = candidats_dvf(code_postal, adresse_norm, k=1)
+    if candidats:
+        score, k_adresse = candidats[0]
+        mutations = _mutations_dvf(conn, f"{code_postal}:{k_adresse}")
+        derniere = mutations[0]
+        
+        return {
+            "trouve": True,
+            "approximatif": True,
+            "adresse_dvf": k_adresse,
+            "score_similarite": round(score, 3),
+            "date_derniere_vente": derniere["date"],
+            "prix_derniere_vente": derniere["prix"],
+            "type_derniere_vente": derniere["type"],
+            "nb_mutations": len(mutations),
+            "historique": mutations[:5]
+        }
     
     return {"trouve": False}
 
@@ -534,85 +1295,145 @@ def generer_lien_maps_gps(lat, lon):
 
 # === SCORING ===
 
-def calculer_priorite(dpe_enrichi):
+def _annee_dvf(dvf_date):
+    """Année d'une date DVF, -1 si illisible"""
+    try:
+        return int(dvf_date[:4])
+    except (TypeError, ValueError):
+        return -1
+
+
+def colonnes_scoring(dpes_enrichis):
+    """Colonnes utiles au scoring, extraites d'une liste de DPE enrichis"""
+    return {
+        "etiquettes": [d.get("dpe_lettre", "") or "" for d in dpes_enrichis],
+        "jours": [d.get("jours_depuis_reception", 999) for d in dpes_enrichis],
+        "dvf_trouve": [bool(d.get("dvf_trouve", False)) for d in dpes_enrichis],
+        "dvf_annees": [_annee_dvf(d.get("dvf_date_derniere_vente", "")) for d in dpes_enrichis],
+    }
+
+
+def scorer_dpe_lot(etiquettes, jours, dvf_trouve, dvf_annees, annee_courante=None):
     """
-    Calcule la priorité P1/P2/P3
+    Scoring d'un lot de DPE en colonnes (NumPy si disponible).
     
     P1: F/G + < 30 jours + probable VENTE (pas dans DVF récent)
-    P2: F/G + < 60 jours OU E + < 30 jours  
+    P2: F/G + < 60 jours OU E + < 30 jours
     P3: Autres
-    """
-    score = 0
-    raisons = []
-    
-    etiquette = dpe_enrichi.get("dpe_lettre", "")
-    jours = dpe_enrichi.get("jours_depuis_reception", 999)
-    dvf_trouve = dpe_enrichi.get("dvf_trouve", False)
-    dvf_date = dpe_enrichi.get("dvf_date_derniere_vente", "")
-    
-    # Passoire F/G
-    if etiquette in ["F", "G"]:
-        score += 50
-        raisons.append(f"Passoire {etiquette}")
-    elif etiquette == "E":
-        score += 20
-        raisons.append("DPE E")
-    
-    # Fraîcheur
-    if jours <= 30:
-        score += 30
-        raisons.append("< 30 jours")
-    elif jours <= 60:
-        score += 15
-        raisons.append("< 60 jours")
-    
-    # Probabilité vente (pas de vente DVF récente = probable vente)
-    if dvf_trouve:
-        try:
-            dvf_annee = int(dvf_date[:4])
-            if dvf_annee < 2022:  # Achat ancien = probable revente
-                score += 20
-                raisons.append(f"Achat {dvf_annee}")
-        except:
-            pass
-    else:
-        score += 10  # Pas dans DVF = peut-être location
     
-    # Déterminer priorité
-    if score >= 80:
-        priorite = "P1"
-    elif score >= 50:
-        priorite = "P2"
-    else:
-        priorite = "P3"
+    Vente/location: pas de DVF -> VENTE, DVF <= 2 ans -> LOCATION,
+    DVF plus ancien -> VENTE, date DVF illisible -> INCONNU.
     
-    return priorite, raisons
+    Args:
+        dvf_annees: année de la dernière vente DVF (-1 si illisible)
+    
+    Returns:
+        (priorites, raisons, ventes_location), listes dans l'ordre d'entrée
+    """
+    if annee_courante is None:
+        annee_courante = datetime.now().year
+    
+    if not NUMPY_OK:
+        return _scorer_dpe_lot_python(etiquettes, jours, dvf_trouve, dvf_annees, annee_courante)
+    
+    etiquettes = np.asarray(etiquettes, dtype="U1")
+    jours = np.asarray(jours, dtype=np.int64)
+    trouve = np.asarray(dvf_trouve, dtype=bool)
+    annees = np.asarray(dvf_annees, dtype=np.int64)
+    annee_valide = annees >= 0
+    
+    passoire = (etiquettes == "F") | (etiquettes == "G")
+    dpe_e = etiquettes == "E"
+    frais_30 = jours <= 30
+    frais_60 = ~frais_30 & (jours <= 60)
+    achat_ancien = trouve & annee_valide & (annees < 2022)  # Achat ancien = probable revente
+    
+    score = (
+        np.where(passoire, 50, np.where(dpe_e, 20, 0))
+        + np.where(frais_30, 30, np.where(frais_60, 15, 0))
+        + np.where(trouve, np.where(achat_ancien, 20, 0), 10)  # Pas dans DVF = peut-être location
+    )
+    priorites = np.where(score >= 80, "P1", np.where(score >= 50, "P2", "P3"))
+    ventes = np.where(
+        ~trouve, "VENTE",
+        np.where(~annee_valide, "INCONNU",
+                 np.where(annee_courante - annees <= 2, "LOCATION", "VENTE"))
+    )
+    
+    raison_dpe = np.where(passoire, np.char.add("Passoire ", etiquettes), np.where(dpe_e, "DPE E", ""))
+    raison_jours = np.where(frais_30, "< 30 jours", np.where(frais_60, "< 60 jours", ""))
+    raison_achat = np.where(achat_ancien, np.char.add("Achat ", annees.astype("U4")), "")
+    raisons = [
+        [r for r in ligne if r]
+        for ligne in zip(raison_dpe.tolist(), raison_jours.tolist(), raison_achat.tolist())
+    ]
+    
+    return priorites.tolist(), raisons, ventes.tolist()
+
+
+def _scorer_dpe_lot_python(etiquettes, jours, dvf_trouve, dvf_annees, annee_courante):
+    """Même règles que scorer_dpe_lot, sans NumPy (colonnes parcourues ensemble)"""
+    priorites, raisons, ventes = [], [], []
+    for etiquette, nb_jours, trouve, annee in zip(etiquettes, jours, dvf_trouve, dvf_annees):
+        score = 0
+        raisons_dpe = []
+        
+        if etiquette in ("F", "G"):
+            score += 50
+            raisons_dpe.append(f"Passoire {etiquette}")
+        elif etiquette == "E":
+            score += 20
+            raisons_dpe.append("DPE E")
+        
+        if nb_jours <= 30:
+            score += 30
+            raisons_dpe.append("< 30 jours")
+        elif nb_jours <= 60:
+            score += 15
+            raisons_dpe.append("< 60 jours")
+        
+        if trouve:
+            if 0 <= annee < 2022:
+                score += 20
+                raisons_dpe.append(f"Achat {annee}")
+            vente = "INCONNU" if annee < 0 else ("LOCATION" if annee_courante - annee <= 2 else "VENTE")
+        else:
+            score += 10
+            vente = "VENTE"
+        
+        priorites.append("P1" if score >= 80 else "P2" if score >= 50 else "P3")
+        raisons.append(raisons_dpe)
+        ventes.append(vente)
+    return priorites, raisons, ventes
+
+
+def scorer_dpes(dpes_enrichis):
+    """Applique le scoring par lot à des DPE enrichis (modifiés en place)"""
+    if not dpes_enrichis:
+        return dpes_enrichis
+    priorites, raisons, ventes = scorer_dpe_lot(**colonnes_scoring(dpes_enrichis))
+    for dpe, priorite, raisons_dpe, vente in zip(dpes_enrichis, priorites, raisons, ventes):
+        dpe["priorite"] = priorite
+        dpe["priorite_raisons"] = raisons_dpe
+        dpe["probable_vente_location"] = vente
+    return dpes_enrichis
+
+
+def calculer_priorite(dpe_enrichi):
+    """
+    Calcule la priorité P1/P2/P3 d'un DPE (lot de taille 1, voir scorer_dpe_lot)
+    """
+    priorites, raisons, _ = scorer_dpe_lot(**colonnes_scoring([dpe_enrichi]))
+    return priorites[0], raisons[0]
 
 
 def determiner_vente_location(dpe_enrichi):
     """
     Détermine si c'est probablement une VENTE ou LOCATION
-    
-    Logique:
-    - Si DVF récent (< 2 ans) → probablement LOCATION (déjà vendu)
-    - Si DVF ancien (> 2 ans) ou absent → probablement VENTE
+    (lot de taille 1, voir scorer_dpe_lot)
     """
-    dvf_trouve = dpe_enrichi.get("dvf_trouve", False)
-    dvf_date = dpe_enrichi.get("dvf_date_derniere_vente", "")
-    
-    if not dvf_trouve:
-        return "VENTE"  # Pas d'historique = probable première vente
-    
-    try:
-        dvf_annee = int(dvf_date[:4])
-        annee_actuelle = datetime.now().year
-        
-        if annee_actuelle - dvf_annee <= 2:
-            return "LOCATION"  # Acheté récemment = probablement location
-        else:
-            return "VENTE"  # Acheté il y a longtemps = probable revente
-    except:
-        return "INCONNU"
+    _, _, ventes = scorer_dpe_lot(**colonnes_scoring([dpe_enrichi]))
+    return ventes[0]
 
 
 # === ENRICHISSEMENT COMPLET ===
@@ -703,10 +1524,7 @@ def enrichir_dpe(dpe_raw):
     }
     
     # Calcul scoring
-    enrichi["probable_vente_location"] = determiner_vente_location(enrichi)
-    priorite, raisons = calculer_priorite(enrichi)
-    enrichi["priorite"] = priorite
-    enrichi["priorite_raisons"] = raisons
+    scorer_dpes([enrichi])
     
     # Calcul plus-value si DVF trouvé
     if dvf.get("trouve") and dvf.get("prix_derniere_vente"):
@@ -992,6 +1810,94 @@ def generer_excel_enrichi(dpes_enrichis, fichier_sortie):
     return fichier_sortie
 
 
+# === PIPELINE ENRICHISSEMENT / TRELLO ===
+
+_FIN = object()  # Sentinelle de fin d'étage
+
+
+def _etage_enrichissement(q_entree, q_trello, q_marquage, creer_trello):
+    """Worker: enrichit les nouveaux DPE, aiguille les passoires vers Trello"""
+    while True:
+        item = q_entree.get()
+        if item is _FIN:
+            return
+        cp, dpe_raw = item
+        
+        print(f"    → NOUVEAU: {dpe_raw.get('adresse_brut', '?')[:40]}")
+        try:
+            dpe_enrichi = enrichir_dpe(dpe_raw)
+        except Exception as e:
+            print(f"      ✗ Enrichissement {dpe_raw.get('numero_dpe', '?')}: {e}")
+            q_marquage.put((cp, dpe_raw, None, "erreur_enrichissement"))
+            continue
+        
+        # Créer carte Trello UNIQUEMENT pour passoires F/G
+        is_passoire = dpe_enrichi.get("dpe_lettre", dpe_enrichi.get("etiquette_dpe", "")) in ETIQUETTES_TRELLO
+        if creer_trello and is_passoire:
+            q_trello.put((cp, dpe_enrichi))
+        else:
+            if creer_trello:
+                print(f"      → DPE {dpe_enrichi.get('dpe_lettre', '?')} - Stocké (pas de carte Trello)")
+            q_marquage.put((cp, dpe_enrichi, None, "stocke"))
+
+
+def _etage_trello(q_trello, q_marquage):
+    """Worker: crée les cartes Trello (débit borné par _trello_bucket)"""
+    while True:
+        item = q_trello.get()
+        if item is _FIN:
+            return
+        cp, dpe_enrichi = item
+        
+        print(f"      → 🔥 PASSOIRE {dpe_enrichi.get('dpe_lettre', '?')} - Création carte Trello...")
+        try:
+            trello_url = creer_carte_trello_dpe(dpe_enrichi)
+        except Exception as e:
+            print(f"      ✗ Trello: {e}")
+            trello_url = None
+        
+        if trello_url:
+            dpe_enrichi["trello_card_url"] = trello_url
+            print(f"      ✓ {trello_url}")
+            q_marquage.put((cp, dpe_enrichi, trello_url, "carte"))
+        else:
+            print(f"      ✗ Échec création carte")
+            q_marquage.put((cp, dpe_enrichi, None, "erreur_trello"))
+
+
+def _orchestrer_pipeline(a_enrichir, q_enrichir, q_trello, q_marquage, creer_trello):
+    """
+    Alimente l'étage d'enrichissement puis ferme les étages dans l'ordre:
+    la sentinelle n'arrive dans q_marquage qu'une fois tout traité.
+    """
+    workers_enrichissement = [
+        threading.Thread(target=_etage_enrichissement, args=(q_enrichir, q_trello, q_marquage, creer_trello),
+                         name=f"veille-enrichissement-{i}", daemon=True)
+        for i in range(max(1, VEILLE_WORKERS_ENRICHISSEMENT))
+    ]
+    workers_trello = [
+        threading.Thread(target=_etage_trello, args=(q_trello, q_marquage),
+                         name=f"veille-trello-{i}", daemon=True)
+        for i in range(max(1, VEILLE_WORKERS_TRELLO))
+    ]
+    for worker in workers_enrichissement + workers_trello:
+        worker.start()
+    
+    for item in a_enrichir:
+        q_enrichir.put(item)
+    for _ in workers_enrichissement:
+        q_enrichir.put(_FIN)
+    for worker in workers_enrichissement:
+        worker.join()
+    
+    for _ in workers_trello:
+        q_trello.put(_FIN)
+    for worker in workers_trello:
+        worker.join()
+    
+    q_marquage.put(_FIN)
+
+
 # === FONCTION PRINCIPALE ===
 
 def executer_veille_enrichie(codes_postaux=None, jours=30, creer_trello=True, fichier_excel=None, email_rapport=True):
@@ -1015,6 +1921,8 @@ def executer_veille_enrichie(codes_postaux=None, jours=30, creer_trello=True, fi
     print(f"[VEILLE] Codes postaux: {codes_postaux}")
     print(f"[VEILLE] Période: {jours} derniers jours")
     
+    compteurs_avant = get_db_compteurs()
+    
     # Init table PostgreSQL si disponible
     init_table_dpe_vus()
     
@@ -1033,63 +1941,141 @@ def executer_veille_enrichie(codes_postaux=None, jours=30, creer_trello=True, fi
         "p3": 0,
         "ventes_probables": 0,
         "cartes_trello": 0,
-        "erreurs_trello": 0
+        "erreurs_trello": 0,
+        "erreurs_enrichissement": 0,
+        "erreurs_marquage": 0
     }
     
-    # Récupérer les DPE par code postal
-    for cp in codes_postaux:
-        dpes_raw = get_dpe_ademe(cp)  # Utilise ETIQUETTES_DPE et DATE_DEBUT_COLLECTE
-        stats["total_api"] += len(dpes_raw)
-        print(f"  [{cp}] {len(dpes_raw)} DPE trouvés (depuis {DATE_DEBUT_COLLECTE})")
-        
-        for dpe_raw in dpes_raw:
-            numero_dpe = dpe_raw.get("numero_dpe", "")
-            
-            # Vérifier si déjà traité
-            if est_dpe_deja_vu(numero_dpe):
-                stats["deja_vus"] += 1
-                continue
-            
-            # NOUVEAU DPE → Enrichir
-            print(f"    → NOUVEAU: {dpe_raw.get('adresse_brut', '?')[:40]}")
-            dpe_enrichi = enrichir_dpe(dpe_raw)
+    # Curseurs incrémentaux: chaque code postal repart de sa dernière date
+    # traitée moins la fenêtre de recouvrement
+    curseurs = charger_curseurs_dpe()
+    dates_debut = {cp: date_debut_incrementale(curseurs.get(cp)) for cp in codes_postaux}
+    
+    # Récupérer les DPE de tous les codes postaux en parallèle
+    debut_fetch = time.time()
+    dpes_par_cp = recuperer_dpe_codes_postaux(codes_postaux, dates_debut=dates_debut)  # Utilise ETIQUETTES_DPE
+    stats["duree_fetch_ademe"] = round(time.time() - debut_fetch, 2)
+    print(f"[VEILLE] API ADEME: {len(codes_postaux)} codes postaux en {stats['duree_fetch_ademe']}s")
+    
+    # Session unique pour tout le run (une connexion empruntée au pool)
+    with db_session() as conn:
+        # Dédoublonnage: une requête par code postal
+        a_enrichir = []
+        restants = {}
+        date_max = {}
+        for cp in codes_postaux:
+            dpes_raw = dpes_par_cp[cp]
+            stats["total_api"] += len(dpes_raw)
+            print(f"  [{cp}] {len(dpes_raw)} DPE trouvés (depuis {dates_debut[cp]})")
             
-            # Stats
-            stats["nouveaux"] += 1
-            if dpe_enrichi["priorite"] == "P1":
-                stats["p1"] += 1
-            elif dpe_enrichi["priorite"] == "P2":
-                stats["p2"] += 1
+            deja_vus = filtrer_dpe_deja_vus([d.get("numero_dpe", "") for d in dpes_raw], conn)
+            restants[cp] = 0
+            for dpe_raw in dpes_raw:
+                numero_dpe = dpe_raw.get("numero_dpe", "")
+                
+                # Vérifier si déjà traité (base ou doublon dans la réponse API)
+                if numero_dpe in deja_vus:
+                    stats["deja_vus"] += 1
+                    continue
+                if numero_dpe:
+                    deja_vus.add(numero_dpe)
+                a_enrichir.append((cp, dpe_raw))
+                restants[cp] += 1
+            date_max[cp] = max((d.get("date_reception_dpe") or "" for d in dpes_raw), default="")
+        
+        # Étages enrichissement -> Trello dans des threads, marquage ici
+        # (seul ce thread utilise la connexion DB)
+        debut_pipeline = time.time()
+        q_enrichir = queue.Queue(maxsize=VEILLE_FILE_MAX)
+        q_trello = queue.Queue(maxsize=VEILLE_FILE_MAX)
+        q_marquage = queue.Queue(maxsize=VEILLE_FILE_MAX)
+        threading.Thread(
+            target=_orchestrer_pipeline,
+            args=(a_enrichir, q_enrichir, q_trello, q_marquage, creer_trello),
+            name="veille-pipeline", daemon=True
+        ).start()
+        
+        # Curseur d'un code postal avancé quand tous ses DPE sont marqués
+        # (jamais si l'un d'eux a échoué: il sera repris au run suivant)
+        curseurs_prets = [cp for cp in codes_postaux if restants[cp] == 0]
+        incomplets = set()
+        lot = []
+        cps_lot = set()
+        
+        def vider_lot():
+            if marquer_dpe_vus_lot(lot, conn) is None:
+                # Lot annulé: ses codes postaux gardent leur curseur, les
+                # autres codes prêts seront validés au prochain lot
+                stats["erreurs_marquage"] += len(lot)
+                incomplets.update(cps_lot)
+                curseurs_prets[:] = [cp_pret for cp_pret in curseurs_prets if cp_pret not in incomplets]
             else:
-                stats["p3"] += 1
-            
-            if dpe_enrichi["probable_vente_location"] == "VENTE":
-                stats["ventes_probables"] += 1
-            
-            # Vérifier si passoire F/G
-            is_passoire = dpe_enrichi.get("dpe_lettre", dpe_enrichi.get("etiquette_dpe", "")) in ETIQUETTES_TRELLO
-            if is_passoire:
-                stats["nouveaux_fg"] += 1
-            
-            # Créer carte Trello UNIQUEMENT pour passoires F/G
-            trello_url = None
-            if creer_trello and is_passoire:
-                print(f"      → 🔥 PASSOIRE {dpe_enrichi.get('dpe_lettre', '?')} - Création carte Trello...")
-                trello_url = creer_carte_trello_dpe(dpe_enrichi)
-                if trello_url:
-                    dpe_enrichi["trello_card_url"] = trello_url
-                    stats["cartes_trello"] += 1
-                    print(f"      ✓ {trello_url}")
+                for cp_pret in curseurs_prets:
+                    sauver_curseur_dpe(cp_pret, date_max[cp_pret], conn)
+                if conn:
+                    conn.commit()
+                curseurs_prets.clear()
+            lot.clear()
+            cps_lot.clear()
+        
+        try:
+            while True:
+                try:
+                    item = q_marquage.get(timeout=0.5)
+                except queue.Empty:
+                    # File momentanément vide: on valide ce qui est prêt
+                    if lot or curseurs_prets:
+                        vider_lot()
+                    continue
+                if item is _FIN:
+                    break
+                
+                cp, dpe_enrichi, trello_url, statut = item
+                restants[cp] -= 1
+                if statut == "erreur_enrichissement":
+                    stats["erreurs_enrichissement"] += 1
+                    incomplets.add(cp)
                 else:
-                    stats["erreurs_trello"] += 1
-                    print(f"      ✗ Échec création carte")
-            elif creer_trello and not is_passoire:
-                print(f"      → DPE {dpe_enrichi.get('dpe_lettre', '?')} - Stocké (pas de carte Trello)")
-            
-            # Marquer comme traité (tous les DPE, historique complet)
-            marquer_dpe_vu(dpe_enrichi, trello_url)
-            
-            nouveaux_dpes.append(dpe_enrichi)
+                    # Stats
+                    stats["nouveaux"] += 1
+                    if dpe_enrichi["priorite"] == "P1":
+                        stats["p1"] += 1
+                    elif dpe_enrichi["priorite"] == "P2":
+                        stats["p2"] += 1
+                    else:
+                        stats["p3"] += 1
+                    
+                    if dpe_enrichi["probable_vente_location"] == "VENTE":
+                        stats["ventes_probables"] += 1
+                    
+                    if dpe_enrichi.get("dpe_lettre", dpe_enrichi.get("etiquette_dpe", "")) in ETIQUETTES_TRELLO:
+                        stats["nouveaux_fg"] += 1
+                    if statut == "carte":
+                        stats["cartes_trello"] += 1
+                    elif statut == "erreur_trello":
+                        stats["erreurs_trello"] += 1
+                    
+                    # À marquer comme traité (tous les DPE, historique complet)
+                    lot.append((dpe_enrichi, trello_url))
+                    cps_lot.add(cp)
+                    nouveaux_dpes.append(dpe_enrichi)
+                
+                if restants[cp] == 0 and cp not in incomplets:
+                    curseurs_prets.append(cp)
+                if len(lot) >= VEILLE_LOT_MARQUAGE:
+                    vider_lot()
+        except Exception:
+            # Libérer les étages amont (files bornées) avant de propager
+            while q_marquage.get() is not _FIN:
+                pass
+            raise
+        
+        vider_lot()
+        stats["duree_pipeline"] = round(time.time() - debut_pipeline, 2)
+    
+    compteurs_apres = get_db_compteurs()
+    stats["db_connexions"] = compteurs_apres["connexions"] - compteurs_avant["connexions"]
+    stats["db_emprunts"] = compteurs_apres["emprunts"] - compteurs_avant["emprunts"]
     
     # Trier par priorité puis date
     nouveaux_dpes.sort(key=lambda x: (
@@ -1111,6 +2097,12 @@ def executer_veille_enrichie(codes_postaux=None, jours=30, creer_trello=True, fi
     print(f"  Cartes Trello créées: {stats['cartes_trello']}")
     if stats['erreurs_trello']:
         print(f"  ⚠️ Erreurs Trello: {stats['erreurs_trello']}")
+    if stats['erreurs_enrichissement']:
+        print(f"  ⚠️ Erreurs enrichissement (repris au prochain run): {stats['erreurs_enrichissement']}")
+    if stats['erreurs_marquage']:
+        print(f"  ⚠️ DPE non marqués (erreur DB, curseur non avancé): {stats['erreurs_marquage']}")
+    print(f"  Pipeline enrichissement/Trello: {stats['duree_pipeline']}s")
+    print(f"  DB: {stats['db_connexions']} connexion(s) ouverte(s), {stats['db_emprunts']} emprunt(s) au pool")
     
     return {
         "dpes": nouveaux_dpes,
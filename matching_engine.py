@@ -13,12 +13,17 @@ VALIDÉ PAR LUMO - 28/12/2025
 import os
 import re
 import json
+import hashlib
+import bisect
+import threading
+import time
 import urllib.request
 import urllib.parse
 import smtplib
 import ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from contextlib import nullcontext
 from datetime import datetime
 
 # ============================================================================
@@ -227,13 +232,25 @@ def normaliser_commune(commune):
 # HELPERS HTTP (sans requests - stdlib only)
 # ============================================================================
 
+def _chrono_sortant(service=None, url=None):
+    """
+    Chronométrage V19 de l'appel sortant (histogrammes /metrics). Import
+    tardif: ce module reste autonome (benchmarks, côté V18) et n'importe pas
+    le package axi_v19 au chargement.
+    """
+    try:
+        from axi_v19.core.metrics import outbound_timer, service_for_url
+    except ImportError:
+        return nullcontext()
+    return outbound_timer(service or service_for_url(url))
+
 def http_get(url, params=None):
     """GET request avec urllib"""
     if params:
         url = f"{url}?{urllib.parse.urlencode(params)}"
     req = urllib.request.Request(url)
     try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
+        with _chrono_sortant(url=url), urllib.request.urlopen(req, timeout=15) as resp:
             return json.loads(resp.read().decode('utf-8'))
     except Exception as e:
         print(f"[HTTP] Erreur GET {url}: {e}")
@@ -248,7 +265,7 @@ def http_post(url, params=None, data=None):
         req.data = json.dumps(data).encode('utf-8')
         req.add_header('Content-Type', 'application/json')
     try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
+        with _chrono_sortant(url=url), urllib.request.urlopen(req, timeout=15) as resp:
             return json.loads(resp.read().decode('utf-8'))
     except Exception as e:
         print(f"[HTTP] Erreur POST {url}: {e}")
@@ -283,7 +300,7 @@ def trello_put(endpoint, params=None):
     url_with_params = f"{url}?{urllib.parse.urlencode(params)}"
     req = urllib.request.Request(url_with_params, method='PUT')
     try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
+        with _chrono_sortant("trello"), urllib.request.urlopen(req, timeout=15) as resp:
             return json.loads(resp.read().decode('utf-8'))
     except Exception as e:
         print(f"[TRELLO PUT] Erreur {url}: {e}")
@@ -330,10 +347,14 @@ def init_database():
             site_url VARCHAR(300),
             site_prix INTEGER,
             site_surface INTEGER,
+            content_hash VARCHAR(40),
             updated_at TIMESTAMP DEFAULT NOW()
         )
     """)
     
+    # Migration tables existantes : hash de contenu pour la sync différentielle
+    cur.execute("ALTER TABLE biens_cache ADD COLUMN IF NOT EXISTS content_hash VARCHAR(40)")
+    
     # Index pour recherche rapide
     cur.execute("CREATE INDEX IF NOT EXISTS idx_biens_prix ON biens_cache(prix)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_biens_commune ON biens_cache(commune_normalisee)")
@@ -365,15 +386,57 @@ def init_database():
 # SYNC TRELLO → PostgreSQL
 # ============================================================================
 
+# Patterns compilés une fois au chargement du module
+_RE_REF = re.compile(r'\b(4\d{4}|3\d{4})\b')
+_RE_SITE_DESC = re.compile(r'(?:Lien site|Site)\s*:\s*\[?(https?://[^\s\]]+icidordogne\.fr[^\s\]]*)', re.IGNORECASE)
+_RE_SITE_LIBRE = re.compile(r'https?://(?:www\.)?icidordogne\.fr/[^\s\)\]"<>]*')
+_RE_PRIX_DESC = re.compile(r'(\d{2,3})\s*(\d{3})\s*€')
+_RE_PRIX_K = re.compile(r'(\d{2,3})\s*k€', re.IGNORECASE)
+_RE_SURFACE = re.compile(r'(\d{2,3})\s*m[²2]', re.IGNORECASE)
+_RE_COMMUNE_CP = re.compile(r'24\d{3}\s+([A-Za-zÀ-ÿ\-\'\s]+?)(?:\n|$|\()')
+_RE_COMMUNE_EX = re.compile(r'\(ex[:\s]+([^)]+)\)', re.IGNORECASE)
+
+# L'ordre des listes fixe la priorité (première commune connue trouvée)
+COMMUNES_CONNUES = ["bassillac", "auberoche", "vergt", "bugue", "tremolat",
+                    "saint-mayme", "saint-amand", "boulazac", "périgueux"]
+MOTS_CHECK = ["piscine", "grange", "étang", "etang", "vue", "terrain",
+              "garage", "dépendance", "dependance", "plain-pied", "rénovée", "renovee"]
+
+# Un seul scan de la description pour communes + mots-clés : alternation dans
+# un lookahead pour capturer aussi les occurrences imbriquées ("vue" dans "revue").
+# Le lookahead ne capture qu'un mot par position : un mot préfixe d'un autre
+# ("vue" / "vue mer") serait masqué partout où le plus long correspond. Ces
+# mots-là sont donc exclus de l'alternation et testés un par un.
+def compiler_vocabulaire(mots):
+    """(regex lookahead des mots sans préfixe, mots préfixes d'un autre mot)"""
+    vocabulaire = sorted(set(mots), key=len, reverse=True)
+    prefixes = [m for m in vocabulaire if any(a != m and a.startswith(m) for a in vocabulaire)]
+    regex = re.compile("(?=(" + "|".join(re.escape(m) for m in vocabulaire if m not in prefixes) + "))")
+    return regex, prefixes
+
+
+_RE_VOCABULAIRE, _MOTS_PREFIXES = compiler_vocabulaire(COMMUNES_CONNUES + MOTS_CHECK)
+
+
+def vocabulaire_trouve(texte, vocabulaire=(_RE_VOCABULAIRE, _MOTS_PREFIXES)):
+    """Communes + mots-clés présents dans texte (équivalent à `m in texte` pour chaque mot)"""
+    regex, prefixes = vocabulaire
+    trouves = set(regex.findall(texte))
+    trouves.discard("")  # Alternation vide si tous les mots sont préfixes
+    trouves.update(m for m in prefixes if m in texte)
+    return trouves
+
+
 def extraire_donnees_carte(card):
     """Extrait et structure les données d'une carte Trello"""
     desc = card.get("desc", "")
     name = card.get("name", "")
+    desc_lower = desc.lower()
     
     # Extraire REF du titre et description
     refs = []
-    refs.extend(re.findall(r'\b(4\d{4}|3\d{4})\b', name))
-    refs.extend(re.findall(r'\b(4\d{4}|3\d{4})\b', desc))
+    refs.extend(_RE_REF.findall(name))
+    refs.extend(_RE_REF.findall(desc))
     
     # Extraire REF des noms de pièces jointes + chercher site_url
     attachments_names = []
@@ -385,7 +448,7 @@ def extraire_donnees_carte(card):
         att_url = att.get("url", "")
         
         attachments_names.append(filename)
-        refs.extend(re.findall(r'\b(4\d{4}|3\d{4})\b', filename))
+        refs.extend(_RE_REF.findall(filename))
         
         # Chercher lien icidordogne.fr dans les attachments
         if not site_url and 'icidordogne.fr' in att_url:
@@ -394,7 +457,7 @@ def extraire_donnees_carte(card):
     
     # Méthode 2: Chercher dans la description (pattern "Lien site : https://...")
     if not site_url:
-        site_match = re.search(r'(?:Lien site|Site)\s*:\s*\[?(https?://[^\s\]]+icidordogne\.fr[^\s\]]*)', desc, re.IGNORECASE)
+        site_match = _RE_SITE_DESC.search(desc)
         if site_match:
             site_url = site_match.group(1).strip()
             print(f"[SYNC] Site URL trouvé (description pattern 1): {site_url}")
@@ -402,7 +465,7 @@ def extraire_donnees_carte(card):
     # Méthode 3: Chercher N'IMPORTE QUEL lien icidordogne.fr (Markdown ou texte brut)
     # RÈGLE D'OR V14.8: Un prospect qui contacte = bien FORCÉMENT sur notre site
     if not site_url:
-        site_match = re.search(r'https?://(?:www\.)?icidordogne\.fr/[^\s\)\]"<>]*', desc)
+        site_match = _RE_SITE_LIBRE.search(desc)
         if site_match:
             site_url = site_match.group(0).strip().rstrip(')')
             print(f"[SYNC] Site URL trouvé (format libre): {site_url}")
@@ -411,52 +474,48 @@ def extraire_donnees_carte(card):
     
     # Extraire prix
     prix = None
-    prix_match = re.search(r'(\d{2,3})\s*(\d{3})\s*€', desc)
+    prix_match = _RE_PRIX_DESC.search(desc)
     if prix_match:
         prix = int(prix_match.group(1) + prix_match.group(2))
     else:
-        prix_match = re.search(r'(\d{2,3})\s*k€', desc, re.IGNORECASE)
+        prix_match = _RE_PRIX_K.search(desc)
         if prix_match:
             prix = int(prix_match.group(1)) * 1000
     
     # Extraire surface
     surface = None
-    surface_match = re.search(r'(\d{2,3})\s*m[²2]', desc, re.IGNORECASE)
+    surface_match = _RE_SURFACE.search(desc)
     if surface_match:
         surface = int(surface_match.group(1))
     
+    # Vocabulaire connu (communes + mots-clés) en un passage
+    trouves = vocabulaire_trouve(desc_lower)
+    
     # Extraire commune
     commune_raw = None
     
     # Pattern 1: Code postal + commune
-    match = re.search(r'24\d{3}\s+([A-Za-zÀ-ÿ\-\'\s]+?)(?:\n|$|\()', desc)
+    match = _RE_COMMUNE_CP.search(desc)
     if match:
         commune_raw = match.group(1).strip()
     
     # Pattern 2: "ex saint-antoine" dans le texte
     if not commune_raw:
-        match = re.search(r'\(ex[:\s]+([^)]+)\)', desc, re.IGNORECASE)
+        match = _RE_COMMUNE_EX.search(desc)
         if match:
             commune_raw = match.group(1).strip()
     
     # Pattern 3: Communes connues
-    if not commune_raw:
-        communes_connues = ["bassillac", "auberoche", "vergt", "bugue", "tremolat",
-                           "saint-mayme", "saint-amand", "boulazac", "périgueux"]
-        for c in communes_connues:
-            if c in desc.lower():
+    if not commune_raw and trouves:
+        for c in COMMUNES_CONNUES:
+            if c in trouves:
                 commune_raw = c
                 break
     
     commune_normalisee = normaliser_commune(commune_raw) if commune_raw else None
     
     # Mots-clés
-    mots_cles = []
-    mots_check = ["piscine", "grange", "étang", "etang", "vue", "terrain",
-                  "garage", "dépendance", "dependance", "plain-pied", "rénovée", "renovee"]
-    for mot in mots_check:
-        if mot in desc.lower():
-            mots_cles.append(mot)
+    mots_cles = [mot for mot in MOTS_CHECK if mot in trouves]
     
     return {
         "trello_id": card["id"],
@@ -473,119 +532,244 @@ def extraire_donnees_carte(card):
         "site_url": site_url
     }
 
+SYNC_PAGE_SIZE = 500
+
+_BIENS_COLONNES = (
+    "trello_id", "trello_url", "proprietaire", "description",
+    "refs_trouvees", "prix", "surface", "commune", "commune_normalisee",
+    "mots_cles", "attachments_names", "site_url", "content_hash"
+)
+
+# Dernier rapport de sync (lu par run_sync_cron)
+_last_sync_report = {}
+
+
+def hash_bien(bien):
+    """Empreinte stable du contenu Trello d'un bien (détection des changements)"""
+    payload = json.dumps(bien, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
 def sync_biens_from_trello():
-    """Synchronise les biens Trello vers PostgreSQL"""
+    """
+    Synchronise les biens Trello vers PostgreSQL.
+
+    Upsert par lots (execute_values) des SEULES cartes dont le hash de contenu
+    a changé depuis la dernière sync. La connexion n'est ouverte qu'après le
+    téléchargement et le parsing du board.
+    """
+    global _last_sync_report
     print("[SYNC] Début synchronisation Trello → PostgreSQL")
+    timings = {}
     
-    # Récupérer toutes les cartes du board BIENS
-    cards = trello_get(f"/boards/{BOARD_BIENS}/cards", {
-        "fields": "name,desc,shortUrl,idList",
-        "attachments": "true"
-    })
+    # Phase 1: récupérer toutes les cartes du board BIENS (refresh complet du snapshot partagé)
+    debut = time.time()
+    entries = _board_snapshot.entries(force_full=True)
+    timings["fetch"] = round(time.time() - debut, 3)
     
-    if not cards:
+    if not entries:
         print("[SYNC] Erreur récupération Trello")
         return 0
     
+    # Phase 2: hash du contenu (hors connexion)
+    debut = time.time()
+    biens = {}
+    for entry in entries:
+        bien = dict(entry["bien"])
+        bien["content_hash"] = hash_bien(entry["bien"])
+        biens[bien["trello_id"]] = bien
+    timings["hash"] = round(time.time() - debut, 3)
+    
     conn = get_db_connection()
     if not conn:
         print("[SYNC] Pas de connexion DB")
         return 0
     
-    cur = conn.cursor()
-    count = 0
-    
-    for card in cards:
-        bien = extraire_donnees_carte(card)
+    try:
+        from psycopg2 import errors as pg_errors
+        from psycopg2.extras import execute_values
+        cur = conn.cursor()
+        
+        # Phase 3: diff avec les hashes en base (une seule requête)
+        debut = time.time()
+        try:
+            cur.execute("SELECT trello_id, content_hash FROM biens_cache")
+            existants = {row["trello_id"]: row["content_hash"] for row in cur.fetchall()}
+        except pg_errors.UndefinedColumn:
+            # Base antérieure à content_hash (init_database pas relancé):
+            # migration ici, puis upsert complet qui remplit les hashes
+            conn.rollback()
+            print("[SYNC] Colonne content_hash absente - ajout et upsert complet")
+            cur.execute("ALTER TABLE biens_cache ADD COLUMN IF NOT EXISTS content_hash VARCHAR(40)")
+            cur.execute("SELECT trello_id FROM biens_cache")
+            existants = {row["trello_id"]: None for row in cur.fetchall()}
         
-        # Upsert dans PostgreSQL
-        cur.execute("""
-            INSERT INTO biens_cache (
-                trello_id, trello_url, proprietaire, description,
-                refs_trouvees, prix, surface, commune, commune_normalisee,
-                mots_cles, attachments_names, site_url, updated_at
-            ) VALUES (
-                %(trello_id)s, %(trello_url)s, %(proprietaire)s, %(description)s,
-                %(refs_trouvees)s, %(prix)s, %(surface)s, %(commune)s, %(commune_normalisee)s,
-                %(mots_cles)s, %(attachments_names)s, %(site_url)s, NOW()
-            )
-            ON CONFLICT (trello_id) DO UPDATE SET
-                trello_url = EXCLUDED.trello_url,
-                proprietaire = EXCLUDED.proprietaire,
-                description = EXCLUDED.description,
-                refs_trouvees = EXCLUDED.refs_trouvees,
-                prix = EXCLUDED.prix,
-                surface = EXCLUDED.surface,
-                commune = EXCLUDED.commune,
-                commune_normalisee = EXCLUDED.commune_normalisee,
-                mots_cles = EXCLUDED.mots_cles,
-                attachments_names = EXCLUDED.attachments_names,
-                site_url = EXCLUDED.site_url,
-                updated_at = NOW()
-        """, bien)
-        count += 1
+        a_ecrire = [b for tid, b in biens.items() if existants.get(tid) != b["content_hash"]]
+        inserted = sum(1 for b in a_ecrire if b["trello_id"] not in existants)
+        updated = len(a_ecrire) - inserted
+        unchanged = len(biens) - len(a_ecrire)
+        timings["diff"] = round(time.time() - debut, 3)
+        
+        # Phase 4: upsert par pages
+        debut = time.time()
+        if a_ecrire:
+            execute_values(cur, f"""
+                INSERT INTO biens_cache ({", ".join(_BIENS_COLONNES)}, updated_at)
+                VALUES %s
+                ON CONFLICT (trello_id) DO UPDATE SET
+                    trello_url = EXCLUDED.trello_url,
+                    proprietaire = EXCLUDED.proprietaire,
+                    description = EXCLUDED.description,
+                    refs_trouvees = EXCLUDED.refs_trouvees,
+                    prix = EXCLUDED.prix,
+                    surface = EXCLUDED.surface,
+                    commune = EXCLUDED.commune,
+                    commune_normalisee = EXCLUDED.commune_normalisee,
+                    mots_cles = EXCLUDED.mots_cles,
+                    attachments_names = EXCLUDED.attachments_names,
+                    site_url = EXCLUDED.site_url,
+                    content_hash = EXCLUDED.content_hash,
+                    updated_at = NOW()
+            """, [tuple(b[col] for col in _BIENS_COLONNES) for b in a_ecrire],
+                template="(" + ", ".join(["%s"] * len(_BIENS_COLONNES)) + ", NOW())",
+                page_size=SYNC_PAGE_SIZE)
+        conn.commit()
+        timings["write"] = round(time.time() - debut, 3)
+        cur.close()
+    except Exception as e:
+        conn.rollback()
+        print(f"[SYNC] Erreur upsert: {e}")
+        return 0
+    finally:
+        conn.close()
     
-    conn.commit()
-    cur.close()
-    conn.close()
+    _last_sync_report = {
+        "total": len(biens),
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": unchanged,
+        "timings": timings
+    }
     
-    print(f"[SYNC] {count} biens synchronisés depuis Trello")
-    return count
+    print(f"[SYNC] {len(biens)} biens Trello: {inserted} insérés, {updated} mis à jour, "
+          f"{unchanged} inchangés (fetch {timings['fetch']}s, hash {timings['hash']}s, "
+          f"diff {timings['diff']}s, write {timings['write']}s)")
+    return len(biens)
 
 # ============================================================================
 # SYNC SITE WEB → PostgreSQL (enrichissement)
 # ============================================================================
 
+SITE_MAX_PAGES = 30
+
+_RE_SITE_REF = re.compile(r'REF[.\s:]*(\d{5})')
+_RE_SITE_SURFACE = re.compile(r'Surface[:\s]*(\d{2,3})\s*m')
+# Lien "page suivante": rel="next", ou pagination WordPress (classes "next" ET
+# "page-numbers"). "next" doit être une classe entière: les boutons de
+# carrousel (swiper-button-next, slick-next...) ne sont pas de la pagination.
+_SITE_NEXT_ATTR = (
+    r'(?:rel=["\']next["\']'
+    r'|class=["\'](?=[^"\']*(?<![\w-])page-numbers(?![\w-]))(?=[^"\']*(?<![\w-])next(?![\w-]))[^"\']*["\'])'
+)
+_RE_SITE_NEXT = re.compile(
+    r'<(?:a|link)\b[^>]*?' + _SITE_NEXT_ATTR + r'[^>]*?href=["\']([^"\']+)["\']'
+    r'|<(?:a|link)\b[^>]*?href=["\']([^"\']+)["\'][^>]*?' + _SITE_NEXT_ATTR,
+    re.IGNORECASE
+)
+
+
+def parser_page_listing(html):
+    """
+    Découpe une page de listing en tuples (ref, prix, surface) en un seul passage.
+
+    Chaque annonce s'étend d'un marqueur REF au suivant : prix et surface sont
+    cherchés uniquement dans ce segment.
+    """
+    marqueurs = list(_RE_SITE_REF.finditer(html))
+    annonces = []
+    for i, m in enumerate(marqueurs):
+        fin = marqueurs[i + 1].start() if i + 1 < len(marqueurs) else len(html)
+        segment = html[m.end():fin]
+        prix_match = _RE_PRIX_DESC.search(segment)
+        surface_match = _RE_SITE_SURFACE.search(segment)
+        annonces.append((
+            m.group(1),
+            int(prix_match.group(1) + prix_match.group(2)) if prix_match else None,
+            int(surface_match.group(1)) if surface_match else None
+        ))
+    return annonces
+
+
+def _page_suivante(html, url_courante):
+    """URL de la page suivante du listing (rel=next / a.next.page-numbers), None si dernière page"""
+    match = _RE_SITE_NEXT.search(html)
+    if not match:
+        return None
+    href = (match.group(1) or match.group(2)).replace("&amp;", "&")
+    return urllib.parse.urljoin(url_courante, href)
+
+
 def sync_biens_from_site():
-    """Scrape le site icidordogne.fr et enrichit la DB"""
+    """Scrape le site icidordogne.fr (toutes les pages du listing) et enrichit la DB"""
     print("[SYNC] Début scraping site web")
     
     try:
-        req = urllib.request.Request(f"{SITE_URL}/immobilier/")
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            html = resp.read().decode('utf-8')
+        # Parcours de la pagination
+        url = f"{SITE_URL}/immobilier/"
+        vues = set()
+        annonces = {}
+        while url and url not in vues and len(vues) < SITE_MAX_PAGES:
+            vues.add(url)
+            req = urllib.request.Request(url)
+            with urllib.request.urlopen(req, timeout=15) as resp:
+                html = resp.read().decode('utf-8')
+            
+            for ref, prix, surface in parser_page_listing(html):
+                # Première annonce porteuse d'info gagne (REF affichée plusieurs fois)
+                if ref not in annonces or annonces[ref] == (None, None):
+                    annonces[ref] = (prix, surface)
+            
+            url = _page_suivante(html, url)
         
-        # Trouver toutes les REF sur la page
-        refs_found = re.findall(r'REF[.\s:]*(\d{5})', html)
-        refs_found = list(set(refs_found))
+        print(f"[SYNC] {len(annonces)} REF trouvées sur le site ({len(vues)} pages)")
         
-        print(f"[SYNC] {len(refs_found)} REF trouvées sur le site")
+        valeurs = [
+            (ref, prix, surface, f"{SITE_URL}/immobilier/?fwp_ref={ref}")
+            for ref, (prix, surface) in annonces.items()
+            if prix or surface
+        ]
+        if not valeurs:
+            return 0
         
         conn = get_db_connection()
         if not conn:
             return 0
         
-        cur = conn.cursor()
-        count = 0
-        
-        for ref in refs_found:
-            # Extraire prix et surface si visible
-            # Pattern: "239 000 €" ou "Surface : 91m²"
-            prix_match = re.search(rf'{ref}.*?(\d{{2,3}})\s*(\d{{3}})\s*€', html, re.DOTALL)
-            surface_match = re.search(rf'{ref}.*?Surface[:\s]*(\d{{2,3}})\s*m', html, re.DOTALL)
+        try:
+            from psycopg2.extras import execute_values
+            cur = conn.cursor()
             
-            prix = int(prix_match.group(1) + prix_match.group(2)) if prix_match else None
-            surface = int(surface_match.group(1)) if surface_match else None
+            # Une seule requête pour toutes les REF
+            lignes = execute_values(cur, """
+                UPDATE biens_cache AS b
+                SET site_prix = COALESCE(v.prix, b.site_prix),
+                    site_surface = COALESCE(v.surface, b.site_surface),
+                    prix = COALESCE(v.prix, b.prix),
+                    surface = COALESCE(v.surface, b.surface),
+                    site_url = v.url,
+                    updated_at = NOW()
+                FROM (VALUES %s) AS v(ref, prix, surface, url)
+                WHERE v.ref = ANY(b.refs_trouvees)
+                RETURNING v.ref
+            """, valeurs, template="(%s, %s::integer, %s::integer, %s)",
+                page_size=len(valeurs), fetch=True)
             
-            if prix or surface:
-                cur.execute("""
-                    UPDATE biens_cache 
-                    SET site_prix = COALESCE(%s, site_prix),
-                        site_surface = COALESCE(%s, site_surface),
-                        prix = COALESCE(%s, prix),
-                        surface = COALESCE(%s, surface),
-                        site_url = %s,
-                        updated_at = NOW()
-                    WHERE %s = ANY(refs_trouvees)
-                """, (prix, surface, prix, surface, f"{SITE_URL}/immobilier/?fwp_ref={ref}", ref))
-                
-                if cur.rowcount > 0:
-                    count += 1
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+            cur.close()
+        finally:
+            conn.close()
         
+        count = len({ligne["ref"] for ligne in lignes})
         print(f"[SYNC] {count} biens enrichis depuis le site")
         return count
         
@@ -599,15 +783,285 @@ def run_sync_cron():
     
     count_trello = sync_biens_from_trello()
     count_site = sync_biens_from_site()
-    
-    print(f"[CRON] Terminé: {count_trello} Trello, {count_site} enrichis site")
-    
+
+    # Reconstruire l'index mémoire APRÈS les deux syncs (site enrichit prix/surface)
+    count_index = refresh_biens_index()
+
+    print(f"[CRON] Terminé: {count_trello} Trello, {count_site} enrichis site, {count_index} biens indexés")
+
     return {
         "trello": count_trello,
         "site": count_site,
+        "index": count_index,
+        "trello_report": _last_sync_report,
+        "snapshot_trello": get_board_snapshot_stats(),
         "timestamp": datetime.now().isoformat()
     }
 
+# ============================================================================
+# INDEX MÉMOIRE biens_cache (matching sans DB sur le chemin chaud)
+# ============================================================================
+
+class BiensIndex:
+    """
+    Index en mémoire de la table biens_cache, partagé par tout le process.
+
+    - REF → bien (hash map)
+    - Prix triés (bisect) pour les recherches ±10%
+    - Index inversé des communes (clé = commune en minuscules)
+
+    Reconstruit en bloc par rebuild() puis publié par un seul swap de
+    référence : les lecteurs voient toujours un snapshot cohérent.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    @property
+    def is_loaded(self):
+        return self._snapshot is not None
+
+    def rebuild(self, rows):
+        """Construit un nouveau snapshot depuis des lignes biens_cache (dicts)"""
+        biens = [dict(row) for row in rows]
+
+        by_ref = {}
+        prix_list = []
+        by_commune = {}
+
+        for bien in biens:
+            for ref in bien.get("refs_trouvees") or []:
+                by_ref.setdefault(ref, bien)
+
+            if bien.get("prix") is not None:
+                prix_list.append((bien["prix"], len(prix_list), bien))
+
+            commune = bien.get("commune")
+            if commune:
+                by_commune.setdefault(commune.lower(), []).append(bien)
+
+        prix_list.sort(key=lambda item: (item[0], item[1]))
+
+        snapshot = {
+            "biens": biens,
+            "by_ref": by_ref,
+            "prix_keys": [item[0] for item in prix_list],
+            "prix_biens": [item[2] for item in prix_list],
+            "by_commune": by_commune,
+            "loaded_at": datetime.now().isoformat()
+        }
+
+        with self._lock:
+            self._snapshot = snapshot
+        return len(biens)
+
+    def load_from_db(self):
+        """Charge biens_cache en UNE requête et reconstruit l'index"""
+        conn = get_db_connection()
+        if not conn:
+            return None
+
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM biens_cache ORDER BY id")
+            rows = cur.fetchall()
+            cur.close()
+        finally:
+            conn.close()
+
+        return self.rebuild(rows)
+
+    def find_by_ref(self, ref):
+        """Équivalent de: WHERE ref = ANY(refs_trouvees) LIMIT 1"""
+        return self._snapshot["by_ref"].get(ref)
+
+    def find_by_prix(self, prix_min, prix_max):
+        """Équivalent de: WHERE prix BETWEEN prix_min AND prix_max"""
+        snap = self._snapshot
+        debut = bisect.bisect_left(snap["prix_keys"], prix_min)
+        fin = bisect.bisect_right(snap["prix_keys"], prix_max)
+        return snap["prix_biens"][debut:fin]
+
+    def find_by_commune(self, commune):
+        """Équivalent de: WHERE LOWER(commune) LIKE %commune% OR LIKE %commune sans tirets%"""
+        snap = self._snapshot
+        motif = commune.lower()
+        motif_espaces = motif.replace("-", " ")
+
+        # Scan des communes DISTINCTES (quelques centaines) et non des biens
+        resultats = []
+        for cle, biens in snap["by_commune"].items():
+            if motif in cle or motif_espaces in cle:
+                resultats.extend(biens)
+        return resultats
+
+    def all_biens(self):
+        return self._snapshot["biens"]
+
+    def stats(self):
+        snap = self._snapshot
+        if not snap:
+            return {"loaded": False}
+        return {
+            "loaded": True,
+            "biens": len(snap["biens"]),
+            "refs": len(snap["by_ref"]),
+            "communes": len(snap["by_commune"]),
+            "loaded_at": snap["loaded_at"]
+        }
+
+
+_biens_index = BiensIndex()
+
+
+def refresh_biens_index():
+    """Recharge l'index mémoire depuis PostgreSQL (appelé par run_sync_cron)"""
+    count = _biens_index.load_from_db()
+    if count is None:
+        print("[INDEX] Pas de connexion DB - index non rechargé")
+        return 0
+    print(f"[INDEX] {count} biens indexés en mémoire")
+    return count
+
+
+def get_biens_index():
+    """Retourne l'index mémoire, chargé à la première utilisation (None si DB indisponible)"""
+    if not _biens_index.is_loaded:
+        refresh_biens_index()
+    return _biens_index if _biens_index.is_loaded else None
+
+# ============================================================================
+# SNAPSHOT BOARD BIENS TRELLO (fallbacks sans re-téléchargement)
+# ============================================================================
+
+TRELLO_SNAPSHOT_TTL = int(os.environ.get("TRELLO_SNAPSHOT_TTL", "300"))
+TRELLO_SNAPSHOT_DELTA_MAX = 50  # Au-delà de N cartes modifiées, refresh complet
+
+_CARD_FIELDS = "name,desc,shortUrl,idList,dateLastActivity"
+
+
+class TrelloBoardSnapshot:
+    """
+    Copie locale du board BIENS, partagée par tous les appels à process_prospect.
+
+    Chaque carte est conservée pré-parsée (extraire_donnees_carte, prix de la
+    description, contenu en minuscules) : les fallbacks Trello deviennent des
+    scans mémoire.
+
+    - Snapshot frais (< TTL) : aucun appel réseau
+    - Snapshot expiré : liste légère id + dateLastActivity, seules les cartes
+      modifiées depuis le dernier refresh sont re-téléchargées
+    - Trop de changements ou pas de snapshot : refresh complet
+    """
+
+    def __init__(self, board_id, ttl=TRELLO_SNAPSHOT_TTL):
+        self.board_id = board_id
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = None      # Liste ordonnée comme le board
+        self._refreshed_at = 0.0
+        self.stats_counters = {
+            "hits": 0,
+            "misses": 0,
+            "full_refreshes": 0,
+            "delta_refreshes": 0,
+            "cards_refetched": 0,
+            "errors": 0
+        }
+
+    @staticmethod
+    def _build_entry(card):
+        desc = card.get("desc", "")
+        prix_match = _RE_PRIX_DESC.search(desc)
+        return {
+            "card": card,
+            "bien": extraire_donnees_carte(card),
+            "prix_desc": int(prix_match.group(1) + prix_match.group(2)) if prix_match else None,
+            "content": (card.get("name", "") + " " + desc).lower(),
+            "last_activity": card.get("dateLastActivity")
+        }
+
+    def _full_refresh(self):
+        cards = trello_get(f"/boards/{self.board_id}/cards", {
+            "fields": _CARD_FIELDS,
+            "attachments": "true"
+        })
+        if not cards:
+            self.stats_counters["errors"] += 1
+            return False
+        self._entries = [self._build_entry(card) for card in cards]
+        self._refreshed_at = time.time()
+        self.stats_counters["full_refreshes"] += 1
+        print(f"[SNAPSHOT] Refresh complet: {len(self._entries)} cartes")
+        return True
+
+    def _delta_refresh(self):
+        """Ne re-télécharge que les cartes dont dateLastActivity a changé"""
+        legeres = trello_get(f"/boards/{self.board_id}/cards", {"fields": "dateLastActivity"})
+        if legeres is None:
+            self.stats_counters["errors"] += 1
+            return False
+
+        connues = {e["card"]["id"]: e for e in self._entries}
+        modifiees = [c["id"] for c in legeres
+                     if c["id"] not in connues or connues[c["id"]]["last_activity"] != c.get("dateLastActivity")]
+
+        if len(modifiees) > TRELLO_SNAPSHOT_DELTA_MAX:
+            return self._full_refresh()
+
+        for card_id in modifiees:
+            card = trello_get(f"/cards/{card_id}", {"fields": _CARD_FIELDS, "attachments": "true"})
+            if not card:
+                # Carte illisible : on retente tout au prochain passage
+                self.stats_counters["errors"] += 1
+                return False
+            connues[card_id] = self._build_entry(card)
+
+        # Ordre du board conservé, cartes archivées/supprimées retirées
+        self._entries = [connues[c["id"]] for c in legeres]
+        self._refreshed_at = time.time()
+        self.stats_counters["delta_refreshes"] += 1
+        self.stats_counters["cards_refetched"] += len(modifiees)
+        print(f"[SNAPSHOT] Refresh delta: {len(modifiees)} cartes modifiées / {len(self._entries)}")
+        return True
+
+    def entries(self, force_full=False):
+        """Retourne les entrées du board (None si Trello injoignable et aucun snapshot)"""
+        with self._lock:
+            if force_full or self._entries is None:
+                self.stats_counters["misses"] += 1
+                if not self._full_refresh() and force_full:
+                    return None
+            elif time.time() - self._refreshed_at > self.ttl:
+                self.stats_counters["misses"] += 1
+                if not self._delta_refresh():
+                    # Trello en erreur : on sert l'ancien snapshot
+                    print("[SNAPSHOT] Refresh échoué - snapshot précédent conservé")
+            else:
+                self.stats_counters["hits"] += 1
+            return self._entries
+
+    def invalidate(self):
+        with self._lock:
+            self._refreshed_at = 0.0
+
+    def stats(self):
+        return {
+            **self.stats_counters,
+            "cards": len(self._entries) if self._entries is not None else 0,
+            "age_seconds": round(time.time() - self._refreshed_at, 1) if self._entries is not None else None,
+            "ttl": self.ttl
+        }
+
+
+_board_snapshot = TrelloBoardSnapshot(BOARD_BIENS)
+
+
+def get_board_snapshot_stats():
+    """Compteurs hit/miss/refresh du snapshot board BIENS"""
+    return _board_snapshot.stats()
+
 # ============================================================================
 # LABELS TRELLO
 # ============================================================================
@@ -683,7 +1137,10 @@ def find_best_match(criteres):
     commune_prospect = normaliser_commune(criteres.get("commune", ""))
     
     print(f"[MATCH V14.9] Critères: REF={ref_prospect}, Prix={prix_prospect}, Surface={surface_prospect}, Commune={commune_prospect}")
-    
+
+    # Index mémoire biens_cache (None si DB indisponible → fallbacks Trello)
+    index = get_biens_index()
+
     # ═══════════════════════════════════════════════════════════════════════
     # PRIORITÉ 1: REF ICI DORDOGNE (format 3xxxx ou 4xxxx)
     # ═══════════════════════════════════════════════════════════════════════
@@ -698,19 +1155,10 @@ def find_best_match(criteres):
             print(f"[MATCH V14.9] REF ICI Dordogne détectée: {ref_ici}")
     
     if ref_ici:
-        # Chercher dans PostgreSQL
-        conn = get_db_connection()
-        if conn:
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT * FROM biens_cache 
-                WHERE %s = ANY(refs_trouvees)
-                LIMIT 1
-            """, (ref_ici,))
-            row = cur.fetchone()
-            cur.close()
-            conn.close()
-            
+        # Chercher dans l'index biens_cache
+        if index:
+            row = index.find_by_ref(ref_ici)
+
             if row:
                 print(f"[MATCH V14.9] 🎫 GOLDEN TICKET REF: {ref_ici} trouvée en DB")
                 return {
@@ -735,21 +1183,13 @@ def find_best_match(criteres):
     if prix_prospect and prix_prospect > 0:
         print(f"[MATCH V14.9] Recherche par prix unique: {prix_prospect}€ (±10%)")
         
-        # D'abord en DB
-        conn = get_db_connection()
-        if conn:
-            cur = conn.cursor()
+        # D'abord dans l'index biens_cache
+        if index:
             prix_min = int(prix_prospect * 0.90)
             prix_max = int(prix_prospect * 1.10)
-            
-            cur.execute("""
-                SELECT * FROM biens_cache 
-                WHERE prix BETWEEN %s AND %s
-            """, (prix_min, prix_max))
-            rows = cur.fetchall()
-            cur.close()
-            conn.close()
-            
+
+            rows = index.find_by_prix(prix_min, prix_max)
+
             if len(rows) == 1:
                 print(f"[MATCH V14.9] 🎫 GOLDEN TICKET PRIX: UN SEUL bien à {prix_prospect}€ en DB")
                 return {
@@ -776,19 +1216,10 @@ def find_best_match(criteres):
     if commune_prospect:
         print(f"[MATCH V14.9] Recherche par commune: {commune_prospect}")
         
-        conn = get_db_connection()
-        if conn:
-            cur = conn.cursor()
-            
+        if index:
             # Chercher les biens dans cette commune
-            cur.execute("""
-                SELECT * FROM biens_cache 
-                WHERE LOWER(commune) LIKE %s OR LOWER(commune) LIKE %s
-            """, (f"%{commune_prospect.lower()}%", f"%{commune_prospect.lower().replace('-', ' ')}%"))
-            rows = cur.fetchall()
-            cur.close()
-            conn.close()
-            
+            rows = index.find_by_commune(commune_prospect)
+
             if len(rows) == 1:
                 print(f"[MATCH V14.9] 🎫 GOLDEN TICKET COMMUNE: UN SEUL bien à {commune_prospect}")
                 return {
@@ -838,13 +1269,14 @@ def find_best_match(criteres):
 def _search_trello_by_ref(ref):
     """Recherche directe dans Trello par REF"""
     try:
-        cards = trello_get(f"/boards/{BOARD_BIENS}/cards", {"fields": "name,desc,shortUrl", "attachments": "true"})
-        if not cards:
+        entries = _board_snapshot.entries()
+        if not entries:
             return None
         
-        for card in cards:
+        for entry in entries:
+            card = entry["card"]
             if ref in card.get("name", "") or ref in card.get("desc", ""):
-                bien = extraire_donnees_carte(card)
+                bien = dict(entry["bien"])
                 return {
                     "match_found": True,
                     "score": 1000,
@@ -860,28 +1292,24 @@ def _search_trello_by_ref(ref):
 
 def _search_trello_by_price(prix):
     """Recherche directe dans Trello par prix unique"""
-    import re
     try:
-        cards = trello_get(f"/boards/{BOARD_BIENS}/cards", {"fields": "name,desc,shortUrl", "attachments": "true"})
-        if not cards:
+        entries = _board_snapshot.entries()
+        if not entries:
             return None
         
         prix_min = int(prix * 0.90)
         prix_max = int(prix * 1.10)
         matches = []
         
-        for card in cards:
-            desc = card.get("desc", "")
-            # Extraire prix de la description
-            prix_match = re.search(r'(\d{2,3})\s*(\d{3})\s*€', desc)
-            if prix_match:
-                card_prix = int(prix_match.group(1) + prix_match.group(2))
-                if prix_min <= card_prix <= prix_max:
-                    matches.append((card, card_prix))
+        for entry in entries:
+            # Prix de la description, pré-extrait au refresh du snapshot
+            card_prix = entry["prix_desc"]
+            if card_prix is not None and prix_min <= card_prix <= prix_max:
+                matches.append((entry, card_prix))
         
         if len(matches) == 1:
-            card, card_prix = matches[0]
-            bien = extraire_donnees_carte(card)
+            entry, card_prix = matches[0]
+            bien = dict(entry["bien"])
             return {
                 "match_found": True,
                 "score": 1000,
@@ -899,20 +1327,21 @@ def _search_trello_by_price(prix):
 def _search_trello_by_commune(commune, prix=None):
     """Recherche directe dans Trello par commune"""
     try:
-        cards = trello_get(f"/boards/{BOARD_BIENS}/cards", {"fields": "name,desc,shortUrl", "attachments": "true"})
-        if not cards:
+        entries = _board_snapshot.entries()
+        if not entries:
             return None
         
         matches = []
         commune_lower = commune.lower()
+        commune_espaces = commune_lower.replace("-", " ")
         
-        for card in cards:
-            content = (card.get("name", "") + " " + card.get("desc", "")).lower()
-            if commune_lower in content or commune_lower.replace("-", " ") in content:
-                matches.append(card)
+        for entry in entries:
+            content = entry["content"]
+            if commune_lower in content or commune_espaces in content:
+                matches.append(entry)
         
         if len(matches) == 1:
-            bien = extraire_donnees_carte(matches[0])
+            bien = dict(matches[0]["bien"])
             return {
                 "match_found": True,
                 "score": 900,
@@ -923,22 +1352,19 @@ def _search_trello_by_commune(commune, prix=None):
             }
         elif len(matches) > 1 and prix:
             # Filtrer par prix
-            import re
             best = None
             best_ecart = float('inf')
             
-            for card in matches:
-                desc = card.get("desc", "")
-                prix_match = re.search(r'(\d{2,3})\s*(\d{3})\s*€', desc)
-                if prix_match:
-                    card_prix = int(prix_match.group(1) + prix_match.group(2))
+            for entry in matches:
+                card_prix = entry["prix_desc"]
+                if card_prix is not None:
                     ecart = abs(card_prix - prix) / prix
                     if ecart < best_ecart:
                         best_ecart = ecart
-                        best = card
+                        best = entry
             
             if best and best_ecart < 0.15:
-                bien = extraire_donnees_carte(best)
+                bien = dict(best["bien"])
                 return {
                     "match_found": True,
                     "score": 850,
@@ -964,8 +1390,8 @@ def _scoring_fallback(criteres):
     surface_prospect = criteres.get("surface")
     commune_prospect = normaliser_commune(criteres.get("commune", ""))
     
-    conn = get_db_connection()
-    if not conn:
+    index = get_biens_index()
+    if not index:
         return {
             "match_found": False,
             "score": 0,
@@ -974,13 +1400,9 @@ def _scoring_fallback(criteres):
             "details": ["❌ Pas de connexion DB"],
             "needs_verification": True
         }
-    
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM biens_cache")
-    all_biens = cur.fetchall()
-    cur.close()
-    conn.close()
-    
+
+    all_biens = index.all_biens()
+
     best_match = None
     best_score = 0
     best_details = []
@@ -1041,12 +1463,9 @@ def find_best_match_fallback(criteres):
     """Fallback si pas de DB: recherche directe Trello"""
     print("[MATCH] Mode fallback - recherche Trello directe")
     
-    cards = trello_get(f"/boards/{BOARD_BIENS}/cards", {
-        "fields": "name,desc,shortUrl",
-        "attachments": "true"
-    })
+    entries = _board_snapshot.entries()
     
-    if not cards:
+    if not entries:
         return {
             "match_found": False,
             "score": 0,
@@ -1066,8 +1485,8 @@ def find_best_match_fallback(criteres):
     best_score = 0
     best_details = []
     
-    for card in cards:
-        bien = extraire_donnees_carte(card)
+    for entry in entries:
+        bien = dict(entry["bien"])
         score = 0
         details = []
         
@@ -1350,6 +1769,8 @@ __all__ = [
     'sync_biens_from_trello',
     'sync_biens_from_site',
     'find_best_match',
+    'refresh_biens_index',
+    'get_board_snapshot_stats',
     'process_prospect',
     'creer_carte_acquereur',
     'get_or_create_labels',
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK - Extraction des cartes Trello (extraire_donnees_carte)
+=================================================================
+Mesure le débit (cartes/s) de l'extraction à patterns précompilés contre
+l'implémentation historique (regex recompilées, desc.lower() par mot-clé),
+et vérifie que les deux produisent exactement le même dict.
+
+Corpus :
+- --corpus cartes.json : export brut de GET /boards/{id}/cards (attachments=true)
+- sinon : descriptions réelles reconstruites depuis biens_visite.json + variantes
+  au format des cartes du board BIENS
+
+Usage:
+    python scripts/bench_extraction_cartes.py [--corpus cartes.json] [--cartes 5000]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import matching_engine as me  # noqa: E402
+
+
+def extraire_donnees_carte_historique(card):
+    """Copie de l'implémentation d'origine (référence de non-régression)"""
+    desc = card.get("desc", "")
+    name = card.get("name", "")
+    refs = []
+    refs.extend(re.findall(r'\b(4\d{4}|3\d{4})\b', name))
+    refs.extend(re.findall(r'\b(4\d{4}|3\d{4})\b', desc))
+    attachments_names = []
+    site_url = None
+    for att in card.get("attachments", []):
+        filename = att.get("name", "")
+        att_url = att.get("url", "")
+        attachments_names.append(filename)
+        refs.extend(re.findall(r'\b(4\d{4}|3\d{4})\b', filename))
+        if not site_url and 'icidordogne.fr' in att_url:
+            site_url = att_url
+    if not site_url:
+        site_match = re.search(r'(?:Lien site|Site)\s*:\s*\[?(https?://[^\s\]]+icidordogne\.fr[^\s\]]*)', desc, re.IGNORECASE)
+        if site_match:
+            site_url = site_match.group(1).strip()
+    if not site_url:
+        site_match = re.search(r'https?://(?:www\.)?icidordogne\.fr/[^\s\)\]"<>]*', desc)
+        if site_match:
+            site_url = site_match.group(0).strip().rstrip(')')
+    refs = list(set(refs))
+    prix = None
+    prix_match = re.search(r'(\d{2,3})\s*(\d{3})\s*€', desc)
+    if prix_match:
+        prix = int(prix_match.group(1) + prix_match.group(2))
+    else:
+        prix_match = re.search(r'(\d{2,3})\s*k€', desc, re.IGNORECASE)
+        if prix_match:
+            prix = int(prix_match.group(1)) * 1000
+    surface = None
+    surface_match = re.search(r'(\d{2,3})\s*m[²2]', desc, re.IGNORECASE)
+    if surface_match:
+        surface = int(surface_match.group(1))
+    commune_raw = None
+    match = re.search(r'24\d{3}\s+([A-Za-zÀ-ÿ\-\'\s]+?)(?:\n|$|\()', desc)
+    if match:
+        commune_raw = match.group(1).strip()
+    if not commune_raw:
+        match = re.search(r'\(ex[:\s]+([^)]+)\)', desc, re.IGNORECASE)
+        if match:
+            commune_raw = match.group(1).strip()
+    if not commune_raw:
+        communes_connues = ["bassillac", "auberoche", "vergt", "bugue", "tremolat",
+                            "saint-mayme", "saint-amand", "boulazac", "périgueux"]
+        for c in communes_connues:
+            if c in desc.lower():
+                commune_raw = c
+                break
+    commune_normalisee = me.normaliser_commune(commune_raw) if commune_raw else None
+    mots_cles = []
+    mots_check = ["piscine", "grange", "étang", "etang", "vue", "terrain",
+                  "garage", "dépendance", "dependance", "plain-pied", "rénovée", "renovee"]
+    for mot in mots_check:
+        if mot in desc.lower():
+            mots_cles.append(mot)
+    return {
+        "trello_id": card["id"],
+        "trello_url": card.get("shortUrl", ""),
+        "proprietaire": name,
+        "description": desc,
+        "refs_trouvees": refs,
+        "prix": prix,
+        "surface": surface,
+        "commune": commune_raw,
+        "commune_normalisee": commune_normalisee,
+        "mots_cles": mots_cles,
+        "attachments_names": attachments_names,
+        "site_url": site_url
+    }
+
+
+def corpus_integre(n, seed=3):
+    """Cartes au format du board BIENS, construites depuis biens_visite.json"""
+    with open(os.path.join(RACINE, "biens_visite.json"), encoding="utf-8") as f:
+        fiches = list(json.load(f).values())
+
+    rnd = random.Random(seed)
+    gabarits = [
+        "{commune} 24{cp}\nMaison {surface} m² - {prix_fmt} €\n{points}\nLien site : https://www.icidordogne.fr/immobilier/{ref}/",
+        "Secteur (ex {commune_bas})\n{prix_k} k€ - {surface}m2\n{localisation}\n{points}",
+        "{localisation}\n{points}\nPrix : {prix_fmt}€ FAI - terrain, grange et étang\n[Annonce](https://icidordogne.fr/bien/{ref})",
+        "Propriétaire injoignable - rappeler\n{points}",
+    ]
+    cartes = []
+    for i in range(n):
+        fiche = rnd.choice(fiches)
+        prix = int(fiche.get("prix", 150000)) + rnd.randrange(-20, 20) * 1000
+        ref = str(rnd.choice([30000, 40000]) + rnd.randrange(0, 9999))
+        desc = rnd.choice(gabarits).format(
+            commune=fiche.get("commune", "Vergt"),
+            commune_bas=fiche.get("commune", "Vergt").lower(),
+            cp=f"{rnd.randrange(100, 999)}",
+            surface=fiche.get("surface", 100),
+            prix_fmt=f"{prix // 1000} {prix % 1000:03d}",
+            prix_k=prix // 1000,
+            points="\n".join("- " + p for p in fiche.get("points_forts", [])),
+            localisation=fiche.get("localisation", ""),
+            ref=ref,
+        )
+        cartes.append({
+            "id": f"card{i:05d}",
+            "name": f"PROPRIETAIRE {i} - REF {ref}",
+            "desc": desc,
+            "shortUrl": f"https://trello.com/c/{i:08d}",
+            "attachments": [{"name": f"mandat_{ref}.pdf", "url": "https://trello.com/1/att"}],
+        })
+    return cartes
+
+
+def normaliser(resultat):
+    resultat = dict(resultat)
+    resultat["refs_trouvees"] = sorted(resultat["refs_trouvees"])
+    return resultat
+
+
+def debit(fn, cartes, tours):
+    with contextlib.redirect_stdout(io.StringIO()):
+        debut = time.perf_counter()
+        for _ in range(tours):
+            for card in cartes:
+                fn(card)
+        duree = time.perf_counter() - debut
+    return len(cartes) * tours / duree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Export JSON des cartes Trello")
+    parser.add_argument("--cartes", type=int, default=5000)
+    parser.add_argument("--tours", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            cartes = json.load(f)
+    else:
+        cartes = corpus_integre(args.cartes)
+
+    # Non-régression : même dict pour chaque carte
+    with contextlib.redirect_stdout(io.StringIO()):
+        ecarts = [c["id"] for c in cartes
+                  if normaliser(me.extraire_donnees_carte(c)) != normaliser(extraire_donnees_carte_historique(c))]
+    if ecarts:
+        print(f"❌ {len(ecarts)} cartes divergent, ex: {ecarts[:5]}")
+        sys.exit(1)
+
+    avant = debit(extraire_donnees_carte_historique, cartes, args.tours)
+    apres = debit(me.extraire_donnees_carte, cartes, args.tours)
+
+    print(f"Corpus: {len(cartes)} cartes ({'export' if args.corpus else 'intégré'}), sorties identiques ✅")
+    print(f"AVANT: {avant:>10.0f} cartes/s")
+    print(f"APRÈS: {apres:>10.0f} cartes/s  (x{apres / avant:.2f})")
+
+
+if __name__ == "__main__":
+    main()
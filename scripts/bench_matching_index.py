@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK - Index mémoire biens_cache vs requêtes DB par palier
+===============================================================
+Compare la latence p50/p99 de find_best_match sur un board synthétique
+de 5 000 biens :
+
+- AVANT : une connexion PostgreSQL par palier (REF, prix, commune, scoring),
+  simulée par une fausse connexion qui paie un coût de handshake
+  (--connect-ms, ~30 ms TCP+TLS+auth vers Railway) puis scanne les lignes.
+- APRÈS : index mémoire (BiensIndex), aucune connexion sur le chemin chaud.
+
+Les fallbacks Trello sont neutralisés (pas de réseau).
+
+Usage:
+    python scripts/bench_matching_index.py [--biens 5000] [--requetes 300] [--connect-ms 30]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matching_engine as me  # noqa: E402
+
+COMMUNES = [
+    "Vergt", "Le Bugue", "Trémolat", "Bassillac", "Boulazac", "Périgueux",
+    "Saint-Mayme-de-Péreyrol", "Saint-Amand-de-Vergt", "Manzac-sur-Vern",
+    "Limeuil", "Lalinde", "Sarlat", "Bergerac", "Cendrieux", "Belvès",
+]
+
+
+def generer_biens(n, seed=42):
+    """Board synthétique au format biens_cache"""
+    rnd = random.Random(seed)
+    biens = []
+    for i in range(n):
+        commune = rnd.choice(COMMUNES)
+        biens.append({
+            "id": i + 1,
+            "trello_id": f"card{i:05d}",
+            "trello_url": f"https://trello.com/c/{i:08d}",
+            "proprietaire": f"PROPRIO {i}",
+            "description": "",
+            "refs_trouvees": [str(30000 + i)],
+            "prix": rnd.randrange(60, 900) * 1000,
+            "surface": rnd.randrange(40, 300),
+            "commune": commune,
+            "commune_normalisee": me.normaliser_commune(commune),
+            "mots_cles": [],
+            "attachments_names": [],
+            "site_url": None,
+        })
+    return biens
+
+
+def generer_requetes(biens, n, seed=7):
+    """Mélange de critères : REF connue, prix seul, commune+prix, rien d'exploitable"""
+    rnd = random.Random(seed)
+    requetes = []
+    for _ in range(n):
+        bien = rnd.choice(biens)
+        tirage = rnd.random()
+        if tirage < 0.4:
+            requetes.append({"ref": bien["refs_trouvees"][0]})
+        elif tirage < 0.7:
+            requetes.append({"prix": bien["prix"]})
+        elif tirage < 0.9:
+            requetes.append({"prix": bien["prix"], "commune": bien["commune"]})
+        else:
+            requetes.append({"surface": bien["surface"]})
+    return requetes
+
+
+# ----------------------------------------------------------------------------
+# AVANT : fausse connexion PostgreSQL (handshake simulé + scan des lignes)
+# ----------------------------------------------------------------------------
+
+class _FakeCursor:
+    def __init__(self, rows):
+        self._rows = rows
+        self._result = []
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        if "ANY(refs_trouvees)" in sql:
+            ref = params[0]
+            self._result = [r for r in self._rows if ref in r["refs_trouvees"]][:1]
+        elif "prix BETWEEN" in sql:
+            pmin, pmax = params
+            self._result = [r for r in self._rows if r["prix"] is not None and pmin <= r["prix"] <= pmax]
+        elif "LOWER(commune) LIKE" in sql:
+            m1, m2 = (p.strip("%") for p in params)
+            self._result = [r for r in self._rows if r["commune"] and (m1 in r["commune"].lower() or m2 in r["commune"].lower())]
+        else:
+            self._result = list(self._rows)
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return list(self._result)
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def __init__(self, rows, connect_s):
+        time.sleep(connect_s)
+        self._rows = rows
+
+    def cursor(self):
+        return _FakeCursor(self._rows)
+
+    def close(self):
+        pass
+
+
+def legacy_find_best_match(criteres, connect):
+    """Reproduction des paliers DB historiques (une connexion par palier)"""
+    ref = criteres.get("ref")
+    prix = criteres.get("prix")
+    commune = me.normaliser_commune(criteres.get("commune", ""))
+
+    if ref:
+        cur = connect().cursor()
+        cur.execute("SELECT * FROM biens_cache WHERE %s = ANY(refs_trouvees) LIMIT 1", (ref,))
+        if cur.fetchone():
+            return True
+    if prix:
+        cur = connect().cursor()
+        cur.execute("SELECT * FROM biens_cache WHERE prix BETWEEN %s AND %s",
+                    (int(prix * 0.90), int(prix * 1.10)))
+        if len(cur.fetchall()) == 1:
+            return True
+    if commune:
+        cur = connect().cursor()
+        cur.execute("SELECT * FROM biens_cache WHERE LOWER(commune) LIKE %s OR LOWER(commune) LIKE %s",
+                    (f"%{commune}%", f"%{commune.replace('-', ' ')}%"))
+        if len(cur.fetchall()) == 1:
+            return True
+    cur = connect().cursor()
+    cur.execute("SELECT * FROM biens_cache")
+    cur.fetchall()
+    return False
+
+
+def percentile(values, p):
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+def mesurer(fn, requetes):
+    durees = []
+    for criteres in requetes:
+        debut = time.perf_counter()
+        fn(criteres)
+        durees.append((time.perf_counter() - debut) * 1000)
+    return durees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--biens", type=int, default=5000)
+    parser.add_argument("--requetes", type=int, default=300)
+    parser.add_argument("--connect-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    biens = generer_biens(args.biens)
+    requetes = generer_requetes(biens, args.requetes)
+
+    # Pas de réseau : fallbacks Trello neutralisés
+    me._search_trello_by_ref = lambda *a, **k: None
+    me._search_trello_by_price = lambda *a, **k: None
+    me._search_trello_by_commune = lambda *a, **k: None
+
+    connect_s = args.connect_ms / 1000.0
+    avant = mesurer(lambda c: legacy_find_best_match(c, lambda: _FakeConnection(biens, connect_s)), requetes)
+
+    debut = time.perf_counter()
+    me._biens_index.rebuild(biens)
+    build_ms = (time.perf_counter() - debut) * 1000
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        apres = mesurer(me.find_best_match, requetes)
+
+    print(f"Board synthétique: {args.biens} biens, {args.requetes} requêtes, handshake simulé {args.connect_ms:.0f} ms")
+    print(f"Construction index: {build_ms:.1f} ms")
+    print(f"{'':8} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    print(f"{'AVANT':8} {percentile(avant, 50):>10.3f} {percentile(avant, 99):>10.3f}")
+    print(f"{'APRÈS':8} {percentile(apres, 50):>10.3f} {percentile(apres, 99):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
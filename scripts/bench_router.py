@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK - Coût de dispatch + autorisation par requête (serveur V19)
+=====================================================================
+Compare, pour 10 à 200 routes enregistrées :
+
+- AVANT : dict exact puis liste de regex parcourue linéairement, et
+  check_auth (scan de PUBLIC_ENDPOINTS + startswith) à chaque requête
+- APRÈS : Router (trie par segments), politique d'auth portée par la route
+
+Mesure en ns/requête sur un mélange de chemins exacts, à paramètres et 404.
+
+Usage:
+    python scripts/bench_router.py [--iterations 20000]
+"""
+
+import argparse
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "axi_v19"))
+
+from core import config  # noqa: E402
+from core.router import Router  # noqa: E402
+
+PUBLIC_LIST = list(config.PUBLIC_ENDPOINTS)
+
+
+def check_auth_historique(path, method):
+    """Politique d'origine (scan de liste + préfixes), sans la partie token"""
+    if path in PUBLIC_LIST:
+        return True
+    for prefixe in ("/agent/", "/trio/", "/sweepbright/", "/webhook/"):
+        if path.startswith(prefixe):
+            return True
+    return path == "/v19/brain" and method == "GET"
+
+
+def construire_routes(n, seed=11):
+    """n routes dont ~1/4 à paramètres, réparties sur quelques préfixes"""
+    rnd = random.Random(seed)
+    prefixes = ["api", "trello", "emails", "veille", "prospects", "biens", "agent", "sweepbright"]
+    routes = []
+    for i in range(n):
+        prefixe = rnd.choice(prefixes)
+        if i % 4 == 0:
+            routes.append(f"/{prefixe}/r{i}/{{id}}")
+        else:
+            routes.append(f"/{prefixe}/r{i}")
+    return routes
+
+
+def chemins_requetes(routes, n, seed=5):
+    rnd = random.Random(seed)
+    chemins = []
+    for _ in range(n):
+        tirage = rnd.random()
+        template = rnd.choice(routes)
+        if tirage < 0.9:
+            chemins.append(template.replace("{id}", str(rnd.randrange(1, 10000))))
+        else:
+            chemins.append(f"/inconnu/{rnd.randrange(1000)}")
+    return chemins
+
+
+def legacy_table(routes):
+    exact = {}
+    patterns = []
+    for path in routes:
+        if "{" in path:
+            pattern_str = re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', path)
+            patterns.append((re.compile(f'^{pattern_str}$'), path))
+        else:
+            exact[path] = path
+    return exact, patterns
+
+
+def dispatch_historique(exact, patterns, path):
+    check_auth_historique(path, "GET")
+    if path in exact:
+        return exact[path], None
+    for pattern, handler in patterns:
+        match = pattern.match(path)
+        if match:
+            return handler, match.groupdict()
+    return None, None
+
+
+def dispatch_router(router, path):
+    route, params = router.resolve("GET", path)
+    if route is not None:
+        return route.public, params
+    return config.is_public_endpoint(path, "GET"), None
+
+
+def mesurer(fn, chemins):
+    debut = time.perf_counter_ns()
+    for path in chemins:
+        fn(path)
+    return (time.perf_counter_ns() - debut) / len(chemins)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'routes':>7} {'avant (ns/req)':>16} {'après (ns/req)':>16}")
+    for n in (10, 25, 50, 100, 200):
+        routes = construire_routes(n)
+        chemins = chemins_requetes(routes, args.iterations)
+
+        exact, patterns = legacy_table(routes)
+        router = Router()
+        for path in routes:
+            router.add("GET", path, path)
+
+        avant = mesurer(lambda p: dispatch_historique(exact, patterns, p), chemins)
+        apres = mesurer(lambda p: dispatch_router(router, p), chemins)
+        print(f"{n:>7} {avant:>16.0f} {apres:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+BUILD - Index DVF sur disque pour la veille DPE enrichie
+========================================================
+Ajoute à l'index SQLite interrogé par rechercher_dvf (veille_enrichie) les
+années DVF du département 24 pas encore chargées. À lancer au déploiement
+pour que le premier enrichissement n'ait rien à télécharger.
+
+Usage:
+    python scripts/build_dvf_index.py [--chemin /data/dvf_24.sqlite]
+                                      [--annees 2023 2024] [--recharger 2024]
+
+Par défaut: chemin DVF_INDEX_PATH (env, sinon dvf_24.sqlite sur le volume
+RAILWAY_VOLUME_MOUNT_PATH, à défaut /tmp) et années DVF_ANNEES. --recharger remplace une année déjà chargée (millésime
+en cours, republié par data.gouv.fr).
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from axi_v19.modules import veille_enrichie  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chemin", default=veille_enrichie.DVF_INDEX_PATH)
+    parser.add_argument("--annees", type=int, nargs="+", default=veille_enrichie.DVF_ANNEES)
+    parser.add_argument("--recharger", type=int, nargs="*", default=[])
+    parser.add_argument("--url-modele", default=veille_enrichie.DVF_URL_MODELE,
+                        help="URL avec {annee}")
+    args = parser.parse_args()
+
+    if veille_enrichie.index_dvf_ephemere(args.chemin):
+        print(f"⚠️ {args.chemin} est éphémère: l'index sera perdu au prochain redéploiement")
+    stats = veille_enrichie.construire_index_dvf(args.chemin, args.annees, args.url_modele, args.recharger)
+    if not stats:
+        sys.exit(1)
+    manquantes = sorted(set(args.annees) - set(stats["annees"]))
+    if manquantes:
+        print(stats)
+        sys.exit(f"Années non chargées: {manquantes}")
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
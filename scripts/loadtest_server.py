@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+LOAD TEST - Serveur HTTP V19 (mode pooled vs threading)
+=======================================================
+Démarre ServerManager en local avec une route lente simulée (appel Claude /
+Trello), puis lance N clients concurrents en keep-alive qui alternent
+/health et /loadtest/slow. Affiche latences p50/p99 par route, codes HTTP
+et nombre de threads du process.
+
+Usage:
+    python scripts/loadtest_server.py [--mode pooled|threading] [--clients 500]
+                                      [--requetes 10] [--slow-ms 200] [--slow-limit 8]
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "axi_v19"))
+
+import logging  # noqa: E402
+
+from core.config import settings  # noqa: E402
+from core.server import ServerManager  # noqa: E402
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def client(port, nb_requetes, latences, codes, lock, depart):
+    depart.wait()
+    conn = None
+    for i in range(nb_requetes):
+        route = "/health" if i % 2 == 0 else "/loadtest/slow"
+        debut = time.perf_counter()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            conn.request("GET", route)
+            resp = conn.getresponse()
+            resp.read()
+            code = resp.status
+            if resp.getheader("Connection", "").lower() == "close" or resp.version == 10:
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException) as e:
+            code = type(e).__name__
+            if conn is not None:
+                conn.close()
+            conn = None
+        duree = (time.perf_counter() - debut) * 1000
+        with lock:
+            latences[route].append(duree)
+            codes[code] += 1
+    if conn is not None:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["pooled", "threading"], default="pooled")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requetes", type=int, default=10)
+    parser.add_argument("--slow-ms", type=float, default=200.0)
+    parser.add_argument("--slow-limit", type=int, default=8)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    settings.http_mode = args.mode
+    settings.http_host = "127.0.0.1"
+    settings.http_port = port_libre()
+
+    def slow_handler(query):
+        time.sleep(args.slow_ms / 1000.0)
+        return {"slow": "ok"}
+
+    srv = ServerManager()
+    srv.register_route("GET", "/loadtest/slow", slow_handler, max_concurrency=args.slow_limit)
+    srv.start()
+
+    latences = defaultdict(list)
+    codes = Counter()
+    lock = threading.Lock()
+    depart = threading.Event()
+    threads = [
+        threading.Thread(target=client, args=(settings.http_port, args.requetes, latences, codes, lock, depart), daemon=True)
+        for _ in range(args.clients)
+    ]
+    for t in threads:
+        t.start()
+
+    pic_threads = 0
+    debut = time.perf_counter()
+    depart.set()
+    while any(t.is_alive() for t in threads):
+        pic_threads = max(pic_threads, threading.active_count() - args.clients)
+        time.sleep(0.05)
+    duree = time.perf_counter() - debut
+    srv.stop()
+
+    total = sum(codes.values())
+    print(f"Mode {args.mode}: {args.clients} clients x {args.requetes} requêtes en {duree:.1f}s ({total / duree:.0f} req/s)")
+    print(f"Pic de threads serveur (hors clients): {pic_threads}")
+    print(f"Codes: {dict(codes)}")
+    for route, valeurs in sorted(latences.items()):
+        print(f"  {route:16} p50 {percentile(valeurs, 50):8.1f} ms   p99 {percentile(valeurs, 99):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()